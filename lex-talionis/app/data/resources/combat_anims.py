@@ -1,4 +1,5 @@
 import os
+import threading
 
 from app.data.resources.base_catalog import ManifestCatalog
 from app.data.resources import combat_commands
@@ -47,7 +48,62 @@ class Frame():
         self.offset = tuple(self.offset)
         return self
 
-class WeaponAnimation():
+class LazyTimeline():
+    """
+    Restores the frames and poses of an animation from their save data only
+    the first time they are used, since most animations in a project are
+    never seen in any one session
+    """
+    _unrestored = None  # (Frame saves, Pose saves)
+    # The prefetch thread can restore an animation while the main thread reads it
+    _restore_lock = threading.Lock()
+
+    @property
+    def poses(self) -> Data[Pose]:
+        if self._unrestored:
+            self._restore_timeline()
+        return self._poses
+
+    @poses.setter
+    def poses(self, value: Data[Pose]):
+        if self._unrestored:
+            self._restore_timeline()
+        self._poses = value
+
+    @property
+    def frames(self) -> Data[Frame]:
+        if self._unrestored:
+            self._restore_timeline()
+        return self._frames
+
+    @frames.setter
+    def frames(self, value: Data[Frame]):
+        if self._unrestored:
+            self._restore_timeline()
+        self._frames = value
+
+    def _restore_timeline(self):
+        with self._restore_lock:
+            if not self._unrestored:
+                return  # Another thread restored it while this one waited
+            frame_saves, pose_saves = self._unrestored
+            for frame_save in frame_saves:
+                self._frames.append(Frame.restore(frame_save))
+            for pose_save in pose_saves:
+                self._poses.append(Pose.restore(pose_save))
+            # Only once everything is there, so no other thread reads it half restored
+            self._unrestored = None
+
+    def save_timeline(self, s_dict):
+        if self._unrestored:
+            # Never touched, so it is still just what was loaded
+            s_dict['poses'] = self._unrestored[1]
+            s_dict['frames'] = self._unrestored[0]
+        else:
+            s_dict['poses'] = [pose.save() for pose in self.poses]
+            s_dict['frames'] = [frame.save() for frame in self.frames]
+
+class WeaponAnimation(LazyTimeline):
     def __init__(self, nid, full_path=None):
         self.nid = nid
         self.full_path = full_path
@@ -63,17 +119,13 @@ class WeaponAnimation():
     def save(self):
         s_dict = {}
         s_dict['nid'] = self.nid
-        s_dict['poses'] = [pose.save() for pose in self.poses]
-        s_dict['frames'] = [frame.save() for frame in self.frames]
+        self.save_timeline(s_dict)
         return s_dict
 
     @classmethod
     def restore(cls, s_dict):
         self = cls(s_dict['nid'])
-        for frame_save in s_dict['frames']:
-            self.frames.append(Frame.restore(frame_save))
-        for pose_save in s_dict['poses']:
-            self.poses.append(Pose.restore(pose_save))
+        self._unrestored = (s_dict['frames'], s_dict['poses'])
         return self
 
 class CombatAnimation():
@@ -99,7 +151,7 @@ class CombatAnimation():
             self.weapon_anims.append(WeaponAnimation.restore(weapon_anim_save))
         return self
 
-class EffectAnimation():
+class EffectAnimation(LazyTimeline):
     def __init__(self, nid, full_path=None):
         self.nid = nid
         self.full_path = full_path
@@ -116,18 +168,14 @@ class EffectAnimation():
     def save(self):
         s_dict = {}
         s_dict['nid'] = self.nid
-        s_dict['poses'] = [pose.save() for pose in self.poses]
-        s_dict['frames'] = [frame.save() for frame in self.frames]
+        self.save_timeline(s_dict)
         s_dict['palettes'] = self.palettes[:]
         return s_dict
 
     @classmethod
     def restore(cls, s_dict):
         self = cls(s_dict['nid'])
-        for frame_save in s_dict['frames']:
-            self.frames.append(Frame.restore(frame_save))
-        for pose_save in s_dict['poses']:
-            self.poses.append(Pose.restore(pose_save))
+        self._unrestored = (s_dict['frames'], s_dict['poses'])
         self.palettes = []
         for palette_name, palette_nid in s_dict['palettes'][:]:
             self.palettes.append([palette_name, palette_nid])
@@ -543,6 +543,8 @@ class SetLevelVar(Action):
             for unit in game.units:
                 if unit.position:
                     UpdateFogOfWar(unit).execute()
+            # Turning fog on or off or changing its look changes every position
+            game.board.mark_fog_changed()
 
     def do(self):
         game.level_vars[self.nid] = self.val
@@ -1644,12 +1646,14 @@ class AddSkillComponent(Action):
         component.skill = self.skill
         if component.defines('init'):
             component.init(self.skill)
+        skill_system.reset_hook_index()
         self._did_add = True
 
     def reverse(self):
         if self._did_add:
             self.skill.components.remove_key(self.component_nid)
             del self.skill.__dict__[self.component_nid]
+            skill_system.reset_hook_index()
             self._did_add = False
 
 class ModifySkillComponent(Action):
@@ -1701,6 +1705,7 @@ class RemoveSkillComponent(Action):
             self.component_value = component.value
             self.skill.components.remove_key(self.component_nid)
             del self.skill.__dict__[self.component_nid]
+            skill_system.reset_hook_index()
             self._did_remove = True
         else:
             logging.warning("remove_skill_component: component with nid %s not found for skill %s", self.component_nid, self.skill)
@@ -1713,6 +1718,7 @@ class RemoveSkillComponent(Action):
             self.skill.__dict__[self.component_nid] = component
             # Assign parent to component
             component.skill = self.skill
+            skill_system.reset_hook_index()
             self._did_remove = False
 
 class SetObjData(Action):
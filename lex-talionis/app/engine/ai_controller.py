@@ -1,27 +1,34 @@
+from __future__ import annotations
+
 import logging
-import functools
 import math
-from typing import List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Set, Tuple
 
 from app.constants import FRAMERATE
 from app.data.database.database import DB
-from app.engine import (action, combat_calcs, engine, equations, evaluate,
-                        item_funcs, item_system, line_of_sight,
+from app.engine import (action, ai_pool, combat_calcs, engine, equations,
+                        evaluate, item_funcs, item_system, line_of_sight,
                         skill_system)
-from app.engine.pathfinding import pathfinding
 from app.engine.combat import interaction
 from app.engine.game_state import game
 from app.engine.movement import movement_funcs
+from app.engine.profiler import profiled
 from app.events import triggers
 from app.events.regions import RegionType
 from app.utilities import utils
-from app.utilities.typing import Pos
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.objects.item import ItemObject
+    from app.engine.objects.unit import UnitObject
 
 
 class AIController():
     def __init__(self):
         # Controls whether we should be skipping through the AI's turns
         self.do_skip: bool = False
+        self.planner = PhasePlanner()
 
         self.reset()
 
@@ -212,15 +219,9 @@ class AIController():
             return False
 
     def get_true_valid_moves(self) -> set:
-        # Guard AI
-        if self.behaviour.view_range == -1 and not game.ai_group_active(self.unit.ai_group):
-            return {self.unit.position}
-        else:
-            valid_moves = game.path_system.get_valid_moves(self.unit)
-            other_unit_positions = {unit.position for unit in game.units if unit.position and unit is not self.unit}
-            valid_moves -= other_unit_positions
-            return valid_moves
+        return get_true_valid_moves(self.unit, self.behaviour)
 
+    @profiled('ai.think')
     def think(self):
         time = engine.get_time()
         success = False
@@ -293,6 +294,8 @@ class AIController():
                 elif over_time:
                     # Make sure to quick move back so that the in-between frames aren't flickering around
                     self.inner_ai.quick_move(self.inner_ai.orig_pos)
+                elif isinstance(self.inner_ai, ParallelPrimaryAI):
+                    break  # Still waiting on the workers, so check again next frame
 
             elif self.state == 'Secondary':
                 done, self.goal_position = self.inner_ai.run()
@@ -333,17 +336,282 @@ class AIController():
                     unit.has_run_ai = False  # So it can be run through the AI state again
 
     def build_primary(self):
+        decision = self.planner.get(self.unit, self.behaviour_idx, self.behaviour)
+        if not decision and self.do_skip:
+            # When skipping, plan the whole decision at once instead of a half frame at a time
+            decision = self.planner.plan_primary(self.unit, self.behaviour, self.behaviour_idx, BoardSnapshot())
+        if decision:
+            return PlannedAI(decision)
         valid_moves = self.get_true_valid_moves()
+        pool = ai_pool.get_pool()
+        if pool:
+            return ParallelPrimaryAI(self.unit, valid_moves, self.behaviour, self.behaviour_idx, pool)
         return PrimaryAI(self.unit, valid_moves, self.behaviour)
 
     def build_secondary(self):
         return SecondaryAI(self.unit, self.behaviour)
 
+def get_true_valid_moves(unit, behaviour) -> set:
+    # Guard AI
+    if behaviour.view_range == -1 and not game.ai_group_active(unit.ai_group):
+        return {unit.position}
+    else:
+        valid_moves = game.path_system.get_valid_moves(unit)
+        other_unit_positions = {other.position for other in game.units if other.position and other is not unit}
+        valid_moves -= other_unit_positions
+        return valid_moves
+
+def get_occupant(pos: Pos) -> Optional[Tuple[NID, int]]:
+    """The nid and HP of the unit on the game board at pos, if any"""
+    unit = game.board.get_unit(pos)
+    return (unit.nid, unit.get_hp()) if unit else None
+
+class BoardSnapshot():
+    """
+    Lets the AI plan ahead on the game board itself. Units that have
+    already been planned are moved to their planned positions on the board,
+    picked up and put down the same way the AI tries out candidate moves
+    while thinking, so targeting, auras and terrain all see them where
+    they will be. The unit being planned is tried out at each candidate
+    position, and can try out equipping items, in the same way. Nothing is
+    recorded in the action log. restore puts the unit being planned back
+    the way it was, and undo puts back every unit move moved
+    """
+    def __init__(self):
+        # Unit nid -> (Unit, Position before it was moved to its planned position), in the order they were moved
+        self.moved: Dict[NID, Tuple[UnitObject, Pos]] = {}
+        # Unit nid -> (Position, Equipped weapon, Equipped accessory) from before place or equip first changed them
+        self.originals: Dict[NID, Tuple[Pos, ItemObject, ItemObject]] = {}
+
+    def _relocate(self, unit, pos: Pos, on_board: bool):
+        action.PickUnitUp(unit, True).do()
+        if on_board:
+            game.board.remove_unit(unit.position, unit)
+        unit.position = pos
+        if on_board:
+            game.board.set_unit(pos, unit)
+        action.PutUnitDown(unit, True).do()
+        skill_system.reset_cache()
+        equations.bump_generation()
+
+    def move(self, unit, pos: Pos):
+        """Moves the unit to its planned position on the game board, until undo"""
+        if unit.position == pos:
+            return
+        if unit.nid not in self.moved:
+            self.moved[unit.nid] = (unit, unit.position)
+        self._relocate(unit, pos, True)
+
+    def get_moved(self) -> Dict[NID, Pos]:
+        """Where move has moved each unit to, in the order they were moved"""
+        return {nid: unit.position for nid, (unit, _) in self.moved.items()}
+
+    def undo(self):
+        """Puts every unit that move moved back where it was"""
+        # Backwards, so no unit is put back where a later unit still is
+        for unit, pos in reversed(list(self.moved.values())):
+            self._relocate(unit, pos, True)
+        self.moved.clear()
+
+    def _remember(self, unit):
+        if unit.nid not in self.originals:
+            self.originals[unit.nid] = (unit.position, unit.equipped_weapon, unit.equipped_accessory)
+
+    def place(self, unit, pos: Pos):
+        """Tries the unit out at pos, the same way as PrimaryAI.quick_move"""
+        self._remember(unit)
+        self._relocate(unit, pos, False)
+
+    def equip(self, unit, item):
+        """Equips the item without recording it, or anything its equip hooks do, in the action log"""
+        self._remember(unit)
+        game.action_log.stop_recording()
+        try:
+            unit.equip(item)
+        finally:
+            game.action_log.start_recording()
+
+    def restore(self, unit):
+        """Puts back the position and equipment place and equip changed"""
+        original = self.originals.pop(unit.nid, None)
+        if not original:
+            return
+        position, weapon, accessory = original
+        if unit.position != position:
+            self._relocate(unit, position, False)
+        game.action_log.stop_recording()
+        try:
+            for current, orig in ((unit.equipped_weapon, weapon), (unit.equipped_accessory, accessory)):
+                if current is not orig:
+                    if orig:
+                        unit.equip(orig)
+                    else:
+                        unit.unequip(current)
+        finally:
+            game.action_log.start_recording()
+
+@dataclass
+class PlannedDecision():
+    behaviour_idx: int
+    target: Optional[Pos]
+    position: Optional[Pos]
+    item: Optional[ItemObject]
+    # What the decision was worked out from: where the unit could move,
+    # and the nid and HP of whatever unit was at every position in range
+    # of any of those moves with any of the items it tried
+    valid_moves: FrozenSet[Pos]
+    watched: Dict[Pos, Optional[Tuple[NID, int]]]
+
+class PhasePlanner():
+    """
+    Plans the Primary AI decision of units ahead of time, with a
+    BoardSnapshot, so that a whole phase can be thought through at once.
+
+    Units are planned in order, each one against the board as it will be
+    once the units before it have moved to their planned positions. A plan
+    is only used if, when the unit's turn comes, it can still move to the
+    same positions, and every position any of its items could reach from
+    them still holds the same unit with the same HP, or is still empty.
+    Otherwise the unit just thinks normally.
+    """
+    def __init__(self):
+        self.plans: Dict[NID, PlannedDecision] = {}
+        self.planned_phase: bool = False
+        # Whether plan is going through the phase right now
+        self.planning: bool = False
+
+    def clear(self):
+        self.plans.clear()
+        self.planned_phase = False
+
+    @profiled('ai.plan')
+    def plan(self, units: list):
+        self.planned_phase = True
+        pool = ai_pool.get_pool()
+        if pool:
+            # Once for the whole phase, since the planned moves are sent along with each unit
+            pool.update_state(game)
+        snapshot = BoardSnapshot()
+        self.planning = True
+        try:
+            for unit in units:
+                decision = self.plan_unit(unit, snapshot)
+                if decision:
+                    self.plans[unit.nid] = decision
+                    if decision.position:
+                        snapshot.move(unit, decision.position)
+        finally:
+            self.planning = False
+            snapshot.undo()
+        logging.info("Planned %d of %d units ahead of time", len(self.plans), len(units))
+
+    def plan_unit(self, unit, snapshot: BoardSnapshot) -> Optional[PlannedDecision]:
+        # AI groups have to wait on each other, so can't be planned ahead
+        if not unit.position or unit.finished or unit.ai_group:
+            return None
+        behaviours = DB.ai.get(unit.get_ai()).behaviours
+        for idx, behaviour in enumerate(behaviours):
+            if not behaviour.condition or \
+                    evaluate.evaluate(behaviour.condition, unit, position=unit.position):
+                if behaviour.action == "None":
+                    continue
+                if behaviour.action in ("Attack", "Support", "Steal"):
+                    # AIController.behaviour_idx is always one past the current behaviour
+                    return self.plan_primary(unit, behaviour, idx + 1, snapshot)
+                return None
+        return None
+
+    def plan_primary(self, unit, behaviour, behaviour_idx: int, snapshot: BoardSnapshot) -> PlannedDecision:
+        valid_moves = get_true_valid_moves(unit, behaviour)
+        pool = ai_pool.get_pool()
+        try:
+            primary = PrimaryAI(unit, valid_moves, behaviour, snapshot)
+            if pool:
+                candidates = primary.get_candidates()
+                if len(candidates) >= ai_pool.MIN_PARALLEL_CANDIDATES:
+                    if not self.planning:
+                        pool.update_state(game)
+                    futures = pool.submit(unit.nid, behaviour_idx, snapshot.get_moved(), primary.valid_moves, candidates)
+                    utilities = [utility for future in futures for utility in future.result()]
+                else:
+                    utilities = primary.score_candidates(candidates)
+                _, target, position, item = primary.choose_best(candidates, utilities)
+            else:
+                done = False
+                while not done:
+                    done, target, position, item = primary.run()
+        finally:
+            snapshot.restore(unit)
+        watched = self.get_watched(unit, valid_moves, primary.items)
+        return PlannedDecision(behaviour_idx, target, position, item, frozenset(valid_moves), watched)
+
+    def get_watched(self, unit, valid_moves: Set[Pos], items: list) -> Dict[Pos, Optional[Tuple[NID, int]]]:
+        """Who is at every position any of the items could reach from any of the moves"""
+        item_range = set()
+        for item in items:
+            item_range |= item_funcs.get_range(unit, item)
+        shell = game.target_system.get_shell(valid_moves, item_range, game.board.bounds) if item_range else set()
+        return {pos: get_occupant(pos) for pos in shell | set(valid_moves)}
+
+    def get(self, unit, behaviour_idx: int, behaviour) -> Optional[PlannedDecision]:
+        decision = self.plans.pop(unit.nid, None)
+        if not decision or decision.behaviour_idx != behaviour_idx:
+            return None
+        if frozenset(get_true_valid_moves(unit, behaviour)) != decision.valid_moves:
+            return None
+        for pos, occupant in decision.watched.items():
+            if get_occupant(pos) != occupant:
+                return None
+        return decision
+
+class PlannedAI():
+    """Stands in for PrimaryAI when the decision has already been planned"""
+    def __init__(self, decision: PlannedDecision):
+        self.decision = decision
+
+    def run(self):
+        return (True, self.decision.target, self.decision.position, self.decision.item)
+
+class ParallelPrimaryAI():
+    """
+    Stands in for PrimaryAI while its candidates are scored by the AI worker pool.
+    Candidates are tried out through a BoardSnapshot, so the result is the
+    same as a planned decision. run() returns right away each frame until
+    every worker has finished, so the game keeps drawing in the meantime
+    """
+    def __init__(self, unit, valid_moves, behaviour, behaviour_idx: int, pool: ai_pool.AIWorkerPool):
+        self.orig_pos = unit.position
+        snapshot = BoardSnapshot()
+        try:
+            self.primary = PrimaryAI(unit, valid_moves, behaviour, snapshot)
+            self.candidates = self.primary.get_candidates()
+            if len(self.candidates) >= ai_pool.MIN_PARALLEL_CANDIDATES:
+                pool.update_state(game)
+                self.futures = pool.submit(unit.nid, behaviour_idx, {}, self.primary.valid_moves, self.candidates)
+                self.utilities = None
+            else:
+                self.futures = []
+                self.utilities = self.primary.score_candidates(self.candidates)
+        finally:
+            snapshot.restore(unit)
+
+    def quick_move(self, move):
+        pass  # The unit never leaves its position
+
+    def run(self):
+        if self.utilities is None:
+            if not all(future.done() for future in self.futures):
+                return (False, None, None, None)
+            self.utilities = [utility for future in self.futures for utility in future.result()]
+        return self.primary.choose_best(self.candidates, self.utilities)
+
 class PrimaryAI():
-    def __init__(self, unit, valid_moves, behaviour):
+    def __init__(self, unit, valid_moves, behaviour, snapshot: Optional[BoardSnapshot] = None):
         self.max_tp = 0
 
         self.unit = unit
+        # If set, candidate moves and items are tried out through this, so nothing is recorded
+        self.snapshot = snapshot
         self.orig_pos = self.unit.position
         self.orig_item = self.unit.items[0] if self.unit.items else None
         self.behaviour = behaviour
@@ -382,6 +650,9 @@ class PrimaryAI():
         self.best_position = None
         self.best_item = None
 
+        # When set, candidates are collected here instead of being scored
+        self.candidates: Optional[List[ai_pool.Candidate]] = None
+
         self.item_setup()
 
     def item_setup(self):
@@ -389,7 +660,7 @@ class PrimaryAI():
             item = self.items[self.item_index]
             logging.info("Testing %s" % item)
             if self.unit.can_equip(item):
-                action.do(action.EquipItem(self.unit, item))
+                self.equip(item)
             self.get_all_valid_targets()
             self.possible_moves = self.get_possible_moves()
             logging.info(self.possible_moves)
@@ -414,7 +685,16 @@ class PrimaryAI():
         else:
             return []
 
+    def equip(self, item):
+        if self.snapshot:
+            self.snapshot.equip(self.unit, item)
+        else:
+            action.do(action.EquipItem(self.unit, item))
+
     def quick_move(self, move):
+        if self.snapshot:
+            self.snapshot.place(self.unit, move)
+            return
         action.PickUnitUp(self.unit, True).do()
         self.unit.position = move
         action.PutUnitDown(self.unit, True).do()
@@ -423,7 +703,7 @@ class PrimaryAI():
         if self.item_index >= len(self.items):
             self.quick_move(self.orig_pos)
             if self.orig_item and self.unit.can_equip(self.orig_item):
-                action.do(action.EquipItem(self.unit, self.orig_item))
+                self.equip(self.orig_item)
             return (True, self.best_target, self.best_position, self.best_item)
 
         elif self.target_index >= len(self.valid_targets):
@@ -474,7 +754,56 @@ class PrimaryAI():
         # Not done yet
         return (False, self.best_target, self.best_position, self.best_item)
 
+    def get_candidates(self) -> List[ai_pool.Candidate]:
+        """
+        Goes through the same candidates as run(), but only collects them instead of scoring them.
+        Returns (move, target position, index of item in self.items) for each one
+        """
+        self.candidates = []
+        done = False
+        while not done:
+            done = self.run()[0]
+        candidates, self.candidates = self.candidates, None
+        return candidates
+
+    def score_candidates(self, candidates: List[ai_pool.Candidate]) -> List[Optional[float]]:
+        """
+        Scores any run of candidates from get_candidates, with the unit
+        in the same state as run() would have had it for each one
+        """
+        utilities = []
+        # item_setup has already run for the first item
+        setup_index = 0
+        for move, target_pos, item_index in candidates:
+            while setup_index < item_index:
+                setup_index += 1
+                if self.unit.can_equip(self.items[setup_index]):
+                    self.equip(self.items[setup_index])
+            if self.unit.position != move:
+                self.quick_move(move)
+            utilities.append(self.get_utility(move, target_pos, self.items[item_index]))
+        self.quick_move(self.orig_pos)
+        if self.orig_item and self.unit.can_equip(self.orig_item):
+            self.equip(self.orig_item)
+        return utilities
+
+    def choose_best(self, candidates: List[ai_pool.Candidate], utilities: List[Optional[float]]):
+        for (move, target_pos, item_index), tp in zip(candidates, utilities):
+            self.choose(tp, move, target_pos, self.items[item_index])
+        return (True, self.best_target, self.best_position, self.best_item)
+
     def determine_utility(self, move, target_pos, item):
+        if self.candidates is not None:
+            self.candidates.append((move, target_pos, self.item_index))
+            return
+        tp = self.get_utility(move, target_pos, item)
+        self.choose(tp, move, target_pos, item)
+
+    def get_utility(self, move, target_pos, item) -> Optional[float]:
+        """
+        Returns how much the AI wants to use the item on the target from the move,
+        or None if it should not be considered at all
+        """
         tp = 0
         main_target_pos, splash = item_system.splash(self.unit, item, target_pos)
         if item_system.target_restrict(self.unit, item, main_target_pos, splash):
@@ -483,16 +812,19 @@ class PrimaryAI():
         target = game.board.get_unit(target_pos)
         # Don't target self if I've already moved and I'm not targeting my new position
         if target is self.unit and target_pos != self.unit.position:
-            return
+            return None
 
         # Don't bother using Primary AI if we're not able to attack
         # Will just fall through to Secondary AI
         if item_system.no_attack_after_move(self.unit, item) or skill_system.no_attack_after_move(self.unit):
             if move != self.orig_pos:
-                return
+                return None
 
         logging.info("Choice %.5f - Weapon: %s, Position: %s, Target: %s, Target Position: %s", tp, item, move, target.nid if target else '--', target_pos)
-        if tp > self.max_tp:
+        return tp
+
+    def choose(self, tp: Optional[float], move, target_pos, item):
+        if tp is not None and tp > self.max_tp:
             self.best_target = target_pos
             self.best_position = move
             self.best_item = item
@@ -697,10 +1029,10 @@ class SecondaryAI():
         self.single_move = self.zero_move + equations.parser.movement(self.unit)
         self.double_move = self.single_move + equations.parser.movement(self.unit)
 
-        movement_group = movement_funcs.get_movement_group(self.unit)
-        self.grid = game.board.get_movement_grid(movement_group)
-        self.pathfinder = \
-            pathfinding.AStar(self.unit.position, None, self.grid)
+        self.movement_group = movement_funcs.get_movement_group(self.unit)
+        self.grid = game.board.get_movement_grid(self.movement_group)
+        self.cost_grid = game.board.get_cost_grid(self.movement_group)
+        self.blocked: FrozenSet[int] = None
 
         self.widen_flag = False  # Determines if we've widened our search
         self.reset()
@@ -764,9 +1096,16 @@ class SecondaryAI():
                 return True, None
         return False, None
 
-    def get_path(self, goal_pos):
-        self.pathfinder.set_goal_pos(goal_pos)
+    def get_blocked(self) -> FrozenSet[int]:
+        # Nothing moves while we are thinking
+        if self.blocked is None:
+            if skill_system.pass_through(self.unit):
+                self.blocked = frozenset()
+            else:
+                self.blocked = frozenset(game.board.get_blocked_mask(self.unit.team))
+        return self.blocked
 
+    def get_path(self, goal_pos):
         if self.behaviour.target == 'Event':
             adj_good_enough = False
         elif self.behaviour.target == 'Position' and not game.board.get_unit(goal_pos):
@@ -775,13 +1114,10 @@ class SecondaryAI():
             adj_good_enough = True
 
         limit = self.get_limit()
-        if skill_system.pass_through(self.unit):
-            can_move_through = lambda adj: True
-        else:
-            can_move_through = functools.partial(game.board.can_move_through, self.unit.team)
-        path = self.pathfinder.process(can_move_through, adj_good_enough=adj_good_enough, limit=limit)
-        self.pathfinder.reset()
-        return path
+        # Every unit heading for the same target the same way shares the search
+        goal_field = game.board.distance_fields.get(
+            self.movement_group, self.cost_grid, game.board.bounds, (goal_pos,), self.get_blocked(), adj_good_enough)
+        return goal_field.find_path(self.unit.position, limit=limit)
 
     def default_priority(self, enemy):
         hp_max = equations.parser.hitpoints(enemy)
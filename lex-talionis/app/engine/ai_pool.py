@@ -0,0 +1,220 @@
+"""
+Scores PrimaryAI candidates in worker processes.
+
+Each worker boots the engine without a window. What scoring reads of the
+game, the units on the map with their items and skills, the level and its
+regions and terrain statuses, and a few counters, is handed to the workers
+as a PhaseSnapshot, which is only written out again when it changes, and
+which a worker only reads again when it has not seen it yet. The units that
+have already been planned are then moved the same way as they were in this
+process, so the candidates are scored against the same board, and the results
+are identical to scoring them here.
+
+Enabled by setting ai_workers in the config to the number of worker processes.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app.data.database.database import DB
+from app.engine import config as cf
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.game_state import GameState
+
+# Fewer candidates than this are not worth sending to other processes
+MIN_PARALLEL_CANDIDATES = 32
+
+# (move, target position, index into PrimaryAI.items)
+Candidate = Tuple[Pos, Pos, int]
+
+@dataclass
+class PhaseSnapshot():
+    """
+    The part of the game state that scoring candidates reads, in save format.
+    Only the units on the map, and any units they carry, are kept, along with
+    just the items and skills they hold, and none of the action log, events
+    or records
+    """
+    level: dict
+    units: List[dict]
+    items: List[dict]
+    skills: List[dict]
+    regions: List[dict]
+    terrain_status_registry: dict
+    parties: List[dict]
+    current_party: NID
+    current_mode: dict
+    supports: list
+    turncount: int
+    game_vars: dict
+    level_vars: dict
+    bounds: Optional[Tuple[int, int, int, int]]
+    roam_info: object = field(default=None)
+
+    @classmethod
+    def from_game(cls, game: GameState) -> PhaseSnapshot:
+        on_map = [unit for unit in game.units if unit.position]
+        unit_nids = {unit.nid for unit in on_map} | {unit.traveler for unit in on_map if unit.traveler}
+        units = [unit.save() for unit in game.units if unit.nid in unit_nids]
+        level = game.current_level.save()
+        level['units'] = [nid for nid in level['units'] if nid in unit_nids]
+        item_uids = [uid for unit in units for uid in unit['items']]
+        skill_uids = [uid for unit in units for uid, _, _ in unit['skills']]
+        skill_uids += list(game.terrain_status_registry.values())
+        items = cls._gather(item_uids, game.item_registry, 'subitems')
+        skills = cls._gather(skill_uids, game.skill_registry, 'subskill')
+        return cls(level, units, items, skills,
+                   [region.save() for region in game.region_registry.values()],
+                   dict(game.terrain_status_registry),
+                   [party.save() for party in game.parties.values()], game.current_party,
+                   game.current_mode.save(), game.supports.save(), game.turncount,
+                   dict(game.game_vars), dict(game.level_vars),
+                   game.board.bounds if game.board else None, game.roam_info)
+
+    @staticmethod
+    def _gather(uids: List[int], registry: dict, child_key: str) -> List[dict]:
+        """Saves of everything in the registry with one of the uids, and their subitems or subskills"""
+        saves = {}
+        uids = list(uids)
+        while uids:
+            uid = uids.pop()
+            if uid in saves or uid not in registry:
+                continue
+            saves[uid] = registry[uid].save()
+            children = saves[uid].get(child_key)
+            if isinstance(children, list):
+                uids += children
+            elif children is not None:
+                uids.append(children)
+        return list(saves.values())
+
+    def to_save(self) -> dict:
+        """As a save that GameState.load can restore"""
+        return {'units': self.units, 'items': self.items, 'skills': self.skills,
+                'terrain_status_registry': self.terrain_status_registry,
+                'regions': self.regions, 'level': self.level,
+                'turncount': self.turncount, 'playtime': 0,
+                'game_vars': self.game_vars, 'level_vars': self.level_vars,
+                'current_mode': self.current_mode, 'parties': self.parties,
+                'current_party': self.current_party, 'state': ([], []),
+                'action_log': ([], -1, 0), 'supports': self.supports,
+                'bounds': self.bounds, 'roam_info': self.roam_info}
+
+# === Worker process ===
+_loaded_state_id: Optional[int] = None
+
+def _init_worker(proj_dir: str):
+    from app.engine import headless
+    headless.load(proj_dir)
+
+def _load_state(state_id: int, state_path: str):
+    global _loaded_state_id
+    if state_id != _loaded_state_id:
+        from app.engine.game_state import game
+        with open(state_path, 'rb') as fp:
+            snapshot: PhaseSnapshot = pickle.load(fp)
+        game.clear()
+        game.build_new()
+        game.load(snapshot.to_save())
+        _loaded_state_id = state_id
+
+def _score(state_id: int, state_path: str, unit_nid: NID, behaviour_idx: int,
+           moved: Dict[NID, Pos], valid_moves: List[Pos], candidates: List[Candidate]) -> List[Optional[float]]:
+    _load_state(state_id, state_path)
+    from app.engine.ai_controller import BoardSnapshot, PrimaryAI
+    from app.engine.game_state import game
+    unit = game.get_unit(unit_nid)
+    behaviour = DB.ai.get(unit.get_ai()).behaviours[behaviour_idx - 1]
+    snapshot = BoardSnapshot()
+    try:
+        for nid, pos in moved.items():
+            snapshot.move(game.get_unit(nid), pos)
+        try:
+            primary = PrimaryAI(unit, valid_moves, behaviour, snapshot)
+            return primary.score_candidates(candidates)
+        finally:
+            snapshot.restore(unit)
+    finally:
+        snapshot.undo()
+
+# === Main process ===
+class AIWorkerPool():
+    def __init__(self, num_workers: int):
+        self.num_workers: int = num_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.state: Optional[bytes] = None
+        self.state_id: int = 0
+        self.state_path: Optional[str] = None
+        self.state_dir: str = tempfile.mkdtemp(prefix='lt_ai_')
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if not self.executor:
+            logging.info("Starting %d AI worker processes", self.num_workers)
+            # Spawn so that workers never inherit the display or the sound thread
+            context = multiprocessing.get_context('spawn')
+            self.executor = ProcessPoolExecutor(
+                self.num_workers, mp_context=context,
+                initializer=_init_worker, initargs=(DB.current_proj_dir,))
+        return self.executor
+
+    def update_state(self, game: GameState):
+        """Writes out a new PhaseSnapshot for the workers, if anything in it changed"""
+        state = pickle.dumps(PhaseSnapshot.from_game(game))
+        if state == self.state:
+            return
+        old_path = self.state_path
+        self.state = state
+        self.state_id += 1
+        self.state_path = os.path.join(self.state_dir, 'phase_%d.pkl' % self.state_id)
+        with open(self.state_path, 'wb') as fp:
+            fp.write(state)
+        # Everything scored against the old one has been collected by now
+        if old_path:
+            os.remove(old_path)
+
+    def submit(self, unit_nid: NID, behaviour_idx: int, moved: Dict[NID, Pos],
+               valid_moves: List[Pos], candidates: List[Candidate]) -> List[Future]:
+        """
+        Splits the candidates evenly between the workers, to be scored against
+        the last state, with the units in moved moved to their positions first.
+        The results of the futures, in order, line up with the candidates
+        """
+        executor = self.get_executor()
+        chunk_size = math.ceil(len(candidates) / self.num_workers)
+        return [executor.submit(_score, self.state_id, self.state_path, unit_nid, behaviour_idx,
+                                moved, valid_moves, candidates[idx:idx + chunk_size])
+                for idx in range(0, len(candidates), chunk_size)]
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+_pool: Optional[AIWorkerPool] = None
+
+def get_pool() -> Optional[AIWorkerPool]:
+    """Returns the worker pool, or None if parallel AI is turned off"""
+    global _pool
+    num_workers = int(cf.SETTINGS.get('ai_workers', 0))
+    if num_workers <= 0:
+        if _pool:
+            _pool.shutdown()
+            _pool = None
+        return None
+    if not _pool or _pool.num_workers != num_workers:
+        if _pool:
+            _pool.shutdown()
+        _pool = AIWorkerPool(num_workers)
+    return _pool
@@ -1,5 +1,6 @@
 from app.constants import TILEHEIGHT, TILEWIDTH
 from app.engine import engine, image_mods
+from app.engine.image_cache import IMAGE_CACHE
 from app.utilities import utils
 
 # Generic Animation Object
@@ -8,10 +9,7 @@ from app.utilities import utils
 class Animation():
     def __init__(self, anim, position, delay=0, loop=False, hold=False, reverse=False, speed_adj: float = 1, contingent=False):
         self.nid = anim.nid
-        if not anim.image:
-            anim.image = engine.image_load(anim.full_path)
-            anim.image = anim.image.convert_alpha()
-        self.sprite = anim.image
+        self.sprite = IMAGE_CACHE.load(anim, 'image', anim.full_path, convert_alpha=True)
         self.xy_pos = position
         self.position = position
         self.frame_x, self.frame_y = anim.frame_x, anim.frame_y
@@ -3,6 +3,7 @@ from typing import List, Tuple
 from app.constants import WINWIDTH, WINHEIGHT
 from app.data.resources.resources import RESOURCES
 from app.engine import engine, image_mods
+from app.engine.image_cache import IMAGE_CACHE
 from app.engine.sprites import SPRITES
 from app.utilities import utils
 
@@ -47,12 +48,8 @@ class PanoramaBackground():
     def __init__(self, panorama, speed=125, loop=True):
         self.counter = 0
         self.panorama = panorama
-        if not self.panorama.images:
-            for path in self.panorama.get_all_paths():
-                image = engine.image_load(path)
-                if image.get_size() != (WINWIDTH, WINHEIGHT):
-                    image = engine.transform_scale(image, (WINWIDTH, WINHEIGHT))
-                self.panorama.images.append(image)
+        # Keep our own reference, since the cache can let go of the panorama's
+        self.images = IMAGE_CACHE.load_all(self.panorama, 'images', self.panorama.get_all_paths(), self.fit_to_screen)
 
         self.speed = speed
         self.loop = loop
@@ -73,6 +70,12 @@ class PanoramaBackground():
         self.paused = False
         self.pause_at = None
 
+    @staticmethod
+    def fit_to_screen(image):
+        if image.get_size() != (WINWIDTH, WINHEIGHT):
+            image = engine.transform_scale(image, (WINWIDTH, WINHEIGHT))
+        return image
+
     def set_shake(self, shake_offset: List[Tuple[int, int]], duration: int = 0):
         self.shake_offset = shake_offset
         self.shake_idx = 0
@@ -135,7 +138,7 @@ class PanoramaBackground():
         surf.blit(image, (x, y))
 
     def draw(self, surf):
-        image = self.panorama.images[self.counter]
+        image = self.images[self.counter]
         if self.fade_state == 'normal':
             if image:
                 self._draw(surf, image)
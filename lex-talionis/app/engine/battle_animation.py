@@ -5,6 +5,9 @@ from app.data.database.database import DB
 from app.engine.sprites import SPRITES
 from app.engine.sound import get_sound_thread
 from app.engine import engine, image_mods, item_system, item_funcs, skill_system
+from app.engine.image_cache import IMAGE_CACHE, surface_bytes
+from app.engine.palette_cache import PALETTE_CACHE
+from app.engine.prefetch import PREFETCHER
 
 from app.data.resources.combat_anims import CombatAnimation, WeaponAnimation, EffectAnimation
 from app.data.resources.combat_palettes import Palette
@@ -14,26 +17,45 @@ import logging
 battle_anim_speed = 1
 battle_anim_registry = {}
 
+def register(unique_hash: str, battle_anim: 'BattleAnimation'):
+    """Remembers the animation with its palette applied, until the image cache needs the room"""
+    battle_anim_registry[unique_hash] = battle_anim
+    IMAGE_CACHE.track(('battle_anim', unique_hash), surface_bytes(list(battle_anim.image_directory.values())),
+                      lambda: battle_anim_registry.pop(unique_hash, None))
+
+def get_anim_hash(combat_anim, weapon_anim, palette_name, palette) -> str:
+    return combat_anim.nid + '_' + weapon_anim.nid + '_' + palette_name + '_' + palette.nid
+
 class BattleAnimation():
     idle_poses = {'Stand', 'RangedStand', 'TransformStand'}
 
     @classmethod
     def get_anim(cls, combat_anim, weapon_anim, palette_name, palette, unit, item):
-        unique_hash = combat_anim.nid + '_' + weapon_anim.nid + '_' + palette_name + '_' + palette.nid
+        unique_hash = get_anim_hash(combat_anim, weapon_anim, palette_name, palette)
         battle_anim = battle_anim_registry.get(unique_hash)
+        PREFETCHER.record_use(('battle_anim', unique_hash), bool(battle_anim))
         if battle_anim:
             if battle_anim.unit and battle_anim.unit is not unit:
-                # There's already a unit using this animation, just make a new one, I guess
-                battle_anim = cls(weapon_anim, palette_name, palette, unit, item)
+                # There's already a unit using this animation, so make a new one that shares its frames
+                battle_anim = cls(weapon_anim, palette_name, palette, unit, item, battle_anim.image_directory)
             else:
                 battle_anim.unit = unit
                 battle_anim.item = item
                 battle_anim.clear()
         else:
             battle_anim = cls(weapon_anim, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = battle_anim
+            register(unique_hash, battle_anim)
+        IMAGE_CACHE.touch(('battle_anim', unique_hash))
         return battle_anim
 
+    @classmethod
+    def prefetch(cls, combat_anim, weapon_anim, palette_name, palette):
+        """Applies the palette ahead of time, so the next get_anim for it is free.
+        Safe to call from the prefetch thread"""
+        unique_hash = get_anim_hash(combat_anim, weapon_anim, palette_name, palette)
+        if unique_hash not in battle_anim_registry:
+            register(unique_hash, cls(weapon_anim, palette_name, palette, None, None))
+
     @classmethod
     def get_effect_anim(cls, effect, palette_name, palette, unit, item):
         unique_hash = effect.nid + '_' + palette_name + '_' + palette.nid
@@ -43,7 +65,8 @@ class BattleAnimation():
             child_effect = cls(effect, palette_name, palette, unit, item, image_directory)
         else:
             child_effect = cls(effect, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = child_effect
+            register(unique_hash, child_effect)
+        IMAGE_CACHE.touch(('battle_anim', unique_hash))
         return child_effect
 
     def __init__(self, anim_prefab: WeaponAnimation, palette_name: str,
@@ -58,10 +81,6 @@ class BattleAnimation():
         self._generate_missing_poses()
         self.current_pose = None
 
-        # Load frames as images
-        if not anim_prefab.image and anim_prefab.frames:
-            self.load_full_image()
-
         self._transform = anim_prefab.nid in ('Transform', 'Revert')
         self._refresh = anim_prefab.nid.endswith('Refresh')
 
@@ -144,27 +163,29 @@ class BattleAnimation():
         if 'Critical' not in self.poses and 'Attack' in self.poses:
             self.poses['Critical'] = self.poses['Attack']
 
-    def load_full_image(self):
-        # Only do load stuff if image does not exist already
-        image_full_path = self.anim_prefab.full_path
-        self.anim_prefab.image = engine.image_load(image_full_path, convert=True)
-        colors = self.current_palette.colors.values()
-        if COLORKEY in colors:
-            engine.set_colorkey(self.anim_prefab.image, COLORKEY, rleaccel=True)
-        else:  # Effects can use 0, 0, 0 as their colorkey
-            engine.set_colorkey(self.anim_prefab.image, (0, 0, 0), rleaccel=True)
-        for frame in self.anim_prefab.frames:
-            frame.image = engine.subsurface(self.anim_prefab.image, frame.rect)
+    def load_full_image(self) -> engine.Surface:
+        # The cache can let go of the image, and load it again, at any time,
+        # so whether it still needs its colorkey is read off the image itself
+        image = IMAGE_CACHE.load(self.anim_prefab, 'image', self.anim_prefab.full_path, convert=True)
+        if image.get_colorkey() is None:
+            colors = self.current_palette.colors.values()
+            if COLORKEY in colors:
+                engine.set_colorkey(image, COLORKEY, rleaccel=True)
+            else:  # Effects can use 0, 0, 0 as their colorkey
+                engine.set_colorkey(image, (0, 0, 0), rleaccel=True)
+        return image
 
     def apply_palette(self):
         self.image_directory = {}
+        if not self.anim_prefab.frames:
+            return
+        full_image = self.load_full_image()
         colors = self.current_palette.colors
         conversion_dict = {(0, coord[0], coord[1]): (color[0], color[1], color[2]) for coord, color in colors.items()}
+        converted_image = PALETTE_CACHE.get(('combat_anim', self.anim_prefab.full_path), full_image,
+                                            self.current_palette.nid, conversion_dict)
         for frame in self.anim_prefab.frames:
-            if not frame.image:  
-                frame.image = engine.subsurface(self.anim_prefab.image, frame.rect)
-            converted_image = image_mods.color_convert(engine.copy_surface(frame.image), conversion_dict)
-            self.image_directory[frame.nid] = converted_image
+            self.image_directory[frame.nid] = engine.subsurface(converted_image, frame.rect)
 
     def pair(self, owner, partner_anim, right, at_range, entrance_frames=0, position=None, parent=None):
         self.owner = owner
@@ -816,6 +837,16 @@ def get_palette(anim_prefab: CombatAnimation, unit) -> tuple:
     return palette_name, current_palette
 
 def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, allow_transform=False, allow_revert=False) -> BattleAnimation:
+    found = find_battle_anim(unit, item, distance, klass, default_variant, allow_transform, allow_revert)
+    if not found:
+        return found
+    res, weapon_anim, palette_name, palette = found
+    battle_anim = BattleAnimation.get_anim(res, weapon_anim, palette_name, palette, unit, item)
+    return battle_anim
+
+def find_battle_anim(unit, item, distance=1, klass=None, default_variant=False, allow_transform=False, allow_revert=False) -> tuple:
+    """Picks the combat animation, weapon animation and palette that get_battle_anim would use.
+    Returns False if the item never has a battle anim, and None if one could not be found"""
     # Some items never want to have a battle anim
     if item_system.force_map_anim(unit, item):
         return False
@@ -897,5 +928,4 @@ def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, a
                     logging.warning("Could not find spell animation for effect %s in weapon anim %s", effect, weapon_anim_nid)
                     return None
 
-    battle_anim = BattleAnimation.get_anim(res, weapon_anim, palette_name, palette, unit, item)
-    return battle_anim
+    return res, weapon_anim, palette_name, palette
@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from functools import lru_cache
 
 from app.engine import engine
+from app.engine.text_cache import TEXT_CACHE
 
 @dataclass
 class CharGlyph():
@@ -23,6 +24,8 @@ class BmpFont():
         self._width = 8
         self.height = 16
         self.memory: Dict[str, Dict[str, Tuple[engine.Surface, int]]] = {}
+        # Color -> Whether its surface is only ever fully transparent or fully opaque
+        self._binary_alpha: Dict[str, bool] = {}
 
         with open(self.idx_path, 'r', encoding='utf-8') as fp:
             for x in fp.readlines():
@@ -96,6 +99,63 @@ class BmpFont():
         if not color:
             color = self.default_color
 
+        string = self.modify_string(string)
+        if not string:
+            return
+
+        if self._is_binary_alpha(color):
+            text_surf, left, spans = TEXT_CACHE.get(self, string, color)
+            if len(spans) == 1:
+                engine.blit(surf, text_surf, (pos[0] + left, pos[1]))
+            else:
+                for x, width in spans:
+                    engine.blit(surf, text_surf, (pos[0] + left + x, pos[1]), (x, 0, width, self.height))
+        else:
+            self._blit_chars(string, surf, pos, color)
+
+    def render(self, string: str, color: str) -> Tuple[engine.Surface, int, List[Tuple[int, int]]]:
+        """
+        Returns string, already modified, drawn on its own surface, how far
+        left of the position the surface needs to be blitted, and the spans
+        of columns, as (x, width), that characters were actually drawn in.
+        A character wider than the font leaves a gap that drawing
+        character by character would never have touched
+        """
+        lefts = []
+        left = 0
+        for c in string:
+            lefts.append(left)
+            char_width = self.chartable[c].char_width if c in self.chartable else 8
+            left += char_width + self.space_offset
+        min_left = min(lefts)
+        width = max(lefts) + self._width - min_left
+        text_surf = engine.create_surface((width, self.height), transparent=True)
+        self._blit_chars(string, text_surf, (-min_left, 0), color)
+
+        spans = []
+        for left in sorted(lefts):
+            x = left - min_left
+            if spans and x <= spans[-1][0] + spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], x + self._width - spans[-1][0]))
+            else:
+                spans.append((x, self._width))
+        return text_surf, min_left, spans
+
+    def _is_binary_alpha(self, color: str) -> bool:
+        """
+        Whether every pixel of the font in this color is either fully
+        transparent or fully opaque. Only then does drawing the string on
+        its own surface first come out exactly the same as drawing it
+        straight onto the destination, since partly transparent characters
+        that overlap would otherwise be blended together first
+        """
+        if color not in self._binary_alpha:
+            base_surf = self.surfaces.get(color, self.surfaces['default'])
+            alphas = engine.surf_to_raw(base_surf, 'RGBA')[3::4]
+            self._binary_alpha[color] = not alphas.translate(None, b'\x00\xff')
+        return self._binary_alpha[color]
+
+    def _blit_chars(self, string: str, surf, pos, color: str):
         def normal_render(left, top, string: str, bcolor):
             for c in string:
                 c_surf, char_width = self._get_char_from_surf(c, bcolor)
@@ -111,8 +171,6 @@ class BmpFont():
 
         x, y = pos
 
-        string = self.modify_string(string)
-
         if self.stacked:
             stacked_render(x, y, string, color)
         else:
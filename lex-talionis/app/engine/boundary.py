@@ -1,12 +1,13 @@
 from app.engine.objects.unit import UnitObject
-from app.utilities.typing import Color3, NID, Point
-from typing import Dict, Tuple
+from app.utilities.typing import Color3, NID, Point, Pos
+from typing import Dict, Set, Tuple
 from app.constants import TILEWIDTH, TILEHEIGHT
 
 from app.data.database.database import DB
 from app.engine.sprites import SPRITES
-from app.engine import engine, equations, image_mods, aura_funcs
+from app.engine import engine, equations, image_mods, aura_funcs, skill_system
 from app.engine.game_state import game
+from app.engine.movement import movement_funcs
 
 class BoundaryInterface():
     draw_order = ('all_spell', 'all_attack', 'spell', 'attack')
@@ -38,6 +39,21 @@ class BoundaryInterface():
                              'spell': {},
                              'movement': {}}
 
+        # grid of sets. Each set contains the unit nids whose frontier
+        # (every position they can reach, plus every position adjacent to those)
+        # contains that spot. Only a unit arriving at or leaving a position
+        # in a unit's frontier can change where that unit can move
+        self.frontier_grid = self.init_grid()
+        # Key: Unit NID, Value: set of positions in that unit's frontier
+        self.frontiers: Dict[NID, Set[Pos]] = {}
+        # Key: Unit NID, Value: bumped whenever a unit arrives at or leaves
+        # a position in that unit's frontier
+        self.occupancy_versions: Dict[NID, int] = {}
+        # Key: Unit NID, Value: (cache key, positions the unit can reach)
+        self.reachable_cache: Dict[NID, Tuple[tuple, Set[Pos]]] = {}
+        # Unit NIDs whose ranges will be recalculated on the next update
+        self.dirty_units: Set[NID] = set()
+
         self.draw_flag = False
         self.all_on_flag = False
 
@@ -47,10 +63,12 @@ class BoundaryInterface():
 
         self.surf = None
         self.fog_of_war_surf = None
+        self.fog_of_war_generation: int = 0  # Fog generation of the board that fog_of_war_surf shows
         self.aura_surf = None
         self.should_reset_surf: bool = False
         self.should_reset_aura_surf: bool = False
         self.frozen: bool = False  # Whether I should update my display surf (generally False, for immediate updates)
+        self.version: int = 0  # Bumped whenever any of the display surfs change
 
     def get_color_square(self, color: Color3):
         color = tuple(color)
@@ -90,7 +108,7 @@ class BoundaryInterface():
 
     def reset_fog_of_war(self):
         self.reset_surf()  # Also needs to reset surf since the units you can see in fog of war may have changed
-        self.fog_of_war_surf = None
+        # The fog of war surf catches up with the board's fog generation on its own
 
     def _set(self, positions, mode, nid):
         grid = self.grids[mode]
@@ -108,8 +126,13 @@ class BoundaryInterface():
             for x in range(self.width):
                 for y in range(self.height):
                     self.grids[m][x * self.height + y].clear()
+        if not mode:
+            for cell in self.frontier_grid:
+                cell.clear()
+            self.frontiers.clear()
         self.reset_surf()
         self.reset_fog_of_war()
+        self.fog_of_war_surf = None
 
     def register_unit_auras(self, unit):
         for aura_info in aura_funcs.get_all_aura_info(unit):
@@ -127,8 +150,36 @@ class BoundaryInterface():
             del self.registered_auras[key]
         self.should_reset_aura_surf = True
 
+    def _get_reachable(self, unit) -> Set[Pos]:
+        """Returns every position the unit could reach with its full movement, not including witch warp.
+
+        Reuses the last result for this unit unless its position, movement, movement group,
+        or the occupancy of its frontier have changed since then.
+        """
+        key = (unit.position, equations.parser.movement(unit), movement_funcs.get_movement_group(unit),
+               skill_system.pass_through(unit), unit.team, self.occupancy_versions.get(unit.nid, 0))
+        cached = self.reachable_cache.get(unit.nid)
+        if cached and cached[0] == key:
+            return cached[1]
+        reachable = game.path_system.get_valid_moves(unit, force=True, witch_warp=False)
+        # With AI fog of war, what the unit can move through also depends on what it can see
+        if not DB.constants.value('ai_fog_of_war'):
+            self.reachable_cache[unit.nid] = (key, reachable)
+        return reachable
+
+    def _set_frontier(self, reachable: Set[Pos], nid: NID):
+        frontier = set(reachable)
+        for (x, y) in reachable:
+            frontier.update(((x, y + 1), (x + 1, y), (x - 1, y), (x, y - 1)))
+        frontier = {(x, y) for (x, y) in frontier if 0 <= x < self.width and 0 <= y < self.height}
+        for (x, y) in frontier:
+            self.frontier_grid[x * self.height + y].add(nid)
+        self.frontiers[nid] = frontier
+
     def _add_unit(self, unit):
-        valid_moves = game.path_system.get_valid_moves(unit, force=True)
+        reachable = self._get_reachable(unit)
+        self._set_frontier(reachable, unit.nid)
+        valid_moves = reachable | set(skill_system.witch_warp(unit))
         if DB.constants.value('zero_move') and unit.get_ai() and not game.ai_group_active(unit.ai_group):
             ai_prefab = DB.ai.get(unit.get_ai())
             guard = ai_prefab.guard_ai()
@@ -152,58 +203,65 @@ class BoundaryInterface():
                 for (x, y) in self.dictionaries[mode][unit.nid]:
                     grid[x * self.height + y].discard(unit.nid)
                 # del self.dictionaries[mode][unit.nid]
+        for (x, y) in self.frontiers.pop(unit.nid, ()):
+            self.frontier_grid[x * self.height + y].discard(unit.nid)
         self.reset_surf()
 
-    def recalculate_unit(self, unit: UnitObject):
-        if unit.team in self.enemy_teams:
+    def _touch(self, unit, pos: Pos):
+        """Marks every unit whose frontier contains pos, and who could be blocked by unit, for recalculation"""
+        x, y = pos
+        for nid in self.frontier_grid[x * self.height + y]:
+            other_unit = game.get_unit(nid)
+            if other_unit and unit.team not in DB.teams.get_allies(other_unit.team):
+                self.occupancy_versions[nid] = self.occupancy_versions.get(nid, 0) + 1
+                self.dirty_units.add(nid)
+
+    def update(self):
+        """Recalculates the ranges of every unit that was marked as dirty
+        since the last update. Called once per frame before drawing,
+        so many arrivals and departures in one frame only cause one recalculation per unit.
+        """
+        if not self.dirty_units:
+            return
+        dirty_units = self.dirty_units
+        self.dirty_units = set()
+        for nid in dirty_units:
+            unit = game.get_unit(nid)
+            if not unit:
+                continue
             self._remove_unit(unit)
-            if unit.position:
+            if unit.position and unit.team in self.enemy_teams:
                 self._add_unit(unit)
 
+    def recalculate_unit(self, unit: UnitObject):
+        if unit.team in self.enemy_teams:
+            self.dirty_units.add(unit.nid)
+
     def leave(self, unit):
         if unit.team in self.enemy_teams:
             self._remove_unit(unit)
+            self.dirty_units.discard(unit.nid)
 
         # Update ranges of other units that might be affected by my leaving
         if unit.position:
-            x, y = unit.position
-            other_units = {game.get_unit(nid) for nid in self.grids['movement'][x * self.height + y]}
-            other_units = {other_unit for other_unit in other_units if unit.team not in DB.teams.get_allies(other_unit.team)}
-
-            # Set unit's position to non-existent for a brief momement
-            game.board.remove_unit(unit.position, unit)
-            unit.position = None
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
-            unit.position = (x, y)  # Reset it back for future
-            game.board.set_unit(unit.position, unit)
+            self._touch(unit, unit.position)
 
     def arrive(self, unit):
         if unit.position:
             if unit.team in self.enemy_teams:
-                self._add_unit(unit)
+                self.dirty_units.add(unit.nid)
 
             # Update ranges of other units that might be affected by my arrival
-            x, y = unit.position
-            # print(self.grids['movement'][x * self.height + y])
-            other_units = {game.get_unit(nid) for nid in self.grids['movement'][x * self.height + y]}
-            other_units = {other_unit for other_unit in other_units if unit.team not in DB.teams.get_allies(other_unit.team)}
-
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
+            self._touch(unit, unit.position)
 
     # Called when map changes
     def reset(self):
         self.clear()
+        self.reachable_cache.clear()
+        self.dirty_units.clear()
         for unit in game.units:
             if unit.position and unit.team in self.enemy_teams:
-                self._add_unit(unit)
+                self.dirty_units.add(unit.nid)
 
     def toggle_all_enemy_attacks(self):
         if self.all_on_flag:
@@ -219,7 +277,22 @@ class BoundaryInterface():
         self.all_on_flag = False
         self.reset_surf()
 
-    def draw_auras(self, surf, full_size, cull_rect):
+    def prepare(self, full_size) -> tuple:
+        """
+        Brings the aura, boundary, and fog of war surfs up to date, without
+        drawing them. Returns a key that only changes when what the draw
+        functions would draw changes, so the map view can tell whether it
+        needs to draw them again
+        """
+        self._prepare_auras(full_size)
+        if self.draw_flag:
+            self._prepare_surf(full_size)
+        fog_of_war = bool(game.level_vars.get('_fog_of_war', False) or game.board.fog_region_set)
+        if fog_of_war:
+            self._prepare_fog_of_war(full_size)
+        return (self, self.version, self.draw_flag, fog_of_war)
+
+    def _prepare_auras(self, full_size):
         if self.should_reset_aura_surf and not self.frozen:
             self.aura_surf = None
             self.should_reset_aura_surf = False
@@ -233,6 +306,10 @@ class BoundaryInterface():
                 for x, y in tiles_to_color:
                     image = self.get_color_square(aura_color)
                     self.aura_surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
+            self.version += 1
+
+    def draw_auras(self, surf, full_size, cull_rect):
+        self._prepare_auras(full_size)
         im = engine.subsurface(self.aura_surf, cull_rect)
         surf.blit(im, (0, 0))
         return surf
@@ -241,11 +318,21 @@ class BoundaryInterface():
         if not self.draw_flag:
             return surf
 
+        self._prepare_surf(full_size)
+
+        im = engine.subsurface(self.surf, cull_rect)
+        surf.blit(im, (0, 0))
+        return surf
+
+    def _prepare_surf(self, full_size):
+        self.update()
+
         if self.should_reset_surf and not self.frozen:
             self.surf = None
             self.should_reset_surf = False
 
         if not self.surf:
+            self.version += 1
             self.surf = engine.create_surface(full_size, transparent=True)
             for grid_name in self.draw_order:
                 # Check whether we can skip this boundary interface
@@ -300,10 +387,6 @@ class BoundaryInterface():
                             image = self.create_image(new_grid, x, y, grid_name)
                             self.surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
 
-        im = engine.subsurface(self.surf, cull_rect)
-        surf.blit(im, (0, 0))
-        return surf
-
     def create_image(self, grid, x, y, grid_name):
         top_pos = (x, y - 1)
         left_pos = (x - 1, y)
@@ -334,22 +417,41 @@ class BoundaryInterface():
 
     def draw_fog_of_war(self, surf, full_size, cull_rect):
         if game.level_vars.get('_fog_of_war', False) or game.board.fog_region_set:
-            if not self.fog_of_war_surf:
-                self.fog_of_war_surf = engine.create_surface(full_size, transparent=True)
-                for y in range(self.height):
-                    for x in range(self.width):
-                        if not game.board.in_vision((x, y)):
-                            if game.level_vars.get('_fog_of_war_type', 0) == 2:
-                                image = self.fog_of_war_tile2
-                            else:
-                                image = self.fog_of_war_tile1
-                            self.fog_of_war_surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
-
+            self._prepare_fog_of_war(full_size)
             im = engine.subsurface(self.fog_of_war_surf, cull_rect)
             surf.blit(im, (0, 0))
         return surf
 
+    def _prepare_fog_of_war(self, full_size):
+        changed = None
+        if self.fog_of_war_surf and self.fog_of_war_generation != game.board.fog_generation:
+            changed = game.board.get_fog_changes(self.fog_of_war_generation)
+            if changed is None:
+                self.fog_of_war_surf = None
+        if not self.fog_of_war_surf:
+            self.fog_of_war_surf = engine.create_surface(full_size, transparent=True)
+            for y in range(self.height):
+                for x in range(self.width):
+                    self._draw_fog_tile(x, y)
+            self.version += 1
+        elif changed:
+            # Only redraw the tiles whose vision changed
+            for x, y in changed:
+                engine.fill(self.fog_of_war_surf, (0, 0, 0, 0), (x * TILEWIDTH, y * TILEHEIGHT, TILEWIDTH, TILEHEIGHT))
+                self._draw_fog_tile(x, y)
+            self.version += 1
+        self.fog_of_war_generation = game.board.fog_generation
+
+    def _draw_fog_tile(self, x: int, y: int):
+        if not game.board.in_vision((x, y)):
+            if game.level_vars.get('_fog_of_war_type', 0) == 2:
+                image = self.fog_of_war_tile2
+            else:
+                image = self.fog_of_war_tile1
+            self.fog_of_war_surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
+
     def print_grid(self, mode):
+        self.update()
         for y in range(self.height):
             print("%02d|" % y, end="")
             for x in range(self.width):
@@ -142,33 +142,40 @@ def generate_skill_hook_str(hook_name: str, hook_info: HookInfo):
 
     conditional_check = "condition(skill, unit)" if 'item' not in args else 'condition(skill, unit, item)'
     default_handling = "return result"
-    unconditional_handling = ""
     if hook_info.has_default_value:
         default_handling = "return result if values else Defaults.{hook_name}({args})".format(hook_name=hook_name, args=', '.join(args))
+
+    # Only loops over the components that actually implement this hook
+    # See get_implementers in skill_system_base
     if hook_info.has_unconditional:
-        unconditional_handling = """
-            if component.defines('{hook_name}_unconditional'):
-                values.append(component.{hook_name}_unconditional({args}))
-""".format(hook_name=hook_name, args=', '.join(args))
+        dispatch = """
+    for skill, component in get_implementers(unit, '{hook_name}', '{hook_name}_unconditional'):
+        if component.defines('{hook_name}'):
+            if component.ignore_conditional or {conditional_check}:
+                values.append(component.{hook_name}({args}))
+        if component.defines('{hook_name}_unconditional'):
+            values.append(component.{hook_name}_unconditional({args}))
+"""
+    else:
+        dispatch = """
+    for skill, component in get_implementers(unit, '{hook_name}'):
+        if component.ignore_conditional or {conditional_check}:
+            values.append(component.{hook_name}({args}))
+"""
+    dispatch = dispatch.format(hook_name=hook_name,
+                               conditional_check=conditional_check,
+                               args=', '.join(args))
 
     func_text = """
 def {hook_name}({func_signature}):
-    values = []
-    for skill in unit.skills[:]:
-        for component in skill.components:
-            if component.defines('{hook_name}'):
-                if component.ignore_conditional or {conditional_check}:
-                    values.append(component.{hook_name}({args}))
-{unconditional_handling}
+    values = []{dispatch}
     result = utils.{policy_resolution}(values)
     {default_handling}
 """.format(hook_name=hook_name,
            func_signature=', '.join(func_signature),
-           conditional_check=conditional_check,
-           args=', '.join(args),
+           dispatch=dispatch,
            policy_resolution=hook_info.policy.value,
-           default_handling=default_handling,
-           unconditional_handling=unconditional_handling)
+           default_handling=default_handling)
 
     return func_text
 
@@ -168,6 +168,39 @@ class Defaults():
 
 def reset_cache():
     condition.cache_clear()
+    reset_hook_index()
+
+# Bumped whenever any skill gains or loses a component,
+# which invalidates every unit's hook index
+_component_generation = 0
+
+def reset_hook_index():
+    """
+    Call whenever a component is added to or removed from a skill
+    so that every unit rebuilds its hook index
+    """
+    global _component_generation
+    _component_generation += 1
+
+def get_implementers(unit, *hook_names: str) -> list:
+    """
+    Returns a (skill, component) pair for every component on the unit's skills
+    that defines any of the hook_names, in the same order as looping over unit.skills.
+
+    Each unit keeps an index of hook names to implementers. The index is thrown away
+    whenever a skill is added to or removed from the unit or when any skill's
+    components change, and is filled in lazily one hook at a time.
+    """
+    index = unit._skill_hook_index
+    if not index or index[0] != unit._skills_version or index[1] != _component_generation:
+        index = (unit._skills_version, _component_generation, {})
+        unit._skill_hook_index = index
+    implementers = index[2].get(hook_names)
+    if implementers is None:
+        implementers = [(skill, component) for skill in unit.skills for component in skill.components
+                        if any(component.defines(hook_name) for hook_name in hook_names)]
+        index[2][hook_names] = implementers
+    return implementers
 
 @lru_cache(65535)
 def condition(skill, unit: UnitObject, item=None) -> bool:
@@ -187,55 +220,48 @@ def hidden(skill, unit) -> bool:
 
 def stat_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('stat_change'):
-                d = component.stat_change(unit)
-                d_bonus = d.get(stat_nid, 0)
-                if d_bonus == 0:
-                    continue
-                # Why did we write the component condition check after the evaluation of the bonus?
-                # Was there a good reason?
-                if component.ignore_conditional or condition(skill, unit):
-                    bonus += d_bonus
+    for skill, component in get_implementers(unit, 'stat_change'):
+        d = component.stat_change(unit)
+        d_bonus = d.get(stat_nid, 0)
+        if d_bonus == 0:
+            continue
+        # Why did we write the component condition check after the evaluation of the bonus?
+        # Was there a good reason?
+        if component.ignore_conditional or condition(skill, unit):
+            bonus += d_bonus
     return bonus
 
 def subtle_stat_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('subtle_stat_change'):
-                d = component.subtle_stat_change(unit)
-                d_bonus = d.get(stat_nid, 0)
-                if d_bonus == 0:
-                    continue
-                if component.ignore_conditional or condition(skill, unit):
-                    bonus += d_bonus
+    for skill, component in get_implementers(unit, 'subtle_stat_change'):
+        d = component.subtle_stat_change(unit)
+        d_bonus = d.get(stat_nid, 0)
+        if d_bonus == 0:
+            continue
+        if component.ignore_conditional or condition(skill, unit):
+            bonus += d_bonus
     return bonus
 
 def stat_change_contribution(unit, stat_nid) -> dict:
     contribution = {}
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('stat_change') and not component.defines('subtle_stat_change'):
-                if component.ignore_conditional or condition(skill, unit):
-                    d = component.stat_change(unit)
-                    val = d.get(stat_nid, 0)
-                    if val != 0:
-                        if skill.name in contribution:
-                            contribution[skill.name] += val
-                        else:
-                            contribution[skill.name] = val
+    for skill, component in get_implementers(unit, 'stat_change'):
+        if not component.defines('subtle_stat_change'):
+            if component.ignore_conditional or condition(skill, unit):
+                d = component.stat_change(unit)
+                val = d.get(stat_nid, 0)
+                if val != 0:
+                    if skill.name in contribution:
+                        contribution[skill.name] += val
+                    else:
+                        contribution[skill.name] = val
     return contribution
 
 def growth_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('growth_change'):
-                if component.ignore_conditional or condition(skill, unit):
-                    d = component.growth_change(unit)
-                    bonus += d.get(stat_nid, 0)
+    for skill, component in get_implementers(unit, 'growth_change'):
+        if component.ignore_conditional or condition(skill, unit):
+            d = component.growth_change(unit)
+            bonus += d.get(stat_nid, 0)
     return bonus
 
 def unit_sprite_flicker_tint(unit) -> list:
@@ -461,21 +487,19 @@ def item_override(unit, item: ItemObject):
     components_so_far = set()
     if not unit or not item:
         return all_override_components
-    for skill in reversed(unit.skills):
-        for component in skill.components:
-            if component.nid == 'item_override':
-                # Conditions for item overrides might rely on e.g.
-                # what item is equipped, which would itself
-                # make an item override call on the same skill.
-                # Therefore, we simply assume - probably safely -
-                # that the skill cannot influence its own condition.
-                if skill.nid not in item_override_recursion_stack:
-                    item_override_recursion_stack.add(skill.nid)
-                    if condition(skill, unit):
-                        new_override_components = list(component.get_components(unit))
-                        new_override_components = [comp for comp in new_override_components if comp.nid not in components_so_far]
-                        components_so_far |= set([comp.nid for comp in new_override_components])
-                        all_override_components += new_override_components
-                    item_override_recursion_stack.remove(skill.nid)
-                break
+    for skill, component in reversed(get_implementers(unit, 'get_components')):
+        if component.nid == 'item_override':
+            # Conditions for item overrides might rely on e.g.
+            # what item is equipped, which would itself
+            # make an item override call on the same skill.
+            # Therefore, we simply assume - probably safely -
+            # that the skill cannot influence its own condition.
+            if skill.nid not in item_override_recursion_stack:
+                item_override_recursion_stack.add(skill.nid)
+                if condition(skill, unit):
+                    new_override_components = list(component.get_components(unit))
+                    new_override_components = [comp for comp in new_override_components if comp.nid not in components_so_far]
+                    components_so_far |= set([comp.nid for comp in new_override_components])
+                    all_override_components += new_override_components
+                item_override_recursion_stack.remove(skill.nid)
     return all_override_components
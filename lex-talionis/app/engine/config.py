@@ -11,6 +11,7 @@ def read_config_file():
                          ('sound_buffer_size', 2),
                          ('animation', 'Always'),
                          ('display_fps', 0),
+                         ('profile', 0),
                          ('battle_bg', 0),
                          ('unit_speed', 120),
                          ('text_speed', 32),
@@ -29,6 +30,10 @@ def read_config_file():
                          ('hp_map_team', 'All'),
                          ('hp_map_cull', 'All'),
                          ('display_hints', 0),
+                         ('persist_event_cache', 0),
+                         ('image_cache_mb', 64),
+                         ('music_cache_mb', 64),
+                         ('ai_workers', 0),
                          ('key_SELECT', 'K_x'),
                          ('key_BACK', 'K_z'),
                          ('key_INFO', 'K_c'),
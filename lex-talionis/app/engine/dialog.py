@@ -1,6 +1,6 @@
 from enum import Enum
 import re
-from typing import Callable, List
+from typing import Callable, List, Optional, Tuple
 
 from app.constants import WINHEIGHT, WINWIDTH
 from app.engine import config as cf
@@ -132,6 +132,8 @@ class Dialog():
         self.text_index = 0
         self.total_num_updates = 0
         self.y_offset = 0 # How much to move lines (for when a new line is spawned)
+        self._text_surf_key = None
+        self._text_surf = None
 
         self.should_move_mouth = 'no_talk' not in flags
         self.should_speak_sound = 'no_sound' not in flags
@@ -501,7 +503,22 @@ class Dialog():
         return True
 
     def draw_text(self, surf):
-        end_x_pos, end_y_pos = 0, 0
+        # The text only changes when a character is added or the lines scroll,
+        # so most frames can reuse the last text surface
+        key = (tuple(self.text_lines), self.y_offset, self.num_lines, self.font_type, self.font_color,
+               self.text_width, self.text_height)
+        if key != self._text_surf_key:
+            self._text_surf_key = key
+            self._text_surf = self._render_text()
+        text_surf, end_x_pos, end_y_pos = self._text_surf
+        surf.blit(text_surf, (self.position[0] + 8, self.position[1] + 8))
+        if end_x_pos is None:
+            return 0, 0
+        return self.position[0] + 8 + end_x_pos, self.position[1] + 8 + end_y_pos
+
+    def _render_text(self) -> Tuple[engine.Surface, Optional[int], Optional[int]]:
+        """Returns the text lines drawn on their own surface, and where the last line ends on it"""
+        end_x_pos, end_y_pos = None, None
         text_surf = engine.create_surface((self.text_width, self.text_height), transparent=True)
 
         # Draw line that's disappearing
@@ -526,11 +543,10 @@ class Dialog():
             render_text(text_surf, [self.font_type], [line], [self.font_color], (x_pos, y_set))
             x_pos += width
 
-            end_x_pos = self.position[0] + 8 + x_pos
-            end_y_pos = self.position[1] + 8 + y_pos
+            end_x_pos = x_pos
+            end_y_pos = y_pos
 
-        surf.blit(text_surf, (self.position[0] + 8, self.position[1] + 8))
-        return end_x_pos, end_y_pos
+        return text_surf, end_x_pos, end_y_pos
 
     def draw_tail(self, surf, portrait: event_portrait.EventPortrait):
         portrait_x = portrait.position[0] + portrait.get_width()//2
@@ -6,6 +6,7 @@ from app import lt_log
 
 from app.constants import WINWIDTH, WINHEIGHT, VERSION, FPS
 from app.engine import engine
+from app.engine.profiler import PROFILER
 from app.data.database.database import DB
 
 import app.engine.config as cf
@@ -19,6 +20,10 @@ def start(title, from_editor=False):
 
     from app.engine import sprites
     sprites.load_images()
+    if from_editor:
+        # The editor may have changed project since the fonts were first loaded
+        from app.engine import fonts
+        fonts.reload_fonts()
 
     # Hack to get icon to show up in windows
     try:
@@ -55,8 +60,32 @@ def save_screenshot(raw_events: list, surf):
         current_time = str(datetime.now()).replace(' ', '_').replace(':', '.')
         engine.save_surface(surf, 'screenshots/LT_%s.bmp' % current_time)
 
+def check_profiler(raw_events: list):
+    for e in raw_events:
+        if e.type == engine.KEYDOWN and e.key == engine.key_map['f10']:
+            PROFILER.toggle()
+        elif e.type == engine.KEYDOWN and e.key == engine.key_map['f11'] and PROFILER.frames:
+            current_time = str(datetime.now()).replace(' ', '_').replace(':', '.')
+            path = PROFILER.dump('saves/traces/LT_%s.json' % current_time)
+            logging.info("Wrote profiler trace to %s", path)
+
+def draw_profile(surf, num_scopes=10):
+    from app.engine.fonts import FONT
+    frame_ms, scopes = PROFILER.breakdown()
+    width = 144
+    bg = engine.create_surface((width, 10 * (len(scopes[:num_scopes]) + 1) + 2), transparent=True)
+    bg.fill((0, 0, 0, 160))
+    surf.blit(bg, (0, 0))
+    FONT['small-white'].blit('frame', surf, (2, 0))
+    FONT['small-white'].blit_right('%.1f' % frame_ms, surf, (width - 2, 0))
+    for idx, (name, ms) in enumerate(scopes[:num_scopes], 1):
+        FONT['small-white'].blit(name, surf, (2, 10 * idx))
+        FONT['small-white'].blit_right('%.2f' % ms, surf, (width - 2, 10 * idx))
+
 def draw_fps(surf, fps_records):
     from app.engine.fonts import FONT
+    from app.engine.game_state import game
+    from app.engine.text_cache import TEXT_CACHE
     total_time = sum(fps_records)
     num_frames = len(fps_records)
     fps = int(num_frames / (total_time / 1000))
@@ -65,6 +94,12 @@ def draw_fps(surf, fps_records):
 
     FONT['small-white'].blit(str(fps), surf, (surf.get_width() - 20, 0))
     FONT['small-white'].blit(str(min_fps), surf, (surf.get_width() - 20, 12))
+    # Percent of strings drawn from the text cache
+    FONT['small-white'].blit(str(int(TEXT_CACHE.hit_rate * 100)), surf, (surf.get_width() - 20, 24))
+    # Layers of the map that had to be drawn again this frame
+    recomposed_layers = getattr(game.map_view, 'recomposed_layers', None)
+    if recomposed_layers is not None:
+        FONT['small-white'].blit(str(recomposed_layers), surf, (surf.get_width() - 20, 36))
 
 def check_soft_reset(game, inp) -> bool:
     return game.state.current() != 'title_start' and \
@@ -87,6 +122,8 @@ def run(game):
     clock = engine.Clock()
     fps_records = collections.deque(maxlen=FPS)
     inp = get_input_manager()
+    if cf.SETTINGS['profile']:
+        PROFILER.enable()
 
     _error_mode = False
     _error_msg = ''
@@ -95,11 +132,13 @@ def run(game):
         engine.update_time()
         fps_records.append(engine.get_delta())
         # print(engine.get_delta())
+        PROFILER.next_frame()
 
         raw_events = engine.get_events()
 
         if raw_events == engine.QUIT:
             break
+        check_profiler(raw_events)
 
         event = inp.process_input(raw_events)
 
@@ -127,6 +166,8 @@ def run(game):
 
                 if cf.SETTINGS['display_fps']:
                     draw_fps(surf, fps_records)
+                if PROFILER.enabled:
+                    draw_profile(surf)
             except Exception as e:
                 logging.exception("Game crashed with exception.")
                 log_file_loc = lt_log.get_log_dir() or ''
@@ -68,10 +68,14 @@ def on_end(crash=False):
     cf.save_settings()
 
 # === timing functions ===
-def update_time():
+def update_time(delta: int = None):
     # All measured in milliseconds
     constants['last_time'] = constants['current_time']
-    constants['current_time'] = pygame.time.get_ticks()
+    if delta is None:
+        constants['current_time'] = pygame.time.get_ticks()
+    else:
+        # Step forward a fixed amount, however long the frame really took
+        constants['current_time'] += delta
     constants['delta_t'] = constants['current_time'] - constants['last_time']
 
 def get_time() -> int:
@@ -222,6 +226,8 @@ key_map = {"enter": pygame.K_RETURN,
            "tab": pygame.K_TAB,
            "backspace": pygame.K_BACKSPACE,
            "pageup": pygame.K_PAGEUP,
+           "f10": pygame.K_F10,
+           "f11": pygame.K_F11,
            "f12": pygame.K_F12,
            "`": pygame.K_BACKQUOTE,
            "1": pygame.K_1,
@@ -257,6 +263,9 @@ MOUSEBUTTONDOWN = pygame.MOUSEBUTTONDOWN
 MOUSEBUTTONUP = pygame.MOUSEBUTTONUP
 MOUSEMOTION = pygame.MOUSEMOTION
 
+def make_key_event(event_type, key: int):
+    return pygame.event.Event(event_type, key=key)
+
 def get_pressed():
     return pygame.key.get_pressed()
 
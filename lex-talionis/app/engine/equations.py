@@ -2,6 +2,18 @@ import re, functools
 
 from app.data.database.database import DB
 
+# The unit state generation. Bumped whenever anything that could change the
+# result of an equation changes (stats, skills, items, equipment, position).
+# Equation results are only reused within a single generation.
+_generation = 0
+
+def bump_generation():
+    global _generation
+    _generation += 1
+
+def get_generation() -> int:
+    return _generation
+
 class Parser():
     def __init__(self):
         self.equations = {}
@@ -15,11 +27,37 @@ class Parser():
             expression = self.equations[nid]
             self.fix(nid, expression, self.replacement_dict)
 
+        # Key: (equation nid, id(unit)), Value: (unit, result)
+        # Keeping the unit in the value means its id cannot be reused while the entry exists
+        self._cache = {}
+        self._cache_generation = _generation
+        # Wrap each equation so that repeated calls within one generation are dictionary hits
+        # Sub-equations are looked up through self.equations too, so they are also cached
+        for nid in list(self.equations.keys()):
+            if not nid.startswith('__'):
+                self.equations[nid] = self._memoize(nid, self.equations[nid])
+
         # Now add these equations as local functions
         for nid in self.equations.keys():
             if not nid.startswith('__'):
                 setattr(self, nid.lower(), functools.partial(self.equations[nid], self.equations))
 
+    def _memoize(self, nid, func):
+        cache = self._cache
+
+        def memoized(equations, unit):
+            if self._cache_generation != _generation:
+                cache.clear()
+                self._cache_generation = _generation
+            key = (nid, id(unit))
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[1]
+            result = func(equations, unit)
+            cache[key] = (unit, result)
+            return result
+        return memoized
+
     def tokenize(self, s: str) -> str:
         return re.split('([^a-zA-Z_])', s)
 
@@ -1,3 +1,4 @@
+import functools
 import logging
 import math, random, re
 from typing import Any, Dict
@@ -16,14 +17,40 @@ Essentially just a repository that imports a lot of different things so that man
 will be accepted
 """
 
-def get_context(unit1=None, unit2=None, position=None,
-                local_args: Dict = None, game=None) -> Dict:
+# Key: (game, query engine), Value: namespace shared by every eval for that game
+_base_namespace = (None, None, {})
+
+def get_base_namespace(game) -> Dict:
     """
-    Returns the local + global namespace context to be used for evaling expressions
+    Returns the part of the eval namespace that does not change between calls:
+    this module's globals, the game, and the query engine functions.
+    Built once per game and then reused
     """
-    if not game:
-        from app.engine.game_state import game
+    global _base_namespace
+    cached_game, cached_query_engine, namespace = _base_namespace
+    if cached_game is not game or cached_query_engine is not game.query_engine:
+        namespace = globals().copy()
+        namespace['game'] = game
+        namespace.update(game.query_engine.func_dict)
+        _base_namespace = (game, game.query_engine, namespace)
+    return namespace
 
+class _Namespace(dict):
+    """
+    Holds only the per-call bindings, and falls back
+    to the shared base namespace for everything else
+    """
+    __slots__ = ('base',)
+
+    def __init__(self, base: Dict, bindings: Dict):
+        super().__init__(bindings)
+        self.base = base
+
+    def __missing__(self, key):
+        return self.base[key]
+
+def _get_bindings(unit1=None, unit2=None, position=None,
+                  local_args: Dict = None, game=None) -> Dict:
     def check_pair(s1: str, s2: str) -> bool:
         """
         Determines whether two units are in combat with one another
@@ -46,8 +73,7 @@ def get_context(unit1=None, unit2=None, position=None,
         else:
             return False
 
-    temp_globals = globals().copy()
-    temp_globals.update({
+    bindings = {
         'unit1': unit1,
         'unit': unit1,
         'unit2': unit2,
@@ -55,17 +81,31 @@ def get_context(unit1=None, unit2=None, position=None,
         'position': position,
         'check_pair': check_pair,
         'check_default': check_default,
-        'game': game,
         'target_system': game.target_system,
-    })
-    if game:
-        temp_globals.update(game.query_engine.func_dict)
+    }
     if local_args:
-        temp_globals.update(local_args)
-    return temp_globals
+        bindings.update(local_args)
+    return bindings
+
+def get_context(unit1=None, unit2=None, position=None,
+                local_args: Dict = None, game=None) -> Dict:
+    """
+    Returns the local + global namespace context to be used for evaling expressions
+    """
+    if not game:
+        from app.engine.game_state import game
+
+    context = get_base_namespace(game).copy()
+    context.update(_get_bindings(unit1, unit2, position, local_args, game))
+    return context
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(string: str):
+    return compile(string, '<string>', 'eval')
 
 def evaluate(string: str, unit1=None, unit2=None, position=None,
              local_args: Dict = None, game=None) -> Any:
-    context = get_context(unit1, unit2, position, local_args, game)
-    string = string.strip()
-    return eval(string, context)
+    if not game:
+        from app.engine.game_state import game
+    context = _Namespace(get_base_namespace(game), _get_bindings(unit1, unit2, position, local_args, game))
+    return eval(compile_expression(string.strip()), context)
@@ -88,29 +88,45 @@ stat.colors['purple'] = ((184, 184, 248, 255), (104, 156, 184, 255), (0, 120, 15
 
 font_types = [text, narrow, small, info, nconvo, convo, iconvo, bconvo, chapter, stat]
 
-# Load in default, uncolored fonts
 FONT: Dict[NID, bmpfont.BmpFont] = {}
-for font in RESOURCES.fonts.values():
-    title = font.nid.split('-')[0]
-    idx_path = font.full_path.replace(font.nid, title).replace('.png', '.idx')
-    FONT[font.nid] = bmpfont.BmpFont(font.full_path, idx_path)
-    # new, general font objects
-    FONT[title] = bmpfont.BmpFont(font.full_path, idx_path)
-
-# Convert colors
-for font_type in font_types:
-    FONT[font_type.name].surfaces[font_type.default] = FONT[font_type.name].surfaces['default']
-    for color, value in font_type.colors.items():
-        if color == font_type.default:
-            continue
-        text = FONT[font_type.name + '-' + font_type.default]
-        new_text = font_type.name + '-' + color
-        FONT[new_text] = bmpfont.BmpFont(text.png_path, text.idx_path)
-        dic = {a: b for a, b in zip(font_type.colors[font_type.default], font_type.colors[color])}
-        color_surf = image_mods.color_convert_alpha(FONT[new_text].surfaces['default'], dic)
-        FONT[new_text].surfaces['default'] = color_surf
-
-        # new: add colors to new, generalized font objects
-        # the above code is left intact for legacy purposes
-        title = font_type.name
-        FONT[title].surfaces[color] = color_surf
+
+def load_fonts():
+    """Loads every font of the current project into FONT, replacing any already there"""
+    FONT.clear()
+    # Load in default, uncolored fonts
+    for font in RESOURCES.fonts.values():
+        title = font.nid.split('-')[0]
+        idx_path = font.full_path.replace(font.nid, title).replace('.png', '.idx')
+        FONT[font.nid] = bmpfont.BmpFont(font.full_path, idx_path)
+        # new, general font objects
+        FONT[title] = bmpfont.BmpFont(font.full_path, idx_path)
+
+    # Convert colors
+    for font_type in font_types:
+        FONT[font_type.name].surfaces[font_type.default] = FONT[font_type.name].surfaces['default']
+        for color, value in font_type.colors.items():
+            if color == font_type.default:
+                continue
+            text = FONT[font_type.name + '-' + font_type.default]
+            new_text = font_type.name + '-' + color
+            FONT[new_text] = bmpfont.BmpFont(text.png_path, text.idx_path)
+            dic = {a: b for a, b in zip(font_type.colors[font_type.default], font_type.colors[color])}
+            color_surf = image_mods.color_convert_alpha(FONT[new_text].surfaces['default'], dic)
+            FONT[new_text].surfaces['default'] = color_surf
+
+            # new: add colors to new, generalized font objects
+            # the above code is left intact for legacy purposes
+            title = font_type.name
+            FONT[title].surfaces[color] = color_surf
+
+def reload_fonts():
+    """For when the project, and so its fonts, may have changed since they were loaded"""
+    from app.engine.graphics.text import text_renderer
+    from app.engine.text_cache import TEXT_CACHE
+    load_fonts()
+    # Text layouts are measured with the fonts, by nid,
+    # and strings rendered with the old fonts are never drawn again
+    text_renderer._layout.cache_clear()
+    TEXT_CACHE.clear()
+
+load_fonts()
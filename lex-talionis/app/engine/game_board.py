@@ -5,6 +5,8 @@ from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
 from app.data.database.database import DB
 from app.engine import line_of_sight
+from app.engine.pathfinding.cost_grid import CostGrid
+from app.engine.pathfinding.field_cache import DistanceFieldCache
 from app.engine.pathfinding.node import Node
 from app.engine.game_state import game
 from app.utilities.grid import Grid, BoundedGrid
@@ -19,6 +21,10 @@ class GameBoard(object):
         self.height: int = tilemap.height
         self.bounds: Tuple[int, int, int, int] = (0, 0, self.width - 1, self.height - 1)
         self.mcost_grids: Dict[NID, Grid[Node]] = {}
+        # Same information as mcost_grids, but compact and never mutated by the pathfinders
+        self.cost_grids: Dict[NID, CostGrid] = {}
+        # Distances to goals, shared by every unit that paths the same way
+        self.distance_fields = DistanceFieldCache()
 
         self.reset_tile_grids(tilemap)
 
@@ -26,24 +32,34 @@ class GameBoard(object):
         self.team_grid: Grid[List[NID]] = self.initialize_list_grid()
         # Keeps track of which unit occupies which tile
         self.unit_grid: Grid[List[UnitObject]] = self.initialize_list_grid()
+        # Every position that has at least one unit on it
+        self.occupied_positions: Set[Pos] = set()
 
         # Fog of War -- one for each team
-        self.fog_of_war_grids = {}
+        # Each cell is how many of the team's units can see that position
+        self.fog_of_war_grids: Dict[NID, Grid[int]] = {}
         for team in DB.teams:
-            self.fog_of_war_grids[team.nid] = self.init_set_grid()
+            self.fog_of_war_grids[team.nid] = self.init_count_grid()
         self.fow_vantage_point = {}  # Unit: Position where the unit is that's looking
+        # Key: Unit Nid, Value: (Team, Positions the unit is lighting up for that team)
+        self.fow_lit: Dict[NID, Tuple[NID, Set[Pos]]] = {}
         self.fog_regions = self.init_set_grid()
         self.fog_region_set = set()  # Set of Fog region nids so we can tell how many fog regions exist at all times
         self.vision_regions = self.init_set_grid()
+        # Key: Region Nid, Value: Positions the region covers in fog_regions or vision_regions
+        self.fog_region_positions: Dict[NID, Set[Pos]] = {}
+        self.vision_region_positions: Dict[NID, Set[Pos]] = {}
+        # Bumped whenever what can be seen on the board may have changed
+        self.fog_generation: int = 0
+        # Key: Fog generation, Value: Positions whose vision may have changed in that generation
+        # (None if any position might have)
+        self.fog_changes: Dict[int, Optional[Set[Pos]]] = {}
 
         # For Auras
         self.aura_grid = self.init_set_grid()
         # Key: Aura Skill Uid, Value: Set of positions
         self.known_auras = {}
 
-        # For opacity
-        self.opacity_grid = self.init_opacity_grid(tilemap)
-
     def set_bounds(self, min_x: int, min_y: int, max_x: int, max_y: int):
         self.bounds = (min_x, min_y, max_x, max_y)
 
@@ -65,7 +81,10 @@ class GameBoard(object):
                 mtype_grid.append(terrain.mtype)
         for mode in DB.mcost.unit_types:
             self.mcost_grids[mode] = self.init_movement_grid(mode, tilemap, mtype_grid)
+            self.cost_grids[mode] = self.init_cost_grid(self.mcost_grids[mode])
+        self.distance_fields.clear()
         self.opacity_grid = self.init_opacity_grid(tilemap)
+        self.visibility = line_of_sight.VisibilityCache(self.width, self.height, self.get_opacity)
 
     def reset_pos(self, tilemap, pos: Pos):
         terrain_nid = game.get_terrain_nid(tilemap, pos)
@@ -82,12 +101,18 @@ class GameBoard(object):
             else:
                 tile_cost = 1
             mcost_grid.insert(pos, Node(*pos, tile_cost < 99, tile_cost))
+            self.cost_grids[movement_group].insert(pos, tile_cost)
+        self.distance_fields.clear()
 
         # Opacity reset
+        old_opacity = self.opacity_grid.get(pos)
         if terrain:
             self.opacity_grid.insert(pos, terrain.opaque)
         else:
             self.opacity_grid.insert(pos, False)
+        if self.opacity_grid.get(pos) != old_opacity:
+            self.visibility.clear()
+            self.mark_fog_changed()
 
     # For movement
     def init_movement_grid(self, movement_group: NID, tilemap, mtype_grid: Grid[NID]) -> Grid[Node]:
@@ -103,9 +128,18 @@ class GameBoard(object):
 
         return grid
 
+    def init_cost_grid(self, movement_grid: Grid[Node]) -> CostGrid:
+        grid = CostGrid((self.width, self.height))
+        for node in movement_grid.cells():
+            grid.append(node.cost)
+        return grid
+
     def get_movement_grid(self, movement_group: NID) -> BoundedGrid[Node]:
         return self.mcost_grids[movement_group].apply_bounds(self.bounds)
 
+    def get_cost_grid(self, movement_group: NID) -> CostGrid:
+        return self.cost_grids[movement_group]
+
     def initialize_list_grid(self) -> Grid[List]:
         grid = Grid[List[NID]]((self.width, self.height))
         for x in range(self.width):
@@ -117,11 +151,14 @@ class GameBoard(object):
         if unit not in self.unit_grid.get(pos):
             self.unit_grid.get(pos).append(unit)
             self.team_grid.get(pos).append(unit.team)
+            self.occupied_positions.add(pos)
 
     def remove_unit(self, pos: Pos, unit: UnitObject):
         if unit in self.unit_grid.get(pos):
             self.unit_grid.get(pos).remove(unit)
             self.team_grid.get(pos).remove(unit.team)
+            if not self.unit_grid.get(pos):
+                self.occupied_positions.discard(pos)
 
     def get_unit(self, pos: Pos) -> Optional[UnitObject]:
         if not pos:
@@ -164,51 +201,107 @@ class GameBoard(object):
                 return True
         return False
 
+    def get_blocked_mask(self, team: NID) -> Set[int]:
+        """Returns the indices (x * height + y) of every tile that a unit
+        on the given team cannot move through. Equivalent to calling
+        can_move_through on every tile, but only has to look at occupied tiles"""
+        return {x * self.height + y for (x, y) in self.occupied_positions
+                if not self.can_move_through(team, (x, y))}
+
     # === Fog of War ===
+    def init_count_grid(self) -> Grid[int]:
+        grid = Grid[int]((self.width, self.height))
+        grid._cells = [0] * (self.width * self.height)
+        return grid
+
+    def mark_fog_changed(self, positions: Optional[Set[Pos]] = None):
+        """Records that what can be seen at these positions may have changed.
+        No positions means that what can be seen anywhere may have changed"""
+        self.fog_generation += 1
+        self.fog_changes[self.fog_generation] = positions
+        # Only need to remember the recent past
+        self.fog_changes.pop(self.fog_generation - 64, None)
+
+    def get_fog_changes(self, since_generation: int) -> Optional[Set[Pos]]:
+        """Returns every position whose vision may have changed after the given fog generation,
+        or None if that can't be known"""
+        changed = set()
+        for generation in range(since_generation + 1, self.fog_generation + 1):
+            if generation not in self.fog_changes or self.fog_changes[generation] is None:
+                return None
+            changed |= self.fog_changes[generation]
+        return changed
+
+    def _get_sphere(self, positions, radius: int) -> Set[Pos]:
+        sphere = set()
+        for pos in positions:
+            sphere |= game.target_system.find_manhattan_spheres(range(radius + 1), pos[0], pos[1])
+        return {pos for pos in sphere if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
+
     def update_fow(self, pos: Optional[Pos], unit: UnitObject, sight_range: int):
         """Modifies the state of the fog of war game board to reflect the unit moving to the pos"""
-        grid: Grid[List[UnitObject]] = self.fog_of_war_grids[unit.team]
+        old_team, old_positions = self.fow_lit.pop(unit.nid, (unit.team, set()))
+        self.fow_vantage_point[unit.nid] = pos or None
+        new_positions = self._get_sphere([pos], sight_range) if pos else set()
+        if new_positions:
+            self.fow_lit[unit.nid] = (unit.team, new_positions)
+        if old_team == unit.team:
+            removed, added = old_positions - new_positions, new_positions - old_positions
+        else:
+            removed, added = old_positions, new_positions
+        if not removed and not added:
+            return
+
+        changed = set()
         # Remove the old vision
-        self.fow_vantage_point[unit.nid] = None
-        for cell in grid.cells():
-            cell.discard(unit.nid)
+        grid = self.fog_of_war_grids[old_team]
+        for position in removed:
+            grid.insert(position, grid.get(position) - 1)
+            if not grid.get(position):
+                changed.add(position)
         # Add new vision
-        if pos:
-            self.fow_vantage_point[unit.nid] = pos
-            positions = game.target_system.find_manhattan_spheres(range(sight_range + 1), *pos)
-            positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
-            for position in positions:
-                grid.get(position).add(unit.nid)
+        grid = self.fog_of_war_grids[unit.team]
+        for position in added:
+            if not grid.get(position):
+                changed.add(position)
+            grid.insert(position, grid.get(position) + 1)
+        if DB.constants.value('fog_los'):
+            # Line of sight through every tile nearby may have changed
+            changed = old_positions | new_positions
+        self.mark_fog_changed(changed)
 
     def add_fog_region(self, region):
         if region.position:
             self.fog_region_set.add(region.nid)
             fog_range = int(region.sub_nid) if region.sub_nid else 0
-            positions = set()
-            for pos in region.get_all_positions():
-                positions |= game.target_system.find_manhattan_spheres(range(fog_range + 1), pos[0], pos[1])
-            positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
+            positions = self._get_sphere(region.get_all_positions(), fog_range)
+            self.fog_region_positions[region.nid] = positions
             for position in positions:
                 self.fog_regions.get(position).add(region.nid)
+            self.mark_fog_changed(positions)
 
     def remove_fog_region(self, region):
         self.fog_region_set.discard(region.nid)
-        for cell in self.fog_regions.cells():
-            cell.discard(region.nid)
+        positions = self.fog_region_positions.pop(region.nid, set())
+        for position in positions:
+            self.fog_regions.get(position).discard(region.nid)
+        # Removing the last fog region can turn off fog entirely
+        self.mark_fog_changed(positions if self.fog_region_set else None)
 
     def add_vision_region(self, region):
         if region.position:
             vision_range = int(region.sub_nid) if region.sub_nid else 0
-            positions = set()
-            for pos in region.get_all_positions():
-                positions |= game.target_system.find_manhattan_spheres(range(vision_range + 1), pos[0], pos[1])
-            positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
+            positions = self._get_sphere(region.get_all_positions(), vision_range)
+            self.vision_region_positions[region.nid] = positions
             for position in positions:
                 self.vision_regions.get(position).add(region.nid)
+            self.mark_fog_changed(positions)
 
     def remove_vision_region(self, region):
-        for cell in self.vision_regions.cells():
-            cell.discard(region.nid)
+        positions = self.vision_region_positions.pop(region.nid, set())
+        for position in positions:
+            self.vision_regions.get(position).discard(region.nid)
+        self.mark_fog_changed(positions)
 
     def in_vision(self, pos: Tuple[int, int], team: NID = 'player') -> bool:
         # Anybody can see things in vision regions no matter what
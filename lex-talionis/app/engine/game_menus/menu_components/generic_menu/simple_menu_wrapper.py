@@ -15,6 +15,7 @@ from app.engine.game_state import game
 from app.engine.graphics.ui_framework.ui_framework import UIComponent
 from app.engine.graphics.ui_framework.ui_framework_layout import convert_align
 from app.engine.icons import draw_chibi, get_icon, get_icon_by_nid
+from app.engine.image_cache import IMAGE_CACHE
 from app.engine.objects.item import ItemObject
 from app.engine.objects.unit import UnitObject
 from app.sprites import SPRITES
@@ -136,11 +137,9 @@ class SimpleMenuUI():
         portrait = RESOURCES.portraits.get(portrait_nid)
         if portrait:
             main_portrait_coords = (0, 0, 96, 80)
-            if not portrait.image:
-                portrait.image = engine.image_load(portrait.full_path)
-            portrait.image = portrait.image.convert()
-            engine.set_colorkey(portrait.image, COLORKEY, rleaccel=True)
-            main_portrait = engine.subsurface(portrait.image, main_portrait_coords)
+            image = IMAGE_CACHE.load(portrait, 'image', portrait.full_path, convert=True)
+            engine.set_colorkey(image, COLORKEY, rleaccel=True)
+            main_portrait = engine.subsurface(image, main_portrait_coords)
         else:
             main_portrait = engine.create_surface((96, 80))
         return (main_portrait, "", "")
@@ -6,6 +6,7 @@ from app.constants import COLORKEY
 from app.data.resources.resources import RESOURCES
 from app.engine import engine, help_menu, icons, text_funcs
 from app.engine.game_state import game
+from app.engine.image_cache import IMAGE_CACHE
 from app.engine.graphics.text.text_renderer import (anchor_align, render_text,
                                                     text_width)
 from app.sprites import SPRITES
@@ -186,12 +187,10 @@ class BasicPortraitOption(BaseOption[str]):
         portrait = RESOURCES.portraits.get(self._value)
         if portrait:
             main_portrait_coords = (0, 0, 96, 80)
-            if not portrait.image:
-                portrait.image = engine.image_load(portrait.full_path)
-            portrait.image = portrait.image.convert()
-            engine.set_colorkey(portrait.image, COLORKEY, rleaccel=True)
+            image = IMAGE_CACHE.load(portrait, 'image', portrait.full_path, convert=True)
+            engine.set_colorkey(image, COLORKEY, rleaccel=True)
             main_portrait = engine.subsurface(
-                portrait.image, main_portrait_coords)
+                image, main_portrait_coords)
             surf.blit(main_portrait, (x, y))
 
     def draw_highlight(self, surf, x, y, menu_width):
@@ -118,8 +118,9 @@ class GameState():
         self.clear()
 
     def on_alter_game_state(self):
-        from app.engine import skill_system
+        from app.engine import equations, skill_system
         skill_system.reset_cache()
+        equations.bump_generation()
 
     def is_displaying_overworld(self) -> bool:
         from app.engine.overworld.overworld_map_view import OverworldMapView
@@ -250,6 +251,7 @@ class GameState():
     def level_setup(self):
         from app.engine.initiative import InitiativeTracker
         from app.engine import action
+        from app.events import event_cache
 
         # Build party object for new parties
         if self.current_party not in self.parties:
@@ -287,6 +289,8 @@ class GameState():
             self.initiative = InitiativeTracker()
             self.initiative.start(self.get_all_units())
 
+        event_cache.warm_level(self.current_level.nid, bool(cf.SETTINGS['persist_event_cache']))
+
     def start_level(self, level_nid, with_party=None):
         """
         Done at the beginning of a new level to start the level up
@@ -409,7 +413,7 @@ class GameState():
         from app.engine.objects.skill import SkillObject
         from app.engine.objects.unit import UnitObject
         from app.engine.objects.region import RegionObject
-        from app.events import event_manager, speak_style
+        from app.events import event_cache, event_manager, speak_style
 
         logging.info("Loading Game...")
         self.game_vars = Counter(s_dict.get('game_vars', {}))
@@ -489,6 +493,7 @@ class GameState():
             logging.info("Loading Level...")
             self.current_level = LevelObject.restore(s_dict['level'], self)
             self.set_up_game_board(self.current_level.tilemap, s_dict.get('bounds'))
+            event_cache.warm_level(self.current_level.nid, bool(cf.SETTINGS['persist_event_cache']))
 
             self.generic()
             from app.engine.level_cursor import LevelCursor
@@ -531,6 +536,10 @@ class GameState():
 
         from app.engine import (action, item_funcs, item_system, skill_system,
                                 supports)
+        from app.engine.image_cache import IMAGE_CACHE
+        from app.engine.palette_cache import PALETTE_CACHE
+        from app.engine.prefetch import PREFETCHER
+        from app.engine.text_cache import TEXT_CACHE
 
         supports.increment_end_chapter_supports()
 
@@ -628,6 +637,10 @@ class GameState():
             self.sweep()
             self.current_level = None
             self.roam_info.clear()
+            IMAGE_CACHE.log_stats()
+            PALETTE_CACHE.log_stats()
+            PREFETCHER.log_stats()
+            TEXT_CACHE.log_stats()
         else:
             self.turncount = 1
             self.action_log.set_first_free_action()
@@ -19,7 +19,7 @@ from app.engine.game_state import game
 from app.engine import engine, action, menus, image_mods, \
     banner, save, phase, skill_system, item_system, \
     item_funcs, ui_view, base_surf, gui, background, dialog, \
-    text_funcs, equations, evaluate, supports
+    text_funcs, equations, evaluate, supports, prefetch
 from app.engine.combat import interaction
 from app.engine.selection_helper import SelectionHelper
 from app.engine.abilities import ABILITIES, PRIMARY_ABILITIES, OTHER_ABILITIES
@@ -51,16 +51,15 @@ class LoadingState(State):
         # load music used in the level
         self.level_nid = game.level_nid
         if game.level:
-            logging.debug("Loading music for level %s" % self.level_nid)
+            logging.debug("Loading assets for level %s" % self.level_nid)
             level_songs = set(game.level.music.values())
             inspector = DB.events.inspector
             for music_command in inspector.find_all_calls_of_command(event_commands.Music(), self.level_nid).values():
                 level_songs.add(music_command.parameters.get('Music'))
             for music_command in inspector.find_all_calls_of_command(event_commands.ChangeMusic(), self.level_nid).values():
                 level_songs.add(music_command.parameters.get('Music'))
-            loading_music_thread = threading.Thread(target=get_sound_thread().load_songs, args=[level_songs])
-            loading_music_thread.start()
-            self.loading_threads.append(loading_music_thread)
+            # Decodes the music, and then the sprites and animations the level is likely to need
+            self.loading_threads.append(prefetch.start_level(game, level_songs))
 
     def update(self):
         if not self.completed_time and not any([thread.is_alive() for thread in self.loading_threads]):
@@ -2391,12 +2390,7 @@ class AIState(MapState):
                 return None
 
         # Normal way
-        valid_units = [
-            unit for unit in game.units if
-            unit.position and
-            not unit.finished and
-            not unit.has_run_ai and
-            unit.team == game.phase.get_current()]
+        valid_units = self.get_valid_units()
         if not valid_units:
             return None
         # Check if any members of group
@@ -2412,13 +2406,31 @@ class AIState(MapState):
             else:
                 self.cur_group = None
         # So default to this
+        return self.sort_units(valid_units)[0]
+
+    def get_valid_units(self) -> list:
+        return [
+            unit for unit in game.units if
+            unit.position and
+            not unit.finished and
+            not unit.has_run_ai and
+            unit.team == game.phase.get_current()]
+
+    def sort_units(self, valid_units: list) -> list:
+        """Returns the units in the order they will take their turns"""
         # Sort by distance to closest enemy (ascending)
         valid_units = sorted(valid_units, key=lambda unit: game.target_system.distance_to_closest_enemy(unit))
         # Sort by ai priority
         valid_units = sorted(valid_units, key=lambda unit: DB.ai.get(unit.get_ai()).priority, reverse=True)
-        # Reverse, because we will be popping them off at the end
-        valid_units.reverse()
-        return valid_units.pop()
+        return valid_units
+
+    def plan_phase(self):
+        """Plans the rest of the phase at once, starting with the current unit"""
+        if DB.constants.value('initiative'):
+            units = [self.cur_unit]
+        else:
+            units = [self.cur_unit] + [unit for unit in self.sort_units(self.get_valid_units()) if unit is not self.cur_unit]
+        game.ai.planner.plan(units)
 
     def take_input(self, event):
         # Skip combats while START is held down
@@ -2438,6 +2450,8 @@ class AIState(MapState):
                 if self.cur_unit.position and self.cur_unit.previous_position != self.cur_unit.position:
                     action.do(action.SetPreviousPosition(self.cur_unit))
                 self.cur_group = self.cur_unit.ai_group
+                if game.ai.do_skip and not game.ai.planner.planned_phase:
+                    self.plan_phase()
             else:
                 self.cur_group = None
             # also resets AI
@@ -2472,6 +2486,9 @@ class AIState(MapState):
             logging.info("AI Phase complete")
             game.ai.end_skip()
             game.ai.reset()
+            game.ai.planner.clear()
+            game.board.distance_fields.log_stats()
+            game.board.distance_fields.clear()
             self.cur_unit = None
             self.cur_group = None
             # Clear all ai group info at the end of the turn
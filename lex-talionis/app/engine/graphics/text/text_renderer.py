@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import List, Tuple
 
 from app.engine import engine
@@ -48,36 +49,9 @@ def rendered_text_width(fonts: List[NID], texts: List[str]) -> int:
         return 0
     if len(fonts) < len(texts):
         fonts += [fonts[-1] for i in range(len(texts) - len(fonts))]
-    font_stack = list(reversed(fonts))
-    text_stack = list(reversed(texts))
-
-    base_font = fonts[-1]
-    font_history_stack = []
-    total_width = 0
-    while text_stack:
-        curr_text = text_stack.pop()
-        curr_font = font_stack.pop()
-        # process text for tags and push them onto stack for later processing
-        any_tags = MATCH_TAG_RE.search(curr_text)
-        if any_tags:
-            tag_start, tag_end = any_tags.span()
-            tag_font = any_tags.group().strip("<>")
-            if '/' in tag_font:
-                tag_font = font_history_stack.pop() if font_history_stack else base_font
-            else:
-                font_history_stack.append(curr_font)
-            text_stack.append(curr_text[tag_end:])
-            curr_text = curr_text[:tag_start]
-            if tag_font in FONT or tag_font == 'icon':
-                font_stack.append(tag_font)
-            else:
-                font_stack.append(curr_font)
-        # actually render font
-        if curr_font != 'icon':
-            total_width += FONT[curr_font].width(curr_text)
-        else:
-            total_width += 16
-    return total_width
+    # Colors never change the width
+    _, width = _layout(tuple(fonts), tuple(texts), (None,) * len(texts))
+    return width
 
 def text_width(font: NID, text: str) -> int:
     """Simply determines the width of the text
@@ -142,48 +116,18 @@ def remove_tags(text_block: List[str]) -> List[str]:
         new_text_block.append(new_line)
     return new_text_block
 
-def render_text(surf: engine.Surface, fonts: List[NID], texts: List[str], 
-                colors: List[NID | None], topleft: Tuple[int, int], 
-                align: HAlignment = HAlignment.LEFT) -> engine.Surface:
-    """An enhanced text render layer wrapper around BmpFont.
-    Supports multiple fonts and multiple text sections, as well as
-    embedded icons.
-
-    Args:
-        fonts (List[NID]): List of fonts to use to write text.
-        texts (List[str]): List of strings to write with corresponding fonts.
-        colors (List[str]): List of colors to write with corresponding fonts.
-
-    Returns:
-        engine.Surface: a surface that has text printed upon it.
-    """
-    if not fonts:
-        return
-    if not texts:
-        return
-    if not colors:
-        colors = [None]
-    if len(fonts) < len(texts):
-        fonts += [fonts[-1] for i in range(len(texts) - len(fonts))]
-    if len(colors) < len(texts):
-        colors += [colors[-1] for i in range(len(texts) - len(colors))]
+@lru_cache(maxsize=1024)
+def _layout(fonts: Tuple[NID, ...], texts: Tuple[str, ...], colors: Tuple[NID | None, ...]) -> Tuple[List[Tuple[NID, str, NID | None, int]], int]:
+    """Splits the text up by its tags, as (font, text, color, x offset) for each
+    section, and measures it. Cached, since the same strings are rendered every frame"""
     font_stack = list(reversed(fonts))
     text_stack = list(reversed(texts))
     color_stack = list(reversed(colors))
 
-    # for non-left alignments
-    if align == HAlignment.CENTER or align == HAlignment.RIGHT:
-        width = rendered_text_width(fonts, texts)
-        tx, ty = topleft
-        if align == HAlignment.CENTER:
-            tx -= width//2
-        elif align == HAlignment.RIGHT:
-            tx -= width
-    else:
-        tx, ty = topleft
-
     base_font = fonts[-1]
     font_history_stack = []
+    segments = []
+    tx = 0
     while text_stack:
         curr_text = text_stack.pop()
         curr_font = font_stack.pop()
@@ -206,11 +150,50 @@ def render_text(surf: engine.Surface, fonts: List[NID], texts: List[str],
             curr_text = curr_text[:tag_start]
             font_stack.append(tag_font)
             color_stack.append(tag_color)
-        # actually render font
+        segments.append((curr_font, curr_text, curr_color, tx))
         if curr_font != 'icon':
-            FONT[curr_font].blit(curr_text, surf, (tx, ty), curr_color)
             tx += FONT[curr_font].width(curr_text)
         else:
-            draw_icon_by_alias(surf, curr_text.strip(), (tx, ty))
             tx += 16
+    return segments, tx
+
+def render_text(surf: engine.Surface, fonts: List[NID], texts: List[str], 
+                colors: List[NID | None], topleft: Tuple[int, int], 
+                align: HAlignment = HAlignment.LEFT) -> engine.Surface:
+    """An enhanced text render layer wrapper around BmpFont.
+    Supports multiple fonts and multiple text sections, as well as
+    embedded icons.
+
+    Args:
+        fonts (List[NID]): List of fonts to use to write text.
+        texts (List[str]): List of strings to write with corresponding fonts.
+        colors (List[str]): List of colors to write with corresponding fonts.
+
+    Returns:
+        engine.Surface: a surface that has text printed upon it.
+    """
+    if not fonts:
+        return
+    if not texts:
+        return
+    if not colors:
+        colors = [None]
+    if len(fonts) < len(texts):
+        fonts += [fonts[-1] for i in range(len(texts) - len(fonts))]
+    if len(colors) < len(texts):
+        colors += [colors[-1] for i in range(len(texts) - len(colors))]
+    segments, width = _layout(tuple(fonts), tuple(texts), tuple(colors))
+
+    # for non-left alignments
+    tx, ty = topleft
+    if align == HAlignment.CENTER:
+        tx -= width//2
+    elif align == HAlignment.RIGHT:
+        tx -= width
+
+    for curr_font, curr_text, curr_color, x_offset in segments:
+        if curr_font != 'icon':
+            FONT[curr_font].blit(curr_text, surf, (tx + x_offset, ty), curr_color)
+        else:
+            draw_icon_by_alias(surf, curr_text.strip(), (tx + x_offset, ty))
     return surf
@@ -0,0 +1,203 @@
+"""
+Runs the engine without a window, as fast as it will go, with the input
+read from a script instead of the keyboard. Useful for timing a whole
+chapter, or for playing through one on a machine without a display.
+
+Scripts have one command per line. Anything after a # is a comment.
+
+    wait 60             # Do nothing for 60 frames
+    SELECT              # Press and release SELECT
+    DOWN 3              # Press and release DOWN three times
+    hold RIGHT 20       # Hold RIGHT down for 20 frames
+    wait_for free 600   # Wait until the free state is on top, for up to 600 frames
+
+Time passes a fixed FRAMERATE milliseconds each frame, however long the
+frame really took, and assets are finished loading before the next frame,
+so a script plays out the same way on a fast machine as on a slow one.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from app.constants import FRAMERATE, WINWIDTH, WINHEIGHT
+from app.engine import config as cf
+from app.engine import engine
+
+BUTTONS = ('UP', 'DOWN', 'LEFT', 'RIGHT', 'SELECT', 'BACK', 'INFO', 'AUX', 'START')
+
+class ScriptTimeout(Exception):
+    pass
+
+class InputScript():
+    def __init__(self, commands: List[Tuple[str, str, int]]):
+        # (Command, Button or state nid, Count)
+        self.commands = commands
+
+    @classmethod
+    def parse(cls, text: str) -> InputScript:
+        commands = []
+        for line_num, line in enumerate(text.splitlines(), 1):
+            words = line.split('#', 1)[0].split()
+            if not words:
+                continue
+            try:
+                if words[0] == 'wait' and len(words) == 2:
+                    commands.append(('wait', None, int(words[1])))
+                elif words[0] == 'wait_for' and len(words) in (2, 3):
+                    commands.append(('wait_for', words[1], int(words[2]) if len(words) == 3 else 3600))
+                elif words[0] == 'hold' and len(words) == 3 and words[1] in BUTTONS:
+                    commands.append(('hold', words[1], int(words[2])))
+                elif words[0] in BUTTONS and len(words) in (1, 2):
+                    commands.append(('tap', words[0], int(words[1]) if len(words) == 2 else 1))
+                else:
+                    raise ValueError()
+            except ValueError:
+                raise ValueError("Line %d of input script is not a valid command: %s" % (line_num, line.strip()))
+        return cls(commands)
+
+    @classmethod
+    def load(cls, path: str) -> InputScript:
+        with open(path) as fp:
+            return cls.parse(fp.read())
+
+    def _key_event(self, event_type, button: str):
+        return engine.make_key_event(event_type, cf.SETTINGS['key_' + button])
+
+    def frames(self, current_state: Callable[[], str]) -> Iterator[list]:
+        """
+        Yields the key events for each frame, until the script runs out
+        """
+        for command, arg, count in self.commands:
+            if command == 'wait':
+                for _ in range(count):
+                    yield []
+            elif command == 'tap':
+                for _ in range(count):
+                    yield [self._key_event(engine.KEYDOWN, arg)]
+                    yield [self._key_event(engine.KEYUP, arg)]
+            elif command == 'hold':
+                yield [self._key_event(engine.KEYDOWN, arg)]
+                for _ in range(count - 1):
+                    yield []
+                yield [self._key_event(engine.KEYUP, arg)]
+            elif command == 'wait_for':
+                for _ in range(count):
+                    if current_state() == arg:
+                        break
+                    yield []
+                else:
+                    raise ScriptTimeout("Waited %d frames for %s, but %s is still on top" % (count, arg, current_state()))
+
+@dataclass
+class StateTiming():
+    frames: int = 0
+    total: float = 0
+    longest: float = 0
+
+class StateTimings():
+    """How long the game spent updating and drawing each state, keyed by the state on top at the start of the frame"""
+    def __init__(self):
+        self.states: Dict[str, StateTiming] = {}
+        self.frames: int = 0
+        self.total: float = 0
+
+    def add(self, state: str, seconds: float):
+        timing = self.states.get(state)
+        if not timing:
+            timing = self.states[state] = StateTiming()
+        timing.frames += 1
+        timing.total += seconds
+        timing.longest = max(timing.longest, seconds)
+        self.frames += 1
+        self.total += seconds
+
+    def report(self) -> str:
+        lines = ["%-24s %7s %10s %9s %9s" % ('State', 'Frames', 'Total ms', 'Mean ms', 'Max ms')]
+        for state, timing in sorted(self.states.items(), key=lambda item: -item[1].total):
+            lines.append("%-24s %7d %10.1f %9.2f %9.2f" % (state, timing.frames, timing.total * 1000,
+                                                         timing.total * 1000 / timing.frames, timing.longest * 1000))
+        lines.append("%-24s %7d %10.1f %9.2f" % ('All', self.frames, self.total * 1000,
+                                                 self.total * 1000 / self.frames if self.frames else 0))
+        lines.append("%.1f seconds of game time at %.0f frames per second" %
+                     (self.frames * FRAMERATE / 1000, self.frames / self.total if self.total else 0))
+        return '\n'.join(lines)
+
+def load(project: str):
+    """Loads the project without a window or sound device"""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    from app.data.database.database import DB
+    from app.data.resources.resources import RESOURCES
+    from app.engine import driver
+
+    RESOURCES.load(project)
+    DB.load(project)
+    driver.start(DB.constants.value('title'), from_editor=True)
+
+def start_level(level_nid: str = None):
+    """
+    Starts the level, or the DEBUG level if there is one, or else the
+    first level, like test play does
+    """
+    from app.data.database.database import DB
+    from app.engine import game_state
+
+    if not level_nid:
+        level_nid = 'DEBUG' if 'DEBUG' in DB.levels.keys() else DB.levels[0].nid
+    return game_state.start_level(level_nid)
+
+def start(project: str, level_nid: str = None):
+    load(project)
+    return start_level(level_nid)
+
+def run(game, script: InputScript, max_frames: int = None, timings: StateTimings = None) -> StateTimings:
+    """
+    Plays the script through the game as fast as possible, with nothing
+    pushed to the display and no frame cap. Unlike driver.run, errors are
+    raised instead of shown on screen.
+
+    The script can be anything with a frames method like InputScript's
+    """
+    from app.engine.game_counters import ANIMATION_COUNTERS
+    from app.engine.input_manager import get_input_manager
+    from app.engine.prefetch import PREFETCHER
+    from app.engine.profiler import PROFILER
+    from app.engine.sound import get_sound_thread
+
+    ANIMATION_COUNTERS.reset()
+    get_sound_thread().reset()
+
+    surf = engine.create_surface((WINWIDTH, WINHEIGHT))
+    inp = get_input_manager()
+    if timings is None:
+        timings = StateTimings()
+
+    for frame, script_events in enumerate(script.frames(game.state.current)):
+        if max_frames is not None and frame >= max_frames:
+            break
+        engine.update_time(FRAMERATE)
+        PROFILER.next_frame()
+        raw_events = engine.get_events()
+        if raw_events == engine.QUIT:
+            break
+        raw_events = raw_events + script_events
+        event = inp.process_input(raw_events)
+
+        state = game.state.current()
+        start_time = time.perf_counter()
+        surf, repeat = game.state.update(event, surf)
+        while repeat:  # Let's the game traverse through state chains
+            surf, repeat = game.state.update([], surf)
+        timings.add(state, time.perf_counter() - start_time)
+        # So the level starts on the same frame no matter how fast this machine loads it
+        PREFETCHER.join()
+
+        get_sound_thread().update(raw_events)
+        game.playtime += FRAMERATE
+
+    logging.info("Headless run finished after %d frames in %s", timings.frames, game.state.current())
+    return timings
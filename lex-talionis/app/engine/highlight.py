@@ -30,6 +30,7 @@ class HighlightController():
 
         self.formation_highlights = []
         self.escape_highlights = []
+        self.version: int = 0  # Bumped whenever which highlights are shown changes
 
     def check_in_move(self, position):
         return position in self.highlights['move']
@@ -40,6 +41,7 @@ class HighlightController():
                 self.highlights[k].discard(position)
         self.highlights[name].add(position)
         self.transitions[name] = self.starting_cutoff
+        self.version += 1
 
     def add_highlights(self, positions: set, name: str, allow_overlap: bool = False):
         if not allow_overlap:
@@ -47,6 +49,7 @@ class HighlightController():
                 self.highlights[k] -= positions
         self.highlights[name] |= positions
         self.transitions[name] = self.starting_cutoff
+        self.version += 1
 
     def remove_highlights(self, name=None):
         if name:
@@ -57,9 +60,11 @@ class HighlightController():
                 self.highlights[k].clear()
                 self.transitions[k] = self.starting_cutoff
         self.current_hover = None
+        self.version += 1
 
     def remove_aura_highlights(self):
         self.highlights['aura'].clear()
+        self.version += 1
 
     def handle_hover(self):
         hover_unit = game.cursor.get_hover()
@@ -109,13 +114,34 @@ class HighlightController():
 
     def show_formation(self, positions: list):
         self.formation_highlights += positions
+        self.version += 1
 
     def hide_formation(self):
         self.formation_highlights.clear()
+        self.version += 1
 
     def update(self):
         self.update_idx = (self.update_idx + 1) % 64
 
+    def _escape_regions(self) -> list:
+        return [region for region in game.level.regions
+                if region.region_type == RegionType.EVENT and region.sub_nid in ('Escape', 'Arrive')]
+
+    def get_layer_key(self):
+        """
+        Returns a key that only changes when what draw would draw changes,
+        or None while highlights are still growing in, since draw has to
+        run every frame to grow them
+        """
+        shown = [name for name, highlight_set in self.highlights.items() if highlight_set]
+        if any(self.transitions[name] for name in shown):
+            return None
+        escape_regions = tuple((region.nid, tuple(region.position), tuple(region.size))
+                               for region in self._escape_regions() if region.position)
+        # Which frame of the highlight animation is showing only matters if anything is highlighted
+        frame = self.update_idx//4 if shown or escape_regions or self.formation_highlights else None
+        return (self, self.version, frame, escape_regions)
+
     def draw(self, surf, cull_rect):
         # Handle Formation Highlight
         formation_image = SPRITES.get('highlight_blue')
@@ -128,10 +154,9 @@ class HighlightController():
         escape_image = SPRITES.get('highlight_yellow')
         rect = (self.update_idx//4 * TILEWIDTH, 0, TILEWIDTH, TILEHEIGHT)
         escape_image = engine.subsurface(escape_image, rect)
-        for region in game.level.regions:
-            if (region.region_type == RegionType.EVENT and region.sub_nid in ('Escape', 'Arrive')):
-                for position in region.get_all_positions():
-                    surf.blit(escape_image, (position[0] * TILEWIDTH - cull_rect[0], position[1] * TILEHEIGHT - cull_rect[1]))
+        for region in self._escape_regions():
+            for position in region.get_all_positions():
+                surf.blit(escape_image, (position[0] * TILEWIDTH - cull_rect[0], position[1] * TILEHEIGHT - cull_rect[1]))
 
         # Regular highlights
         for name, highlight_set in self.highlights.items():
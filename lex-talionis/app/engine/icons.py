@@ -7,6 +7,7 @@ from app.data.database.database import DB
 from app.engine.sprites import SPRITES
 from app.engine.fonts import FONT
 from app.engine import engine, skill_system, image_mods
+from app.engine.image_cache import IMAGE_CACHE
 from app.engine.game_state import game
 
 def get_icon_by_name(name) -> engine.Surface:
@@ -131,9 +132,7 @@ def get_portrait(unit) -> tuple:
     image = RESOURCES.portraits.get(unit.portrait_nid)
     if image:
         offset = image.info_offset
-        if not image.image:
-            image.image = engine.image_load(image.full_path)
-        image = engine.subsurface(image.image, (0, 0, 96, 80))
+        image = engine.subsurface(IMAGE_CACHE.load(image, 'image', image.full_path), (0, 0, 96, 80))
     else:  # Generic class portrait
         klass = DB.classes.get(unit.klass)
         image = RESOURCES.icons80.get(klass.icon_nid)
@@ -153,9 +152,7 @@ def get_portrait_from_nid(portrait_nid) -> tuple:
     image = RESOURCES.portraits.get(portrait_nid)
     if image:
         offset = image.info_offset
-        if not image.image:
-            image.image = engine.image_load(image.full_path)
-        image = engine.subsurface(image.image, (0, 0, 96, 80))
+        image = engine.subsurface(IMAGE_CACHE.load(image, 'image', image.full_path), (0, 0, 96, 80))
         image = image.convert()
         engine.set_colorkey(image, COLORKEY, rleaccel=True)
     else:
@@ -174,9 +171,8 @@ def draw_portrait(surf, unit, topleft=None, bottomright=None):
     return surf
 
 def get_chibi(portrait):
-    if not portrait.image:
-        portrait.image = engine.image_load(portrait.full_path)
-    image = engine.subsurface(portrait.image, (portrait.image.get_width() - 32, 16, 32, 32))
+    portrait_image = IMAGE_CACHE.load(portrait, 'image', portrait.full_path, convert=True)
+    image = engine.subsurface(portrait_image, (portrait_image.get_width() - 32, 16, 32, 32))
     image = image.convert()
     engine.set_colorkey(image, COLORKEY, rleaccel=True)
     return image
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Tuple, Union
+
+from app.engine import engine
+import app.engine.config as cf
+
+def surface_bytes(image: Union[engine.Surface, List[engine.Surface], None]) -> int:
+    if not image:
+        return 0
+    if isinstance(image, (list, tuple)):
+        return sum(surface_bytes(im) for im in image)
+    return image.get_bytesize() * image.get_width() * image.get_height()
+
+class ImageCache():
+    """
+    Decoded resource images, bounded by how many bytes of surfaces they take up.
+
+    Resources hold on to their own decoded image (`portrait.image`,
+    `tileset.image`, `panorama.images`, etc.) so the rest of the engine
+    can keep checking whether it has been loaded yet. The cache remembers
+    which of those it has loaded, and when it goes over budget, releases
+    the least recently used ones by setting them back to empty, so they
+    are decoded again the next time they are needed. Anything that still
+    uses a released image keeps its own reference to it, so only new
+    users pay for the reload.
+
+    A max_bytes of 0 never releases anything. Safe to load into from the
+    prefetch thread, which does so without_evicting, so that images are
+    only ever released on the main thread.
+    """
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        # Key -> (Bytes, Function that releases the image)
+        self.entries: Dict[Hashable, Tuple[int, Callable[[], None]]] = OrderedDict()
+        self.bytes_resident: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._lock = threading.RLock()
+        # Whether loads on this thread leave going over budget for the next load on another thread
+        self._local = threading.local()
+
+    def load(self, owner: Any, attr: str = 'image', path: str = None,
+             convert: bool = False, convert_alpha: bool = False) -> engine.Surface:
+        """Returns owner's image at attr, decoding it from path first if it is not loaded.
+        Use what is returned rather than reading attr back, since any later load can release it"""
+        with self._lock:
+            image = getattr(owner, attr)
+            if image:
+                self.hits += 1
+                if not self.touch((id(owner), attr)):
+                    # Loaded by someone else, but it is just as much ours to release
+                    self._track_attr(owner, attr, image)
+                return image
+            self.misses += 1
+            image = engine.image_load(path, convert=convert, convert_alpha=convert_alpha)
+            setattr(owner, attr, image)
+            self._track_attr(owner, attr, image)
+            return image
+
+    def load_all(self, owner: Any, attr: str, paths: List[str],
+                 process: Callable[[engine.Surface], engine.Surface] = None) -> List[engine.Surface]:
+        """Like load, for resources made up of a list of images, such as a Panorama"""
+        with self._lock:
+            images = getattr(owner, attr)
+            if images:
+                self.hits += 1
+                if not self.touch((id(owner), attr)):
+                    self._track_attr(owner, attr, images)
+                return images
+            self.misses += 1
+            for path in paths:
+                image = engine.image_load(path)
+                images.append(process(image) if process else image)
+            self._track_attr(owner, attr, images)
+            return images
+
+    def track(self, key: Hashable, nbytes: int, release: Callable[[], None]):
+        """Counts something besides a resource attribute against the budget.
+        release is called when it is evicted"""
+        with self._lock:
+            self._discard(key)
+            self.entries[key] = (nbytes, release)
+            self.bytes_resident += nbytes
+            self._evict()
+
+    @contextmanager
+    def without_evicting(self):
+        """Nothing loaded on this thread inside the block releases anything,
+        even if it goes over budget. The next load on another thread catches up"""
+        self._local.deferred = True
+        try:
+            yield
+        finally:
+            self._local.deferred = False
+
+    def touch(self, key: Hashable) -> bool:
+        """Marks the entry as just used. Returns whether it exists"""
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return True
+            return False
+
+    def _track_attr(self, owner: Any, attr: str, image):
+        empty = [] if isinstance(image, list) else None
+        self.track((id(owner), attr), surface_bytes(image), lambda: setattr(owner, attr, empty))
+
+    def _discard(self, key: Hashable):
+        if key in self.entries:
+            nbytes, _ = self.entries.pop(key)
+            self.bytes_resident -= nbytes
+
+    def _evict(self):
+        if getattr(self._local, 'deferred', False):
+            return
+        # Never evict what was just added, even if it alone is over budget
+        while self.max_bytes and self.bytes_resident > self.max_bytes and len(self.entries) > 1:
+            _, (nbytes, release) = self.entries.popitem(last=False)
+            self.bytes_resident -= nbytes
+            self.evictions += 1
+            release()
+
+    def clear(self):
+        """Releases every image, so they are all decoded from disk again"""
+        with self._lock:
+            for nbytes, release in self.entries.values():
+                release()
+            self.entries.clear()
+            self.bytes_resident = 0
+
+    def log_stats(self):
+        logging.info("Image cache: %d hits, %d misses, %d evictions, %d images using %.1f MB",
+                     self.hits, self.misses, self.evictions, len(self.entries), self.bytes_resident / 2**20)
+
+IMAGE_CACHE = ImageCache(int(cf.SETTINGS['image_cache_mb']) * 2**20)
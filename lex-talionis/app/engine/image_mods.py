@@ -1,3 +1,5 @@
+import sys
+
 from app.constants import COLORKEY
 from app.utilities import utils
 from app.engine import engine
@@ -10,6 +12,149 @@ def color_convert(image, conversion_dict):
     px_array.close()
     return image
 
+def _byte_values(plane: bytes) -> list:
+    """Every distinct value in plane"""
+    values = []
+    while plane:
+        values.append(plane[0])
+        # Each pass only has to scan what is left
+        plane = plane.translate(None, bytes((plane[0],)))
+    return values
+
+def _to_codes(plane: bytes, values: list) -> bytes:
+    table = bytearray(256)
+    for code, value in enumerate(values):
+        table[value] = code
+    return plane.translate(table)
+
+def _index_planes(planes: list):
+    """
+    Numbers every distinct combination of bytes across the planes, which
+    are all the same length, with one byte per position. Returns the index
+    at each position and the bytes each index stands for, or None if there
+    are too many combinations to fit in a byte.
+
+    Each plane is numbered by only the values it uses, and then the planes
+    are folded into one index per position by treating all of the positions
+    as one big integer. As long as every index fits in a byte, nothing
+    carries over into the next position. A plane with too many values to
+    fold in at once is folded in a digit at a time.
+    """
+    values = [_byte_values(plane) for plane in planes]
+    indices = bytes(len(planes[0]))
+    # What each index stands for so far, as the code of each plane
+    parts = [(0,) * len(planes)]
+    # Fewest values first, so the indices stay small for as long as possible
+    for idx in sorted(range(len(planes)), key=lambda idx: len(values[idx])):
+        codes = _to_codes(planes[idx], values[idx])
+        remaining, place = len(values[idx]), 1
+        while remaining > 1:
+            if len(parts) * remaining > 256:
+                # Only keep the indices that are actually used
+                used = _byte_values(indices)
+                indices = _to_codes(indices, used)
+                parts = [parts[code] for code in used]
+            base = min(remaining, 256 // len(parts))
+            if base < 2:
+                return None
+            digits = codes.translate(bytes(code // place % base for code in range(256)))
+            combined = int.from_bytes(indices, 'little') * base + int.from_bytes(digits, 'little')
+            indices = combined.to_bytes(len(indices), 'little')
+            parts = [part[:idx] + (part[idx] + digit * place,) + part[idx + 1:] for part in parts for digit in range(base)]
+            place *= base
+            remaining = -(-remaining // base)
+    combinations = [tuple(values[idx][code] if code < len(values[idx]) else 0 for idx, code in enumerate(part)) for part in parts]
+    return indices, combinations
+
+def index_colors(image):
+    """
+    Returns an 8-bit copy of image with its colors in the palette, so it
+    can be recolored by swapping palettes rather than by replacing pixels,
+    or None if it has too many colors for that.
+    """
+    width, height = image.get_size()
+    raw = engine.surf_to_raw(image, 'RGB')
+    if not raw:
+        return None
+    indexed = _index_planes([raw[0::3], raw[1::3], raw[2::3]])
+    if not indexed:
+        return None
+    indices, palette = indexed
+    indexed = engine.raw_to_surf(indices, (width, height), 'P')
+    indexed.set_palette(palette)
+    return indexed
+
+def map_pixels(image, func) -> bool:
+    """
+    Replaces every pixel of image, in place, with func(pixel), where
+    pixel is the mapped color as map_rgb would give it, but unsigned. func is
+    only called once for each distinct pixel, and the results are written
+    back with a byte lookup per channel, so it costs about as much as a
+    few copies of the image rather than a Python call per pixel.
+
+    Returns False, without touching image, if it is not 24 or 32 bit or
+    has too many different pixels for that.
+    """
+    bytesize = image.get_bytesize()
+    width, height = image.get_size()
+    if bytesize not in (3, 4) or not width or not height:
+        return False
+    pitch = image.get_pitch()
+    row_bytes = width * bytesize
+    buffer = image.get_buffer()
+    # The buffer of a subsurface is pitch * height long from the subsurface's
+    # first pixel, which can run past the end of its parent, so only the
+    # bytes of each row are ever read out of it
+    view = memoryview(buffer)
+    if pitch == row_bytes:
+        pixels = bytes(view[:row_bytes * height])
+    else:  # Rows are padded, or image is part of a wider surface
+        pixels = b''.join(view[y * pitch:y * pitch + row_bytes] for y in range(height))
+    view.release()
+    indexed = _index_planes([pixels[idx::bytesize] for idx in range(bytesize)])
+    if not indexed:
+        return False
+    indices, combinations = indexed
+    # map_rgb gives 32 bit pixels as signed ints
+    mask = (1 << 8 * bytesize) - 1
+    tables = [bytearray(256) for _ in range(bytesize)]
+    for code, old_pixel in enumerate(combinations):
+        new_pixel = (func(int.from_bytes(bytes(old_pixel), sys.byteorder)) & mask).to_bytes(bytesize, sys.byteorder)
+        for idx in range(bytesize):
+            tables[idx][code] = new_pixel[idx]
+    new_pixels = bytearray(len(pixels))
+    for idx in range(bytesize):
+        new_pixels[idx::bytesize] = indices.translate(tables[idx])
+    if pitch == row_bytes:
+        buffer.write(bytes(new_pixels), 0)
+    else:
+        for y in range(height):
+            buffer.write(bytes(new_pixels[y * row_bytes:(y + 1) * row_bytes]), y * pitch)
+    return True
+
+def get_indexed_colors(indexed) -> list:
+    return [tuple(color)[:3] for color in indexed.get_palette()]
+
+def recolor_indexed(indexed, conversion_dict, colors: list = None):
+    """Same as color_convert, for an image from index_colors.
+    colors is get_indexed_colors(indexed), for callers that recolor the same image often"""
+    # Color -> Palette indices that currently have that color
+    indices = {}
+    for idx, color in enumerate(colors or get_indexed_colors(indexed)):
+        indices.setdefault(color, []).append(idx)
+    # In order, like replacing one color after another would
+    for old_color, new_color in conversion_dict.items():
+        moved = indices.pop(tuple(old_color), None)
+        if moved:
+            indices.setdefault(tuple(new_color), []).extend(moved)
+    palette = [None] * sum(len(idxs) for idxs in indices.values())
+    for color, idxs in indices.items():
+        for idx in idxs:
+            palette[idx] = color
+    image = indexed.copy()
+    image.set_palette(palette)
+    return image.convert()
+
 def color_convert_alpha(image, conversion_dict):
     px_array = engine.make_pixel_array(image)
     for old_color, new_color in conversion_dict.items():
@@ -18,8 +163,21 @@ def color_convert_alpha(image, conversion_dict):
     return image
 
 def invert_surface(image):
+    # Left signed, since the per pixel version never skips the colorkey
+    # on surfaces with per pixel alpha either
+    colorkey = image.map_rgb(COLORKEY)
+
+    def invert(pixel):
+        if pixel == colorkey:
+            return pixel
+        color = image.unmap_rgb(pixel)
+        return image.map_rgb((255 - color[0], 255 - color[1], 255 - color[2]))
+
+    if not map_pixels(image, invert):
+        _invert_surface_per_pixel(image)
+
+def _invert_surface_per_pixel(image):
     # Using px_array is about 2x as fast as native
-    # Using Cython invert is about >200x faster than native
     px_array = engine.make_pixel_array(image)
     colorkey = image.map_rgb(COLORKEY)
     for x in range(image.get_width()):
@@ -29,34 +187,40 @@ def invert_surface(image):
                 px_array[x, y] = (255 - color[0], 255 - color[1], 255 - color[2])
     px_array.close()
 
-def make_gray(image):
+def _gray(image, ignore=None):
+    """
+    Grays every pixel of image in place, except fully transparent
+    pixels and pixels that are the ignore color
+    """
+    def gray(pixel):
+        color = image.unmap_rgb(pixel)
+        if color[3] == 0 or (color[0], color[1], color[2]) == ignore:
+            return pixel
+        avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
+        return image.map_rgb((avg, avg, avg, color[3]))
+
+    if not map_pixels(image, gray):
+        _gray_per_pixel(image, ignore)
+    return image
+
+def _gray_per_pixel(image, ignore=None):
     for row in range(image.get_width()):
         for col in range(image.get_height()):
             color = image.get_at((row, col))
-            if color[3] != 0:
+            if color[3] != 0 and (color[0], color[1], color[2]) != ignore:
                 avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
                 image.set_at((row, col), (avg, avg, avg, color[3]))
     return image
 
+def make_gray(image):
+    return _gray(image)
 
 def make_gray_colorkey(image):
-    for row in range(image.get_width()):
-        for col in range(image.get_height()):
-            color = image.get_at((row, col))
-            if color[3] != 0 and color[:3] != COLORKEY:
-                avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
-                image.set_at((row, col), (avg, avg, avg, color[3]))
-    return image
+    return _gray(image, COLORKEY)
 
 def make_anim_gray(image):
     # Different because animations have a small box of green around them
-    for row in range(image.get_width()):
-        for col in range(image.get_height()):
-            color = image.get_at((row, col))
-            if color[3] != 0 and (color[0], color[1], color[2]) != (128, 160, 128):
-                avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
-                image.set_at((row, col), (avg, avg, avg, color[3]))
-    return image
+    return _gray(image, (128, 160, 128))
 
 def make_translucent(image, t):
     """
@@ -112,18 +276,20 @@ def change_color(image, color: tuple):
     Additively blends a color with the image
     """
     image = engine.copy_surface(image)
-    for idx, band in enumerate(color):
-        blend_mode = engine.BLEND_RGB_ADD
+    # Each band only touches its own channel, so every band that adds
+    # can be blended in one fill, and every band that subtracts in another
+    add = tuple(max(band, 0) for band in color[:3])
+    sub = tuple(max(-band, 0) for band in color[:3])
+    if any(add):
+        engine.fill(image, add, None, engine.BLEND_RGB_ADD)
+    if any(sub):
+        engine.fill(image, sub, None, engine.BLEND_RGB_SUB)
+    # Any band past blue, like change_color_alpha's alpha, is blended into blue
+    for band in color[3:]:
         if band < 0:
-            blend_mode = engine.BLEND_RGB_SUB
-            band = -band
-        if idx == 0:
-            new_color = (band, 0, 0)
-        elif idx == 1:
-            new_color = (0, band, 0)
+            engine.fill(image, (0, 0, -band), None, engine.BLEND_RGB_SUB)
         else:
-            new_color = (0, 0, band)
-        engine.fill(image, new_color, None, blend_mode)
+            engine.fill(image, (0, 0, band), None, engine.BLEND_RGB_ADD)
     return image
 
 def change_color_alpha(image, color):
@@ -132,6 +132,9 @@ class LevelCursor(BaseCursor):
             else:
                 self.camera.set_center(*self.position)
 
+    def is_displaying_arrows(self) -> bool:
+        return self._display_arrows
+
     def show_arrows(self):
         self._display_arrows = True
 
@@ -1,8 +1,12 @@
+from collections import Counter
+from typing import Callable, Dict, FrozenSet, Tuple
+
 from app.utilities import utils
+from app.utilities.typing import NID, Pos
 from enum import IntEnum
 
 from app.engine.game_state import game
-from app.engine import skill_system
+from app.engine import equations, skill_system
 from app.engine.bresenham_line_algorithm import get_line
 
 class Visibility(IntEnum):
@@ -10,6 +14,83 @@ class Visibility(IntEnum):
     Dark = 1
     Lit = 2
 
+class TeamVision():
+    def __init__(self):
+        # Key: Unit nid, Value: (position, radius) the unit is seeing from
+        self.sources: Dict[NID, Tuple[Pos, int]] = {}
+        # Key: Position, Value: How many of the team's units can see it
+        self.lit: Counter = Counter()
+        self.generation: int = -1
+
+class VisibilityCache():
+    """
+    Remembers what can be seen from where on one game board.
+
+    Lines between pairs of tiles and the field of tiles visible from a
+    tile within a radius are both kept until the opacity of a tile changes.
+    For each team and radius, also keeps count of how many of the team's
+    units can see each tile. Those counts are only brought up to date with
+    where the team's units are when the unit state generation changes,
+    and only for the units that moved or changed their sight range.
+    """
+    def __init__(self, width: int, height: int, get_opacity: Callable[[Pos], bool]):
+        self.width = width
+        self.height = height
+        self.get_opacity = get_opacity
+        self.lines: Dict[Tuple[Pos, Pos], bool] = {}
+        self.fields: Dict[Tuple[Pos, int], FrozenSet[Pos]] = {}
+        self.team_vision: Dict[Tuple[NID, int], TeamVision] = {}
+
+    def clear(self):
+        self.lines.clear()
+        self.fields.clear()
+        self.team_vision.clear()
+
+    def has_line(self, source: Pos, dest: Pos) -> bool:
+        key = (source, dest)
+        if key not in self.lines:
+            self.lines[key] = get_line(source, dest, self.get_opacity)
+        return self.lines[key]
+
+    def get_field(self, source: Pos, radius: int) -> FrozenSet[Pos]:
+        """Every tile on the map within radius of source that can be seen from source"""
+        key = (source, radius)
+        if key not in self.fields:
+            sx, sy = source
+            # A unit can always see its own tile
+            field = {source}
+            for x in range(max(0, sx - radius), min(self.width, sx + radius + 1)):
+                dy = radius - abs(x - sx)
+                for y in range(max(0, sy - dy), min(self.height, sy + dy + 1)):
+                    if self.has_line(source, (x, y)):
+                        field.add((x, y))
+            self.fields[key] = frozenset(field)
+        return self.fields[key]
+
+    def get_lit(self, team: NID, radius: int) -> Counter:
+        """How many of the team's units can see each position,
+        with each unit seeing radius plus its own sight range"""
+        key = (team, radius)
+        vision = self.team_vision.get(key)
+        if not vision:
+            vision = self.team_vision[key] = TeamVision()
+        if vision.generation != equations.get_generation():
+            self._sync(vision, team, radius)
+            vision.generation = equations.get_generation()
+        return vision.lit
+
+    def _sync(self, vision: TeamVision, team: NID, radius: int):
+        current = {unit.nid: (unit.position, radius + skill_system.sight_range(unit))
+                   for unit in game.units if unit.position and unit.team == team}
+        for nid, source in list(vision.sources.items()):
+            if current.get(nid) != source:
+                vision.lit.subtract(self.get_field(*source))
+                del vision.sources[nid]
+        for nid, source in current.items():
+            if nid not in vision.sources:
+                vision.lit.update(self.get_field(*source))
+                vision.sources[nid] = source
+
 def line_of_sight(source_pos: list, dest_pos: list, max_range: int) -> list:
     all_tiles = {}
     for pos in dest_pos:
@@ -22,7 +103,7 @@ def line_of_sight(source_pos: list, dest_pos: list, max_range: int) -> list:
     for pos, vis in all_tiles.items():
         if vis == Visibility.Unknown:
             for s_pos in source_pos:
-                if utils.calculate_distance(pos, s_pos) <= max_range and get_line(s_pos, pos, game.board.get_opacity):
+                if utils.calculate_distance(pos, s_pos) <= max_range and game.board.visibility.has_line(s_pos, pos):
                     all_tiles[pos] = Visibility.Lit
                     break
             else:
@@ -35,13 +116,7 @@ def simple_check(dest_pos: tuple, team: str, default_range: int) -> bool:
     """
     Returns true if can see position with line of sight
     """
-    info = [(unit.position, skill_system.sight_range(unit)) for unit in game.units if unit.position and unit.team == team]
-    for s_pos, extra_range in info:
-        if s_pos == dest_pos:
-            return True
-        elif utils.calculate_distance(dest_pos, s_pos) <= default_range + extra_range and get_line(s_pos, dest_pos, game.board.get_opacity):
-            return True
-    return False
+    return game.board.visibility.get_lit(team, default_range)[dest_pos] > 0
 
 if __name__ == '__main__':
     import random, time
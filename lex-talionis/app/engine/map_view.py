@@ -7,15 +7,35 @@ from app.engine import config as cf
 from app.engine import engine
 from app.engine.fonts import FONT
 from app.engine.game_state import game
+from app.engine.profiler import PROFILER
+from app.engine.unit_sprite import get_marker_unit
 
 from app.utilities.utils import magnitude, tmult, tuple_add, tuple_sub
 
 class MapView():
+    """
+    Draws the map in layers: the terrain, the overlays on top of it
+    (auras, boundary, fog of war, highlights and grid), the units, and
+    the foreground. Each layer is kept from the frame before, along with
+    a key of everything it was drawn from, and is only drawn again when
+    that key changes. Animations, the cursor, weather and the UI are
+    still drawn over them every frame.
+    """
     def __init__(self):
         self._unit_surf = engine.create_surface((WINWIDTH, WINHEIGHT), transparent=True)
         self._line_surf = engine.copy_surface(self._unit_surf)
         self._line_surf.fill((0, 0, 0, 0))
 
+        self._terrain_key = None
+        self._terrain_surf = None
+        self._overlay_key = None
+        self._overlay_surf = None
+        self._unit_key = None
+        self._foreground_key = None
+        self._foreground_surf = None
+        # How many of the layers had to be drawn again on the last frame
+        self.recomposed_layers: int = 0
+
     def save_screenshot(self):
         import os
         from datetime import datetime
@@ -43,7 +63,6 @@ class MapView():
         engine.save_surface(surf, 'screenshots/LT_%s_map_view.png' % current_time)
 
     def draw_units(self, surf, cull_rect, subsurface_rect=None):
-        unit_surf = engine.copy_surface(self._unit_surf)
         cull_rect_in_tiles = cull_rect[0] / TILEWIDTH, cull_rect[1] / TILEHEIGHT, cull_rect[2] / TILEWIDTH, cull_rect[3] / TILEHEIGHT
         cull_rect_center_in_tiles = tuple_add(cull_rect_in_tiles[:2], tmult(cull_rect_in_tiles[2:], 0.5))
 
@@ -72,22 +91,36 @@ class MapView():
         topleft = cull_rect[0], cull_rect[1]
 
         event = 'event' in game.state.state_names()
-        for unit in draw_units:
-            unit.sprite.draw(unit_surf, topleft)
-            unit.sprite.draw_hp(unit_surf, topleft, event)
-        for unit in draw_units:
-            unit.sprite.draw_markers(unit_surf, topleft)
-
-        # Draw the movement arrows
-        game.cursor.draw_arrows(unit_surf, topleft)
-
-        # Draw the main unit
         cur_unit = game.cursor.cur_unit
-        if cur_unit and cur_unit.sprite.position:
-            cur_unit.sprite.draw(unit_surf, topleft)
-            cur_unit.sprite.draw_hp(unit_surf, topleft, event)
-            if not event:
-                cur_unit.sprite.draw_markers(unit_surf, topleft)
+        if not (cur_unit and cur_unit.sprite.position):
+            cur_unit = None
+        unit_key = self._get_unit_key(draw_units, cur_unit, topleft, event)
+        unit_surf = self._unit_surf
+        if unit_key is None or unit_key != self._unit_key:
+            unit_surf.fill((0, 0, 0, 0))
+            for unit in draw_units:
+                unit.sprite.draw(unit_surf, topleft)
+                unit.sprite.draw_hp(unit_surf, topleft, event)
+            for unit in draw_units:
+                unit.sprite.draw_markers(unit_surf, topleft)
+
+            # Draw the movement arrows
+            game.cursor.draw_arrows(unit_surf, topleft)
+
+            # Draw the main unit
+            if cur_unit:
+                cur_unit.sprite.draw(unit_surf, topleft)
+                cur_unit.sprite.draw_hp(unit_surf, topleft, event)
+                if not event:
+                    cur_unit.sprite.draw_markers(unit_surf, topleft)
+            self.recomposed_layers += 1
+        else:
+            # Drawing a unit also counts towards its vibration
+            for unit in draw_units:
+                unit.sprite.vibrate_counter += 1
+            if cur_unit:
+                cur_unit.sprite.vibrate_counter += 1
+        self._unit_key = unit_key
 
         if subsurface_rect:
             left, top = (subsurface_rect[0] - cull_rect[0], subsurface_rect[1] - cull_rect[1])
@@ -105,6 +138,64 @@ class MapView():
 
         full_size = game.tilemap.width * TILEWIDTH, game.tilemap.height * TILEHEIGHT
 
+        self.recomposed_layers = 0
+        tilemap_key = self._get_tilemap_key(game.tilemap)
+        with PROFILER.scope('map_view.terrain'):
+            self._draw_terrain(cull_rect, shake, full_size, tilemap_key)
+        with PROFILER.scope('map_view.overlay'):
+            surf = self._draw_overlay(cull_rect, full_size)
+
+        with PROFILER.scope('map_view.animations'):
+            game.tilemap.animations = [anim for anim in game.tilemap.animations if not anim.update()]
+            for anim in game.tilemap.animations:
+                anim.draw(surf, offset=(-game.camera.get_x(), -game.camera.get_y()))
+
+        with PROFILER.scope('map_view.units'):
+            if subsurface_cull:  # Forced smaller cull rect from animation combat black background
+                # Make sure it has a width
+                # Make the cull rect even smaller
+                if subsurface_cull[2] > 0:
+                    subsurface_rect = cull_rect[0] + subsurface_cull[0], cull_rect[1] + subsurface_cull[1], subsurface_cull[2], subsurface_cull[3]
+                    self.draw_units(surf, cull_rect, subsurface_rect)
+                else:
+                    pass # Don't draw units
+            else:
+                self.draw_units(surf, cull_rect)
+
+        with PROFILER.scope('map_view.animations'):
+            game.tilemap.high_animations = [anim for anim in game.tilemap.high_animations if not anim.update()]
+            for anim in game.tilemap.high_animations:
+                anim.draw(surf, offset=(-game.camera.get_x(), -game.camera.get_y()))
+
+        if game.tilemap.foreground_layers():
+            with PROFILER.scope('map_view.foreground'):
+                foreground_key = (cull_rect, tilemap_key)
+                if foreground_key != self._foreground_key:
+                    self._foreground_surf = game.tilemap.get_foreground_image(cull_rect)
+                    self._foreground_key = foreground_key
+                    self.recomposed_layers += 1
+                surf.blit(self._foreground_surf, (0, 0))
+
+        # Handle time region text
+        self.time_region_text(surf, cull_rect)
+
+        surf = game.cursor.draw(surf, cull_rect)
+
+        with PROFILER.scope('map_view.weather'):
+            for weather in game.tilemap.weather:
+                weather.update()
+                weather.draw(surf, cull_rect[0], cull_rect[1])
+
+        with PROFILER.scope('map_view.ui'):
+            surf = game.ui_view.draw(surf)
+        return surf
+
+    def _get_tilemap_key(self, tilemap) -> tuple:
+        return (tilemap,) + tuple((layer, layer.image, layer.visible, layer.state, layer.translucence,
+                                   layer.autotile_frame, len(layer.autotile_images))
+                                  for layer in tilemap.layers)
+
+    def _draw_terrain(self, cull_rect, shake, full_size, tilemap_key):
         if game.bg_tilemap:
             # cull calculations
             bg_size = game.bg_tilemap.width * TILEWIDTH, game.bg_tilemap.height * TILEHEIGHT
@@ -119,8 +210,14 @@ class MapView():
                 bg_y = y_proportion * (bg_size[1] - WINHEIGHT)
             else:
                 bg_y = 0
-
             parallax_cull = (bg_x, bg_y, cull_rect[2], cull_rect[3])
+            terrain_key = (cull_rect, shake, tilemap_key, self._get_tilemap_key(game.bg_tilemap), parallax_cull)
+        else:
+            terrain_key = (cull_rect, shake, tilemap_key)
+        if terrain_key == self._terrain_key:
+            return
+
+        if game.bg_tilemap:
             base_image = game.bg_tilemap.get_full_image(parallax_cull)
             map_image = game.tilemap.get_full_image(cull_rect)
             surf = engine.copy_surface(base_image)
@@ -131,48 +228,48 @@ class MapView():
             map_image = game.tilemap.get_full_image(cull_rect)
             surf.blit(map_image, shake)
             surf = surf.convert_alpha()
-
-        surf = game.boundary.draw_auras(surf, full_size, cull_rect)
-        surf = game.boundary.draw(surf, full_size, cull_rect)
-        surf = game.boundary.draw_fog_of_war(surf, full_size, cull_rect)
-        surf = game.highlight.draw(surf, cull_rect)
-
-        self.draw_grid(surf, cull_rect)
-
-        game.tilemap.animations = [anim for anim in game.tilemap.animations if not anim.update()]
-        for anim in game.tilemap.animations:
-            anim.draw(surf, offset=(-game.camera.get_x(), -game.camera.get_y()))
-
-        if subsurface_cull:  # Forced smaller cull rect from animation combat black background
-            # Make sure it has a width
-            # Make the cull rect even smaller
-            if subsurface_cull[2] > 0:
-                subsurface_rect = cull_rect[0] + subsurface_cull[0], cull_rect[1] + subsurface_cull[1], subsurface_cull[2], subsurface_cull[3]
-                self.draw_units(surf, cull_rect, subsurface_rect)
-            else:
-                pass # Don't draw units
-        else:
-            self.draw_units(surf, cull_rect)
-
-        game.tilemap.high_animations = [anim for anim in game.tilemap.high_animations if not anim.update()]
-        for anim in game.tilemap.high_animations:
-            anim.draw(surf, offset=(-game.camera.get_x(), -game.camera.get_y()))
-
-        if game.tilemap.foreground_layers():
-            foreground_image = game.tilemap.get_foreground_image(cull_rect)
-            surf.blit(foreground_image, (0, 0))
-
-        # Handle time region text
-        self.time_region_text(surf, cull_rect)
-
-        surf = game.cursor.draw(surf, cull_rect)
-
-        for weather in game.tilemap.weather:
-            weather.update()
-            weather.draw(surf, cull_rect[0], cull_rect[1])
-
-        surf = game.ui_view.draw(surf)
-        return surf
+        self._terrain_surf = surf
+        self._terrain_key = terrain_key
+        self.recomposed_layers += 1
+
+    def _draw_overlay(self, cull_rect, full_size):
+        """
+        Returns a copy of the terrain with the auras, boundary, fog of war,
+        highlights and grid drawn over it, to draw the rest of the frame on
+        """
+        highlight_key = game.highlight.get_layer_key()
+        grid_key = (tuple(game.board.bounds), cf.SETTINGS['grid_opacity'], cf.SETTINGS['show_bounds'])
+        overlay_key = (self._terrain_key, game.boundary.prepare(full_size), highlight_key, grid_key)
+        # Highlights that are still growing in have to be drawn every frame
+        if highlight_key is None or overlay_key != self._overlay_key:
+            surf = engine.copy_surface(self._terrain_surf)
+            surf = game.boundary.draw_auras(surf, full_size, cull_rect)
+            surf = game.boundary.draw(surf, full_size, cull_rect)
+            surf = game.boundary.draw_fog_of_war(surf, full_size, cull_rect)
+            surf = game.highlight.draw(surf, cull_rect)
+            self.draw_grid(surf, cull_rect)
+            self._overlay_surf = surf
+            self._overlay_key = overlay_key
+            self.recomposed_layers += 1
+        return engine.copy_surface(self._overlay_surf)
+
+    def _get_unit_key(self, draw_units, cur_unit, topleft, event):
+        """
+        Returns None if the units have to be drawn this frame no matter what,
+        because one of them is animating or moving, or the markers or
+        movement arrows are showing
+        """
+        if get_marker_unit() or game.cursor.is_displaying_arrows():
+            return None
+        if cur_unit:
+            draw_units = draw_units + [cur_unit]
+        draw_keys = []
+        for unit in draw_units:
+            draw_key = unit.sprite.get_draw_key(topleft, event)
+            if draw_key is None:
+                return None
+            draw_keys.append((unit, draw_key))
+        return (topleft, event, cur_unit, tuple(draw_keys))
 
     def time_region_text(self, surf, cull_rect):
         font = FONT['text-yellow']
@@ -6,6 +6,8 @@ from app.utilities.data import Data, Prefab
 from app.data.resources.resources import RESOURCES
 
 from app.engine import engine, image_mods, particles, animations
+from app.engine.image_cache import IMAGE_CACHE
+from app.engine.prefetch import PREFETCHER
 
 class LayerObject():
     transition_speed = 333
@@ -161,23 +163,25 @@ class TileMapObject(Prefab):
             has_autotiles = False
             for coord, tile_sprite in layer.sprite_grid.items():
                 tileset = RESOURCES.tilesets.get(tile_sprite.tileset_nid)
-                if not tileset.image:
-                    tileset.image = engine.image_load(tileset.full_path)
-                if not tileset.autotile_image and tileset.autotile_full_path:
-                    tileset.autotile_image = engine.image_load(tileset.autotile_full_path)
+                PREFETCHER.record_use(('tileset', tileset.nid), bool(tileset.image))
+                # Loading the autotiles can make the cache let go of the tileset image, so keep our own
+                tileset_image = IMAGE_CACHE.load(tileset, 'image', tileset.full_path)
+                autotile_image = None
+                if tileset.autotile_full_path:
+                    autotile_image = IMAGE_CACHE.load(tileset, 'autotile_image', tileset.autotile_full_path)
                 pos = tile_sprite.tileset_position
 
                 rect = (pos[0] * TILEWIDTH, pos[1] * TILEHEIGHT, TILEWIDTH, TILEHEIGHT)
-                sub_image = engine.subsurface(tileset.image, rect)
+                sub_image = engine.subsurface(tileset_image, rect)
                 image.blit(sub_image, (coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT))
 
                 # Handle Autotiles
-                if pos in tileset.autotiles and tileset.autotile_image:
+                if pos in tileset.autotiles and autotile_image:
                     has_autotiles = True
                     column = tileset.autotiles[pos]
                     for idx, im in enumerate(autotile_images):
                         rect = (column * TILEWIDTH, idx * TILEHEIGHT, TILEWIDTH, TILEHEIGHT)
-                        sub_image = engine.subsurface(tileset.autotile_image, rect)
+                        sub_image = engine.subsurface(autotile_image, rect)
                         im.blit(sub_image, (coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT))
 
             new_layer.image = image
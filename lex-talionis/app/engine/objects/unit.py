@@ -109,6 +109,11 @@ class UnitObject(Prefab):
     _battle_anim = None
     current_move = None
 
+    # Cache of hook name -> implementing skill components, see skill_system.get_implementers
+    _skill_hook_index = None
+    # Bumped whenever the skills the unit has change
+    _skills_version: int = 0
+
     # If the attribute is not found
     def __getattr__(self, attr):
         if attr.startswith('__') and attr.endswith('__'):
@@ -316,6 +321,7 @@ class UnitObject(Prefab):
         for s in self._skills:
             skill_system.after_add(self, s.get())
         self._visible_skills_cache.clear()
+        self._skills_version += 1
 
         # -- Equipped Items
         self.autoequip()
@@ -405,6 +411,8 @@ class UnitObject(Prefab):
         if not test:
             self._skills.append(UnitSkill(skill, source, source_type))
             self._visible_skills_cache.clear()
+            self._skills_version += 1
+            equations.bump_generation()
         return popped_skill
 
     def remove_skill(self, skill, source, source_type=SourceType.DEFAULT, test=False):
@@ -424,6 +432,8 @@ class UnitObject(Prefab):
         if not test and to_remove:
             self._skills.remove(to_remove)
             self._visible_skills_cache.clear()
+            self._skills_version += 1
+            equations.bump_generation()
         return removed_skill_info
 
     @property
@@ -629,6 +639,7 @@ class UnitObject(Prefab):
             if self.equipped_weapon:
                 self.unequip(self.equipped_weapon, item)
             self.equipped_weapon = item
+        equations.bump_generation()
         item_system.on_equip_item(self, item)
         skill_system.on_equip_item(self, item)
 
@@ -639,6 +650,7 @@ class UnitObject(Prefab):
                 self.equipped_accessory = swap_to
             else:
                 self.equipped_weapon = swap_to
+            equations.bump_generation()
             skill_system.on_unequip_item(self, item)
             item_system.on_unequip_item(self, item)
 
@@ -662,6 +674,7 @@ class UnitObject(Prefab):
         else:
             self.items.insert(index, item)
             item.change_owner(self.nid)
+            equations.bump_generation()
             # Statuses here
             item_system.on_add_item(self, item)
             skill_system.on_add_item(self, item)
@@ -679,6 +692,7 @@ class UnitObject(Prefab):
             elif self.equipped_accessory in item_funcs.get_all_items_from_multi_item(self, item):
                 self.unequip(self.equipped_accessory)
         item.change_owner(None)
+        equations.bump_generation()
         # Status effects
         skill_system.on_remove_item(self, item)
         item_system.on_remove_item(self, item)
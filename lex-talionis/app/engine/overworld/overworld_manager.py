@@ -80,7 +80,11 @@ class OverworldManager(OverworldManagerInterface):
         if isinstance(node, OverworldNodeObject):
             node = node.nid
         self._overworld.enabled_nodes.add(node)
-        self.regenerate_explored_graph()
+        if node not in self.overworld_explored_graph:
+            self.overworld_explored_graph.add_vertex(node, self.nodes[node])
+            # Roads that were waiting on this node can now be used
+            for road_nid in self._overworld.enabled_roads:
+                self._add_explored_road(self.roads[road_nid])
 
     @property
     def revealed_roads(self) -> List[RoadObject]:
@@ -90,7 +94,7 @@ class OverworldManager(OverworldManagerInterface):
         if isinstance(road, RoadObject):
             road = road.nid
         self._overworld.enabled_roads.add(road)
-        self.regenerate_explored_graph()
+        self._add_explored_road(self.roads[road])
 
     def toggle_menu_option_enabled(self, node: NID, menu_option: NID, setting: bool):
         self._overworld.enabled_menu_options[node][menu_option] = setting
@@ -352,12 +356,19 @@ class OverworldManager(OverworldManagerInterface):
         for vis_node_nid in self._overworld.enabled_nodes:
             self.overworld_explored_graph.add_vertex(vis_node_nid, self.nodes[vis_node_nid])
         for vis_road_nid in self._overworld.enabled_roads:
-            road = self.roads[vis_road_nid]
-            path = road.prefab
-            start_node = self.node_at(path[0])
-            end_node = self.node_at(path[-1])
-            if start_node and end_node:
-                self.overworld_explored_graph.add_edge(start_node.nid, end_node.nid, data=road, weight=road.tile_length)
+            self._add_explored_road(self.roads[vis_road_nid])
+
+    def _add_explored_road(self, road: RoadObject):
+        """Adds the road to the visible overworld graph if both of its ends are visible.
+        Only the paths in the components the road joins are forgotten"""
+        path = road.prefab
+        start_node = self.node_at(path[0])
+        end_node = self.node_at(path[-1])
+        if start_node and end_node:
+            graph = self.overworld_explored_graph
+            if start_node.nid in graph.adj.get(end_node.nid, ()) and graph[start_node.nid][end_node.nid].data is road:
+                return  # Already there
+            self.overworld_explored_graph.add_edge(start_node.nid, end_node.nid, data=road, weight=road.tile_length)
 
     def map_size(self) -> Tuple[int, int]:
         return (self._overworld.tilemap.width, self._overworld.tilemap.height)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from app.engine import engine, image_mods
+from app.engine.image_cache import IMAGE_CACHE, ImageCache, surface_bytes
+from app.utilities.typing import NID, Color3
+
+class PaletteCache():
+    """
+    Recolored copies of whole sheets, shared by every unit and every
+    combat that draws the same sheet with the same palette, so that
+    a sheet is only recolored the first time each palette is seen.
+
+    Keyed by the sheet, the palette's nid, and the colors it actually
+    swaps, so an edited palette misses the cache rather than showing
+    the old colors. The second time a sheet is recolored, it is indexed
+    to 8 bits, after which recoloring it is just a palette swap. Both
+    the indexed and the recolored sheets count against the image cache's
+    budget.
+    """
+    def __init__(self, image_cache: ImageCache):
+        self.image_cache = image_cache
+        # Sheet Key -> (8-bit Sheet, Its Palette), or None if the sheet has too many colors
+        self.indexed: Dict[Hashable, Optional[Tuple[engine.Surface, List[Color3]]]] = {}
+        self.recolored: Dict[Tuple[Hashable, NID, frozenset], engine.Surface] = {}
+        self.recolored_sheets: Set[Hashable] = set()
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.RLock()
+
+    def get(self, sheet_key: Hashable, image: engine.Surface, palette_nid: NID,
+            conversion_dict: Dict[Color3, Color3]) -> engine.Surface:
+        """Returns image, which is the sheet identified by sheet_key, with conversion_dict applied"""
+        key = (sheet_key, palette_nid, frozenset(conversion_dict.items()))
+        with self._lock:
+            recolored = self.recolored.get(key)
+            if recolored:
+                self.hits += 1
+                self.image_cache.touch(('palette', key))
+                return recolored
+            self.misses += 1
+            # Indexing costs about as much as recoloring the slow way, so only pay for it
+            # once the sheet turns out to be used with more than one palette
+            indexed = self._get_indexed(sheet_key, image) if sheet_key in self.recolored_sheets else None
+            self.recolored_sheets.add(sheet_key)
+            if indexed:
+                recolored = image_mods.recolor_indexed(indexed[0], conversion_dict, indexed[1])
+            else:  # The sheet's first palette, or it has too many colors to swap palettes
+                recolored = image_mods.color_convert(image, conversion_dict)
+            colorkey = image.get_colorkey()
+            if colorkey:
+                engine.set_colorkey(recolored, colorkey, rleaccel=True)
+            self.recolored[key] = recolored
+            self.image_cache.track(('palette', key), surface_bytes(recolored),
+                                   lambda: self.recolored.pop(key, None))
+            return recolored
+
+    def _get_indexed(self, sheet_key: Hashable, image: engine.Surface) -> Optional[Tuple[engine.Surface, List[Color3]]]:
+        if sheet_key in self.indexed:
+            self.image_cache.touch(('indexed', sheet_key))
+            return self.indexed[sheet_key]
+        indexed = image_mods.index_colors(image.convert())
+        if indexed:
+            indexed = (indexed, image_mods.get_indexed_colors(indexed))
+        self.indexed[sheet_key] = indexed
+        self.image_cache.track(('indexed', sheet_key), surface_bytes(indexed[0] if indexed else None),
+                               lambda: self.indexed.pop(sheet_key, None))
+        return indexed
+
+    def log_stats(self):
+        logging.info("Palette cache: %d hits, %d misses, %d recolored sheets",
+                     self.hits, self.misses, len(self.recolored))
+
+PALETTE_CACHE = PaletteCache(IMAGE_CACHE)
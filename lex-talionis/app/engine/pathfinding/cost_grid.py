@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from array import array
+from typing import Tuple
+
+from app.utilities.typing import Pos
+
+# Any tile that costs this much or more cannot be entered
+IMPASSABLE = 99
+
+class CostGrid():
+    """
+    Compact representation of the movement costs of every tile on the map
+    for a single movement group. Stored as a flat array of doubles, indexed
+    the same way as Grid (x * height + y), so that the pathfinders can
+    work on plain integer indices instead of Node objects.
+    """
+    __slots__ = ['width', 'height', 'costs']
+
+    def __init__(self, size: Tuple[int, int]):
+        self.width, self.height = size
+        self.costs: array = array('d')
+
+    def index(self, pos: Pos) -> int:
+        return pos[0] * self.height + pos[1]
+
+    def position(self, idx: int) -> Pos:
+        return divmod(idx, self.height)
+
+    def get(self, pos: Pos) -> float:
+        return self.costs[pos[0] * self.height + pos[1]]
+
+    def append(self, cost: float):
+        self.costs.append(cost)
+
+    def insert(self, pos: Pos, cost: float):
+        self.costs[pos[0] * self.height + pos[1]] = cost
+
+    def reachable(self, pos: Pos) -> bool:
+        return self.get(pos) < IMPASSABLE
+
+    def __repr__(self):
+        return f'CostGrid: {self.width}x{self.height}'
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Tuple
+
+from app.engine.pathfinding.cost_grid import CostGrid
+from app.engine.pathfinding.pathfinding import GoalField
+from app.utilities.typing import NID, Pos
+
+# (Movement group, bounds, goals, adj_good_enough, blocked tile indices)
+FieldKey = Tuple[NID, Tuple[int, int, int, int], FrozenSet[Pos], bool, FrozenSet[int]]
+
+class DistanceFieldCache():
+    """
+    Remembers GoalFields so that units with the same movement group, heading
+    for the same goals past the same blockers, only search once between them.
+
+    What blocks a unit is part of the key, so units moving around the board
+    only cause misses for the teams they actually get in the way of.
+    Cleared when the movement costs of the board change, and at the end
+    of every AI phase.
+    """
+    max_fields = 256
+
+    def __init__(self):
+        self.fields: Dict[FieldKey, GoalField] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, movement_group: NID, cost_grid: CostGrid, bounds: Tuple[int, int, int, int],
+            goals: Tuple[Pos, ...], blocked: FrozenSet[int], adj_good_enough: bool = False) -> GoalField:
+        key = (movement_group, bounds, frozenset(goals), adj_good_enough, blocked)
+        if key in self.fields:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return self.fields[key]
+        self.misses += 1
+        field = GoalField(tuple(goals), cost_grid, bounds, blocked, adj_good_enough)
+        self.fields[key] = field
+        if len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+        return field
+
+    def clear(self):
+        self.fields.clear()
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        if total:
+            logging.info("Distance field cache: %d hits, %d misses (%.0f%% hit rate)",
+                         self.hits, self.misses, 100 * self.hits / total)
+        self.hits = 0
+        self.misses = 0
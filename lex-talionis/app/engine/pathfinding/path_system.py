@@ -6,6 +6,7 @@ import functools
 from app.engine import equations, skill_system
 from app.engine.movement import movement_funcs
 from app.engine.pathfinding import pathfinding
+from app.engine.profiler import profiled
 from app.engine.game_state import GameState
 from app.utilities.typing import Pos
 
@@ -21,8 +22,13 @@ class PathSystem():
         else:
             from app.engine.game_state import game
             self.game = game
+        # Set to True to use the original Node-based Djikstra for get_valid_moves
+        # Produces the same results, so only useful for comparing the two engines
+        self.legacy_pathfinding: bool = False
 
-    def get_valid_moves(self, unit: UnitObject, force: bool = False, witch_warp: bool = True) -> Set[Pos]:
+    @profiled('path.get_valid_moves')
+    def get_valid_moves(self, unit: UnitObject, force: bool = False, witch_warp: bool = True,
+                        blocked: Optional[Set[int]] = None) -> Set[Pos]:
         """Given a unit, finds all positions on the map they can move to
         Assumes unit is on the map.
         
@@ -30,6 +36,8 @@ class PathSystem():
             unit (UnitObject): The unit to find valid moves for
             force (bool, optional): Set to true to use unit's max movement instead of movement left
             witch_warp (bool, optional): Whether to include witch warp teleport options
+            blocked (Set[int], optional): Tile indices (x * height + y) blocked by other units.
+                Defaults to what is on the game board right now
         
         Returns:
             Set[Pos]: Set of valid positions the unit can move to
@@ -37,23 +45,35 @@ class PathSystem():
         if not force and unit.finished:
             return set()
         mtype = movement_funcs.get_movement_group(unit)
-        grid: BoundedGrid[Node] = self.game.board.get_movement_grid(mtype)
         start_pos = unit.position
-        pathfinder = pathfinding.Djikstra(start_pos, grid)
         movement_left = equations.parser.movement(unit) if force else unit.movement_left
 
-        if skill_system.pass_through(unit):
-            can_move_through = lambda adj: True
+        if self.legacy_pathfinding:
+            grid: BoundedGrid[Node] = self.game.board.get_movement_grid(mtype)
+            pathfinder = pathfinding.Djikstra(start_pos, grid)
+            if skill_system.pass_through(unit):
+                can_move_through = lambda adj: True
+            elif blocked is not None:
+                can_move_through = lambda adj: adj[0] * self.game.board.height + adj[1] not in blocked
+            else:
+                # Feed the unit's team into the function
+                can_move_through = functools.partial(self.game.board.can_move_through, unit.team)
+            valid_moves = pathfinder.process(can_move_through, movement_left)
         else:
-            # Feed the unit's team into the function
-            can_move_through = functools.partial(self.game.board.can_move_through, unit.team)
-        valid_moves = pathfinder.process(can_move_through, movement_left)
+            cost_grid = self.game.board.get_cost_grid(mtype)
+            pathfinder = pathfinding.FloodFill(start_pos, cost_grid, self.game.board.bounds)
+            if skill_system.pass_through(unit):
+                blocked = set()
+            elif blocked is None:
+                blocked = self.game.board.get_blocked_mask(unit.team)
+            valid_moves = pathfinder.process(blocked, movement_left)
         valid_moves.add(unit.position)
         if witch_warp:
             witch_warp = set(skill_system.witch_warp(unit))
             valid_moves |= witch_warp
         return valid_moves
 
+    @profiled('path.get_path')
     def get_path(self, unit: UnitObject, position: Pos, ally_block: bool = False, 
                  use_limit: bool = False, free_movement: bool = False) -> List[Pos]:
         """Given a unit and a goal position, find the best path for the unit to get to that goal position
@@ -91,6 +111,7 @@ class PathSystem():
             return []
         return path
 
+    @profiled('path.check_path')
     def check_path(self, unit: UnitObject, path: List[Pos]) -> bool:
         """Determines whether path is possible for the unit to traverse.
 
@@ -113,6 +134,7 @@ class PathSystem():
             prev_pos = pos
         return True
 
+    @profiled('path.travel_algorithm')
     def travel_algorithm(self, path: List[Pos], moves: int, unit: UnitObject, grid: Grid[Node]) -> Pos:
         """
         Given a long path, travels along that path as far as possible.
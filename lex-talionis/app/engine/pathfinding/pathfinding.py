@@ -1,8 +1,9 @@
 import heapq
-from typing import Callable, List, Optional, Set, Tuple
+from typing import Callable, Container, Dict, List, Optional, Set, Tuple
 
 from app.engine import bresenham_line_algorithm
 
+from app.engine.pathfinding.cost_grid import IMPASSABLE, CostGrid
 from app.engine.pathfinding.node import Node
 from app.utilities.grid import BoundedGrid
 from app.utilities.typing import Pos
@@ -71,6 +72,169 @@ class Djikstra:
         # Sometimes gets here if unit is fully enclosed
         return {(node.x, node.y) for node in self.closed}
 
+class FloodFill:
+    """
+    Same results as Djikstra, but runs over a flat CostGrid instead of a grid of Nodes.
+
+    Uses a lazy-deletion heap of (g, index) pairs instead of checking
+    membership in the open list, and takes a precomputed collection of
+    blocked tile indices instead of a per-tile can_move_through callback.
+    Does not mutate the grid, so one grid can be shared between any number of searches.
+    """
+    __slots__ = ['cost_grid', 'bounds', 'start_pos']
+
+    def __init__(self, start_pos: Pos, cost_grid: CostGrid, bounds: Tuple[int, int, int, int]):
+        self.cost_grid: CostGrid = cost_grid
+        self.bounds: Tuple[int, int, int, int] = bounds
+        self.start_pos: Pos = start_pos
+
+    def distances(self, blocked: Container[int], movement_left: float) -> Dict[int, float]:
+        """
+        Returns the true distance to every tile index reachable
+        from the start position within movement_left
+        """
+        costs = self.cost_grid.costs
+        height = self.cost_grid.height
+        min_x, min_y, max_x, max_y = self.bounds
+        start_idx = self.start_pos[0] * height + self.start_pos[1]
+
+        closed: Dict[int, float] = {}
+        best: Dict[int, float] = {start_idx: 0}
+        open_heap: List[Tuple[float, int]] = [(0, start_idx)]
+        while open_heap:
+            g, idx = heapq.heappop(open_heap)
+            # Always g ordered, so nothing else in the heap can be in range
+            if g > movement_left:
+                break
+            # Stale entry -- we already found a better path to this tile
+            if idx in closed:
+                continue
+            closed[idx] = g
+            x, y = divmod(idx, height)
+            for adj_x, adj_y in ((x, y + 1), (x + 1, y), (x - 1, y), (x, y - 1)):
+                if not (min_x <= adj_x <= max_x and min_y <= adj_y <= max_y):
+                    continue
+                adj = adj_x * height + adj_y
+                if adj in closed or adj in blocked:
+                    continue
+                cost = costs[adj]
+                if cost >= IMPASSABLE:
+                    continue
+                new_g = g + cost
+                # Only push when this is an improvement, the stale entry will be skipped later
+                if new_g <= movement_left and (adj not in best or new_g < best[adj]):
+                    best[adj] = new_g
+                    heapq.heappush(open_heap, (new_g, adj))
+        return closed
+
+    def process(self, blocked: Container[int], movement_left: float) -> Set[Pos]:
+        height = self.cost_grid.height
+        return {divmod(idx, height) for idx in self.distances(blocked, movement_left)}
+
+class GoalField:
+    """
+    The true distance from every tile to the nearest of a set of goals,
+    and which way to step from each tile to get there. Searches outwards
+    from the goals instead of from a unit, so any number of units with
+    the same movement costs and the same blockers can share it.
+
+    Distances follow the same rule as AStar with adj_good_enough: ending
+    next to a goal is enough but counts as one more than ending on it.
+    """
+    __slots__ = ['height', 'goals', 'adj_good_enough', 'distances', 'next_steps']
+
+    def __init__(self, goals: Tuple[Pos, ...], cost_grid: CostGrid, bounds: Tuple[int, int, int, int],
+                 blocked: Container[int], adj_good_enough: bool = False):
+        self.height: int = cost_grid.height
+        self.goals: Tuple[Pos, ...] = goals
+        self.adj_good_enough: bool = adj_good_enough
+        self.next_steps: Dict[int, int] = {}
+        self.distances: Dict[int, float] = self._search(cost_grid, bounds, blocked)
+
+    def _search(self, cost_grid: CostGrid, bounds: Tuple[int, int, int, int],
+                blocked: Container[int]) -> Dict[int, float]:
+        costs = cost_grid.costs
+        height = self.height
+        min_x, min_y, max_x, max_y = bounds
+
+        def can_enter(idx: int) -> bool:
+            return costs[idx] < IMPASSABLE and idx not in blocked
+
+        best: Dict[int, float] = {}
+        for x, y in self.goals:
+            ends = [((x, y), 0)]
+            if self.adj_good_enough:
+                ends += [(adj, 1) for adj in ((x, y + 1), (x + 1, y), (x - 1, y), (x, y - 1))]
+            for (end_x, end_y), g in ends:
+                if min_x <= end_x <= max_x and min_y <= end_y <= max_y:
+                    idx = end_x * height + end_y
+                    if can_enter(idx) and (idx not in best or g < best[idx]):
+                        best[idx] = g
+        open_heap: List[Tuple[float, int]] = [(g, idx) for idx, g in best.items()]
+        heapq.heapify(open_heap)
+
+        closed: Dict[int, float] = {}
+        while open_heap:
+            g, idx = heapq.heappop(open_heap)
+            if idx in closed:
+                continue
+            closed[idx] = g
+            # Tiles that cannot be entered can only be where a path starts
+            if not can_enter(idx):
+                continue
+            # Stepping from a neighbour onto this tile costs this tile's cost
+            new_g = g + costs[idx]
+            x, y = divmod(idx, height)
+            for adj_x, adj_y in ((x, y + 1), (x + 1, y), (x - 1, y), (x, y - 1)):
+                if not (min_x <= adj_x <= max_x and min_y <= adj_y <= max_y):
+                    continue
+                adj = adj_x * height + adj_y
+                if adj in closed:
+                    continue
+                if adj not in best or new_g < best[adj]:
+                    best[adj] = new_g
+                    self.next_steps[adj] = idx
+                    heapq.heappush(open_heap, (new_g, adj))
+        return closed
+
+    def _end_distance(self, start_pos: Pos) -> Optional[float]:
+        """How far from the goals start_pos is if it is a good enough place to end.
+        Where a path starts does not have to be enterable"""
+        best = None
+        for goal in self.goals:
+            dist = abs(start_pos[0] - goal[0]) + abs(start_pos[1] - goal[1])
+            if dist == 0 or (dist == 1 and self.adj_good_enough):
+                if best is None or dist < best:
+                    best = dist
+        return best
+
+    def get_distance(self, start_pos: Pos) -> Optional[float]:
+        """Returns None if no goal can be reached from start_pos"""
+        dist = self.distances.get(start_pos[0] * self.height + start_pos[1])
+        end_dist = self._end_distance(start_pos)
+        if end_dist is not None and (dist is None or end_dist <= dist):
+            return end_dist
+        return dist
+
+    def find_path(self, start_pos: Pos, limit: float = None) -> List[Pos]:
+        """
+        The best path from start_pos to the goals, goal first and start last.
+        Empty if there is none within the limit
+        """
+        dist = self.get_distance(start_pos)
+        if dist is None or (limit is not None and dist > limit):
+            return []
+        path = [start_pos]
+        # Already as close as we need to be
+        if dist == self._end_distance(start_pos):
+            return path
+        idx = start_pos[0] * self.height + start_pos[1]
+        while idx in self.next_steps:
+            idx = self.next_steps[idx]
+            path.append(divmod(idx, self.height))
+        path.reverse()
+        return path
+
 class AStar:
     def __init__(self, start_pos: Pos, goal_pos: Optional[Pos], grid: BoundedGrid[Node]):
         self.grid = grid
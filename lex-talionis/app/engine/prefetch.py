@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, List, Set, Tuple
+
+from app.engine.image_cache import IMAGE_CACHE
+from app.utilities.typing import NID
+
+if TYPE_CHECKING:
+    from app.engine.game_state import GameState
+
+# (Key, Function that returns whether it prefetched anything)
+Job = Tuple[Hashable, Callable[[], bool]]
+
+class Prefetcher():
+    """
+    Decodes what a level is going to need on a background thread, while
+    the level is still loading, so that the first map draw and the first
+    combat do not hitch.
+
+    Jobs are planned on the main thread, since that is the only place the
+    game state can be read safely, and the jobs themselves only build
+    images and sounds into the shared caches. Jobs never evict anything
+    from the image cache, so nothing is released out from under the main
+    thread, and jobs that decode images stop once it is getting full, so
+    the main thread has little to catch up on. While a level is running,
+    the first time the game uses each thing that can be prefetched is
+    recorded as either a hit, if it was ready, or a cold load, if the main
+    thread had to decode it.
+    """
+    def __init__(self):
+        self.thread: threading.Thread = None
+        self._cancel = threading.Event()
+        self.prefetched: Set[Hashable] = set()
+        self.used: Set[Hashable] = set()
+        self.hits: int = 0
+        self.cold: int = 0
+        self.time_spent: float = 0
+
+    def start(self, jobs: List[Job]) -> threading.Thread:
+        """Cancels anything still prefetching for the last level, and starts over with jobs"""
+        self.stop()
+        self.prefetched = set()
+        self.used = set()
+        self.hits = 0
+        self.cold = 0
+        self.time_spent = 0
+        # Each thread gets its own event, so a cancelled thread can never be restarted by accident
+        self._cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(jobs, self._cancel), daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def _run(self, jobs: List[Job], cancel: threading.Event):
+        start = time.perf_counter()
+        with IMAGE_CACHE.without_evicting():
+            for key, job in jobs:
+                if cancel.is_set():
+                    return
+                try:
+                    if job():
+                        self.prefetched.add(key)
+                except Exception as e:
+                    # Whatever broke will be loaded, and complain, on the main thread when it is used
+                    logging.warning("Could not prefetch %s: %s", key, e)
+        self.time_spent = time.perf_counter() - start
+        logging.info("Prefetched %d of %d assets in %.1f ms", len(self.prefetched), len(jobs), self.time_spent * 1000)
+
+    def stop(self):
+        if self.thread:
+            self._cancel.set()
+            self.thread.join()
+            self.thread = None
+
+    def join(self):
+        """Waits for everything to be prefetched, for when nothing should depend on how long that takes"""
+        if self.thread:
+            self.thread.join()
+
+    def is_running(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+    def record_use(self, key: Hashable, warm: bool):
+        """Called the first time anything that could have been prefetched is used.
+        warm is whether it was already loaded"""
+        if key in self.used:
+            return
+        self.used.add(key)
+        if warm:
+            self.hits += 1
+        else:
+            self.cold += 1
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of first uses that did not have to wait on a load"""
+        total = self.hits + self.cold
+        return self.hits / total if total else 1.
+
+    def log_stats(self):
+        logging.info("Prefetch: %d hits, %d cold loads, %.0f%% coverage, %d assets prefetched",
+                     self.hits, self.cold, self.coverage * 100, len(self.prefetched))
+
+PREFETCHER = Prefetcher()
+
+def _has_room() -> bool:
+    # Leave some of the image cache for whatever the level does not see coming
+    return not IMAGE_CACHE.max_bytes or IMAGE_CACHE.bytes_resident < IMAGE_CACHE.max_bytes * 3 // 4
+
+def _song_jobs(songs: Iterable[NID]) -> List[Job]:
+    from app.engine.sound import MUSIC
+
+    def load_song(song) -> bool:
+        if MUSIC.max_bytes and MUSIC.bytes_resident() > MUSIC.max_bytes:
+            return False  # It would just be unloaded again
+        song.load()
+        return song.loaded
+
+    # Songs are looked up here, so only the main thread ever adds to MUSIC
+    songs = [MUSIC.get(nid) for nid in songs if nid]
+    return [(('music', song.nid), lambda song=song: load_song(song)) for song in songs if song]
+
+def _tileset_jobs(tilemap_nids: Iterable[NID]) -> List[Job]:
+    from app.data.resources.resources import RESOURCES
+
+    def load_tileset(tileset) -> bool:
+        if not _has_room():
+            return False
+        IMAGE_CACHE.load(tileset, 'image', tileset.full_path)
+        if tileset.autotile_full_path:
+            IMAGE_CACHE.load(tileset, 'autotile_image', tileset.autotile_full_path)
+        return True
+
+    tilesets = {}
+    for tilemap_nid in tilemap_nids:
+        prefab = RESOURCES.tilemaps.get(tilemap_nid)
+        if not prefab:
+            continue
+        for layer in prefab.layers:
+            for tile_sprite in layer.sprite_grid.values():
+                tileset = RESOURCES.tilesets.get(tile_sprite.tileset_nid)
+                if tileset:
+                    tilesets[tileset.nid] = tileset
+    return [(('tileset', nid), lambda tileset=tileset: load_tileset(tileset)) for nid, tileset in tilesets.items()]
+
+def _map_sprite_jobs(game: GameState, units: list) -> List[Job]:
+    from app.engine import unit_sprite
+
+    # Bound now, since starting another level replaces the registry
+    registry = game.map_sprite_registry
+
+    def load_map_sprite(res, team) -> bool:
+        if not _has_room():
+            return False
+        key = res.nid + '_' + team
+        # The main thread could be building the same sprite right now
+        with unit_sprite.MAP_SPRITE_LOCK:
+            if key not in registry:
+                registry[key] = unit_sprite.MapSprite(res, team)
+        return True
+
+    jobs = {}
+    for unit in units:
+        res = unit_sprite.get_map_sprite_res(unit)
+        if res:
+            key = res.nid + '_' + unit.team
+            jobs[key] = (('map_sprite', key), lambda res=res, team=unit.team: load_map_sprite(res, team))
+    return list(jobs.values())
+
+def _anim_distance(distance: int) -> int:
+    # Every distance past 1 uses the same ranged animation
+    return min(max(distance, 1), 2)
+
+def _battle_anim_jobs(units: list) -> List[Job]:
+    from app.engine import battle_animation, item_funcs, item_system
+
+    def load_battle_anim(found: tuple) -> bool:
+        if not _has_room():
+            return False
+        battle_animation.BattleAnimation.prefetch(*found)
+        return True
+
+    jobs = {}
+    for unit in units:
+        for item in [None] + unit.items:
+            if item and not (item_system.is_weapon(unit, item) or item_system.is_spell(unit, item)):
+                continue
+            distances = {_anim_distance(r) for r in item_funcs.get_range(unit, item)} if item else {1}
+            for distance in sorted(distances or {1}):
+                try:
+                    found = battle_animation.find_battle_anim(unit, item, distance)
+                except Exception as e:
+                    logging.debug("Skipping prefetch of battle anim for %s with %s: %s", unit, item, e)
+                    continue
+                if found:
+                    key = battle_animation.get_anim_hash(*found)
+                    jobs[key] = (('battle_anim', key), lambda found=found: load_battle_anim(found))
+    return list(jobs.values())
+
+def plan_level(game: GameState, songs: Iterable[NID]) -> List[Job]:
+    """Everything the current level might need soon, in the order it will probably be needed"""
+    from app.data.database.database import DB
+    from app.events import event_commands
+    import app.engine.config as cf
+
+    units = {}
+    if game.current_party in game.parties:
+        units.update({unit.nid: unit for unit in game.get_units_in_party()})
+    # Units on the map are more likely to fight before reinforcements do
+    for unit in sorted(game.level.units, key=lambda unit: unit.position is None):
+        units[unit.nid] = unit
+    units = [unit for unit in units.values() if not unit.dead]
+
+    tilemap_nids = [command.parameters.get('Tilemap') for command in
+                    DB.events.inspector.find_all_calls_of_command(event_commands.ChangeTilemap(), game.level.nid).values()]
+
+    jobs = _song_jobs(songs)
+    jobs += _map_sprite_jobs(game, units)
+    jobs += _tileset_jobs(tilemap_nids)
+    if cf.SETTINGS['animation'] != 'Never':
+        jobs += _battle_anim_jobs(units)
+    return jobs
+
+def start_level(game: GameState, songs: Iterable[NID]) -> threading.Thread:
+    return PREFETCHER.start(plan_level(game, songs))
@@ -0,0 +1,173 @@
+"""
+Times named scopes each frame, to find out what a slow frame was spent on.
+
+    with PROFILER.scope('map_view.units'):
+        ...
+
+    @profiled('ai.think')
+    def think(self):
+        ...
+
+Off unless the profile setting is on, or until it is switched on in game
+with F10. While off, a scope is one attribute check that hands back a
+shared context manager that does nothing, so the scopes can stay in
+release builds. While on, the last HISTORY_FRAMES frames are kept, the
+mean time spent in each scope over the last second is drawn over the
+game, and F11 writes the kept frames out as a Chrome trace, which can be
+opened in chrome://tracing or https://ui.perfetto.dev
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.constants import FPS
+
+HISTORY_FRAMES = FPS * 10
+
+# (Name, Argument, Start ns, End ns)
+Record = Tuple[str, Optional[str], int, int]
+
+class _NullScope():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SCOPE = _NullScope()
+
+class _Scope():
+    __slots__ = ('profiler', 'name', 'arg', 'start')
+
+    def __init__(self, profiler: Profiler, name: str, arg: Optional[str]):
+        self.profiler = profiler
+        self.name = name
+        self.arg = arg
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.records.append((self.name, self.arg, self.start, time.perf_counter_ns()))
+        return False
+
+class Profiler():
+    def __init__(self, history: int = HISTORY_FRAMES):
+        self.enabled: bool = False
+        # Scopes closed so far this frame
+        self.records: List[Record] = []
+        self.frame_start: int = 0
+        # (Start ns, End ns, Records) of each finished frame
+        self.frames: Deque[Tuple[int, int, List[Record]]] = deque(maxlen=history)
+        # Name -> ns spent in that scope, for each of the last FPS frames
+        self.totals: Deque[Tuple[int, Dict[str, int]]] = deque(maxlen=FPS)
+
+    def scope(self, name: str, arg: str = None):
+        """
+        Times everything in the with block as name. arg is shown alongside it
+        in the trace, so the name can stay the same, like which state updated
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name, arg)
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self.records = []
+            self.frame_start = time.perf_counter_ns()
+
+    def disable(self):
+        self.enabled = False
+        self.records = []
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def clear(self):
+        self.records = []
+        self.frames.clear()
+        self.totals.clear()
+
+    def next_frame(self):
+        """Finishes the frame so far and starts the next one. Called once at the top of the game loop"""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        totals = {}
+        for name, _, start, end in self.records:
+            totals[name] = totals.get(name, 0) + end - start
+        self.frames.append((self.frame_start, now, self.records))
+        self.totals.append((now - self.frame_start, totals))
+        self.records = []
+        self.frame_start = now
+
+    def breakdown(self) -> Tuple[float, List[Tuple[str, float]]]:
+        """
+        Mean ms per frame over the last second, and the mean ms per frame
+        spent in each scope, slowest first. Nested scopes count towards
+        both their own time and the time of the scopes around them
+        """
+        if not self.totals:
+            return 0, []
+        num_frames = len(self.totals)
+        frame_ns = 0
+        scope_ns = {}
+        for frame, totals in self.totals:
+            frame_ns += frame
+            for name, ns in totals.items():
+                scope_ns[name] = scope_ns.get(name, 0) + ns
+        scopes = [(name, ns / num_frames / 1e6) for name, ns in scope_ns.items()]
+        scopes.sort(key=lambda scope: -scope[1])
+        return frame_ns / num_frames / 1e6, scopes
+
+    def chrome_trace(self) -> dict:
+        """The kept frames in Chrome's Trace Event Format, with times in microseconds"""
+        events = []
+        if not self.frames:
+            return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        origin = self.frames[0][0]
+        for frame_num, (frame_start, frame_end, records) in enumerate(self.frames):
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': (frame_start - origin) / 1000, 'dur': (frame_end - frame_start) / 1000,
+                           'args': {'frame': frame_num}})
+            for name, arg, start, end in records:
+                event = {'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                         'ts': (start - origin) / 1000, 'dur': (end - start) / 1000}
+                if arg is not None:
+                    event['args'] = {'arg': arg}
+                events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path: str) -> str:
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'w') as fp:
+            json.dump(self.chrome_trace(), fp)
+        return path
+
+PROFILER = Profiler()
+
+def profiled(name: str):
+    """Times every call to the decorated function as a scope called name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with _Scope(PROFILER, name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -2,51 +2,141 @@ from app.data.resources.sounds import SongPrefab
 from app.utilities.data import HasNid
 from app.utilities.typing import NID
 from enum import Enum
-from typing import Set, List
+from typing import Optional, Set, List
+import threading
 import pygame
 
 from app.utilities import utils
 from app.data.resources.resources import RESOURCES
 from app.engine import engine
+from app.engine.prefetch import PREFETCHER
+from app.engine.profiler import profiled
+import app.engine.config as cf
 
 import logging
 
+def sound_bytes(sound: Optional[pygame.mixer.Sound]) -> int:
+    """How much memory the decoded sound takes up"""
+    if not sound or not pygame.mixer.get_init():
+        return 0
+    frequency, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * (abs(size) // 8) * channels
+
 class SongObject(HasNid):
+    """
+    The sounds of a song are only decoded when it is about to be played,
+    on a background thread so that changing songs does not hitch.
+    Until then, song, battle and intro are None.
+    Songs that are not in use can be unloaded again, to keep memory flat.
+    """
     def __init__(self, prefab: SongPrefab):
         self.nid = prefab.nid
-        self.song = pygame.mixer.Sound(prefab.full_path)
-        self.battle = pygame.mixer.Sound(prefab.battle_full_path) if prefab.battle_full_path else None
-        self.intro = pygame.mixer.Sound(prefab.intro_full_path) if prefab.intro_full_path else None
+        self.prefab = prefab
+        self.has_battle: bool = bool(prefab.battle_full_path)
+        self.has_intro: bool = bool(prefab.intro_full_path)
+
+        self.song: Optional[pygame.mixer.Sound] = None
+        self.battle: Optional[pygame.mixer.Sound] = None
+        self.intro: Optional[pygame.mixer.Sound] = None
+        self.loaded: bool = False
+        self.failed: bool = False
+        self.num_bytes: int = 0
+        self.last_used: int = 0
+
+        self._lock = threading.Lock()
+        self._loading: bool = False
 
         self.channel = None
 
+    def load(self):
+        """Decodes the song and its variants. Blocks, so is safe to call from any thread"""
+        with self._lock:
+            if self.loaded or self.failed:
+                return
+            logging.debug("Decoding %s", self.nid)
+            try:
+                song = pygame.mixer.Sound(self.prefab.full_path)
+                battle = pygame.mixer.Sound(self.prefab.battle_full_path) if self.has_battle else None
+                intro = pygame.mixer.Sound(self.prefab.intro_full_path) if self.has_intro else None
+            except pygame.error as e:
+                logging.warning("Could not load song %s: %s", self.nid, e)
+                self.failed = True
+                return
+            self.song, self.battle, self.intro = song, battle, intro
+            self.num_bytes = sound_bytes(song) + sound_bytes(battle) + sound_bytes(intro)
+            self.loaded = True
+
+    def load_async(self):
+        if self.loaded or self.failed or self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        finally:
+            self._loading = False
+
+    def unload(self):
+        with self._lock:
+            if self.loaded:
+                logging.debug("Unloading %s", self.nid)
+            self.song, self.battle, self.intro = None, None, None
+            self.num_bytes = 0
+            self.loaded = False
+
+    def in_use(self) -> bool:
+        return bool(self.channel and self.channel.current_song is self)
+
 class MusicDict(dict):
+    """
+    Every song that has been asked for. Keeps at most max_bytes of them
+    decoded at once (0 for no limit), besides those that are on a channel
+    """
+    def __init__(self, max_bytes: int = 0):
+        super().__init__()
+        self.max_bytes = max_bytes
+
     def preload(self, nids):
         for nid in nids:
-            self.get(nid)
+            if self.max_bytes and self.bytes_resident() > self.max_bytes:
+                break  # The rest would just be unloaded again
+            song = self.get(nid)
+            if song:
+                song.load()
 
     def get(self, val):
         if val not in self:
-            logging.debug("Loading %s into MusicDict", val)
             prefab = RESOURCES.music.get(val)
             if prefab:
-                try:
-                    self[val] = SongObject(prefab)
-                except pygame.error as e:
-                    logging.warning(e)
-                    return None
+                self[val] = SongObject(prefab)
             else:
                 return None
         return self[val]
 
+    def bytes_resident(self) -> int:
+        return sum(song.num_bytes for song in self.values())
+
+    def trim(self):
+        """Unloads the least recently played songs that are not in use until under budget"""
+        if not self.max_bytes:
+            return
+        resident = self.bytes_resident()
+        unused = sorted((song for song in self.values() if song.loaded and not song.in_use()),
+                        key=lambda song: song.last_used)
+        for song in unused:
+            if resident <= self.max_bytes:
+                break
+            resident -= song.num_bytes
+            song.unload()
+
     def clear(self, song_to_keep: NID = None):
-        if not song_to_keep:
-            super().clear()
-        else:
-            our_keys = list(self.keys())
-            for key in our_keys:
-                if key != song_to_keep:
-                    del self[key]
+        for key, song in list(self.items()):
+            if key != song_to_keep:
+                if not song.in_use():
+                    song.unload()
+                del self[key]
 
 class SoundDict(dict):
     def get(self, val):
@@ -88,7 +178,19 @@ class Channel():
         # Because if we don't, we'll keep thinking play means we've changed songs and keep doing it
         # again and again
 
+        self.waiting_for_load = False  # Told to play before the song finished decoding
+
     def update(self, event_list, current_time):
+        if self.waiting_for_load and self.state not in ("stopped", "paused"):
+            if self.current_song and self.current_song.failed:
+                # The SoundController takes it back off the song stack
+                self.waiting_for_load = False
+            elif self.current_song and self.current_song.loaded:
+                self.waiting_for_load = False
+                self._play()
+            if self.state in ("fade_in", "crossfade_in"):
+                # Hold the fade in until there is something to hear
+                self.last_update = current_time
         if self.state == "stopped":
             pass
         if self.state in self.playing_states:
@@ -147,6 +249,12 @@ class Channel():
             self.last_state = "stopped"
             self.state = "stopped"
             return
+        if not self.current_song.loaded:
+            # Starts playing from update once it has been decoded
+            self.current_song.load_async()
+            self.waiting_for_load = not self.current_song.failed
+            return
+        self.current_song.last_used = self.last_play
         if self.num_plays > 0:
             self.num_plays -= 1
 
@@ -181,6 +289,7 @@ class Channel():
         self.current_song = None
         self.num_plays = 0
         self.played_intro = False
+        self.waiting_for_load = False
         self.last_state = "stopped"
         self.state = "stopped"
 
@@ -237,11 +346,12 @@ class Channel():
         logging.debug("%s Stop: %s", self.nid, self.last_state)
         self._channel.stop()
         self.played_intro = False
+        self.waiting_for_load = False
         self.last_state = "stopped"
         self.state = "stopped"
 
     def is_playing(self) -> bool:
-        return self._channel.get_busy()
+        return self._channel.get_busy() or self.waiting_for_load
 
     def set_volume(self, volume):
         self.global_volume = volume
@@ -460,20 +570,23 @@ class SoundController():
         self.channel_stack.append(oldest_channel)
         oldest_channel.set_fade_in_time(fade_in)
         oldest_channel.set_current_song(song, num_plays)
+        PREFETCHER.record_use(('music', song.nid), song.loaded)
+        song.load_async()
+        MUSIC.trim()
 
     def battle_fade_in(self, next_song, fade=DEFAULT_FADE_TIME_MS, from_start=True):
         song = MUSIC.get(next_song)
         if not song:
             logging.warning("Song does not exist")
             return None
-        if song.battle:
+        if song.has_battle:
             self.crossfade(fade)
             return song
         else:
             return self.fade_in(next_song, fade_in=fade, from_start=from_start)
 
     def battle_fade_back(self, song, from_start=True):
-        if song.battle:
+        if song.has_battle:
             self.crossfade()
         elif from_start:
             self.fade_back()
@@ -496,6 +609,9 @@ class SoundController():
         if not next_song:
             logging.warning("Song does not exist")
             return None
+        if next_song.failed:
+            logging.warning("Song %s could not be loaded", next_song.nid)
+            return None
 
         any_music_is_playing = self.is_playing()
         current_song = self.get_current_song()
@@ -589,8 +705,48 @@ class SoundController():
         self.current_channel.stop()
         self.state = GlobalMusicState.STOPPED
 
+    def _drop_failed_songs(self):
+        """
+        Songs are decoded in the background once they have been faded in,
+        so can turn out not to load after they are already on the song stack.
+        Takes them back off, so whatever was playing before keeps playing
+        """
+        for channel in list(self.channel_stack):
+            song = channel.current_song
+            if not song or not song.failed:
+                continue
+            logging.error("Could not load song %s, so it will not be played", song.nid)
+            was_current = channel is self.current_channel
+            if song in self.song_stack:
+                self.song_stack.remove(song)
+            channel.clear()
+            self.channel_stack.remove(channel)
+            self.channel_stack.insert(0, channel)
+            if was_current:
+                self._resume_previous_song()
+
+    def _resume_previous_song(self):
+        previous_song = self.song_stack[-1] if self.song_stack else None
+        if not previous_song:
+            if self.current_channel.is_fading_out():
+                self.state = GlobalMusicState.FADE_OUT_TO_STOP
+            else:
+                self.state = GlobalMusicState.STOPPED
+            return
+        logging.info("Going back to %s", previous_song.nid)
+        if previous_song.channel and previous_song.channel.current_song is previous_song:
+            self.channel_stack.remove(previous_song.channel)
+            self.channel_stack.append(previous_song.channel)
+        else:
+            self._set_next_song(previous_song, -1)
+        self.current_channel.set_volume(self.global_music_volume)
+        self.current_channel.fade_in()
+        self.state = GlobalMusicState.FADE_IN
+
+    @profiled('sound.update')
     def update(self, event_list):
         current_time = engine.get_time()
+        self._drop_failed_songs()
 
         any_changes = False
         for channel in self.channel_stack:
@@ -667,7 +823,7 @@ class SoundController():
         SFX.clear()
         self.__init__()
 
-MUSIC = MusicDict()
+MUSIC = MusicDict(int(cf.SETTINGS['music_cache_mb']) * 2**20)
 SFX = SoundDict()
 
 _soundthread: SoundController = None
@@ -7,6 +7,7 @@ if TYPE_CHECKING:
 
 import logging
 
+from app.engine.profiler import PROFILER
 
 class SimpleStateMachine():
     def __init__(self, starting_state):
@@ -231,24 +232,28 @@ class StateMachine():
         # Start
         if not state.started:
             state.started = True
-            start_output = state.start()
+            with PROFILER.scope('state.start', state.name):
+                start_output = state.start()
             if start_output == 'repeat':
                 repeat_flag = True
             self.prev_state = state.name
         # Begin
         if not repeat_flag and not state.processed:
             state.processed = True
-            begin_output = state.begin()
+            with PROFILER.scope('state.begin', state.name):
+                begin_output = state.begin()
             if begin_output == 'repeat':
                 repeat_flag = True
         # Take Input
         if not repeat_flag:
-            input_output = state.take_input(event)
+            with PROFILER.scope('state.take_input', state.name):
+                input_output = state.take_input(event)
             if input_output == 'repeat':
                 repeat_flag = True
         # Update
         if not repeat_flag:
-            update_output = state.update()
+            with PROFILER.scope('state.update', state.name):
+                update_output = state.update()
             if update_output == 'repeat':
                 repeat_flag = True
         # Draw
@@ -261,7 +266,8 @@ class StateMachine():
                 else:
                     break
             while idx <= -1:
-                surf = self.state[idx].draw(surf)
+                with PROFILER.scope('state.draw', self.state[idx].name):
+                    surf = self.state[idx].draw(surf)
                 idx += 1
         # End
         if self.temp_state and state.processed:
@@ -14,6 +14,25 @@ if TYPE_CHECKING:
     from app.engine.objects.unit import UnitObject
     from app.engine.objects.item import ItemObject
 
+# Fewer moves than this are faster to shell one at a time
+MIN_MASK_MOVES = 4
+
+@lru_cache(256)
+def _row_mask(width: int, height: int, dy: int) -> int:
+    """Bitmask (bit x * height + y) of every position on a width x height grid
+    that stays on the grid when moved dy along the y axis"""
+    if dy >= 0:
+        column = (1 << max(height - dy, 0)) - 1
+    else:
+        column = ((1 << max(height + dy, 0)) - 1) << -dy
+    return column * sum(1 << (x * height) for x in range(width))
+
+@lru_cache(256)
+def _rect_mask(width: int, height: int, min_x: int, min_y: int, max_x: int, max_y: int) -> int:
+    """Bitmask (bit x * height + y) of the positions within a rectangle (inclusive)"""
+    column = ((1 << (max_y - min_y + 1)) - 1) << min_y
+    return column * sum(1 << (x * height) for x in range(min_x, max_x + 1))
+
 class TargetSystem():
     def __init__(self, game: GameState = None):
         if game:
@@ -36,6 +55,8 @@ class TargetSystem():
         Returns:
             The set of positions in the shell within {bounds} and that fall within the {manhattan_restriction}
         """
+        if len(valid_moves) >= MIN_MASK_MOVES:
+            return self._get_shell_mask(valid_moves, potential_range, bounds, manhattan_restriction)
         valid_attacks = set()
         if manhattan_restriction:
             for valid_move in valid_moves:
@@ -45,6 +66,41 @@ class TargetSystem():
                 valid_attacks |= self.find_manhattan_spheres(potential_range, valid_move[0], valid_move[1])
         return {pos for pos in valid_attacks if bounds[0] <= pos[0] <= bounds[2] and bounds[1] <= pos[1] <= bounds[3]}
 
+    def _get_shell_mask(self, valid_moves: Set[Pos], potential_range: Set[int],
+                        bounds: Tuple[int, int, int, int], manhattan_restriction: Optional[Set[Pos]] = None) -> Set[Pos]:
+        """Same as get_shell, but marks the valid moves in a bitmask and dilates it
+        by the shape of the range instead of building a set for every move.
+        The grid covers the bounds plus a border as wide as the range, so every
+        move that could reach into the bounds has a place on it"""
+        kernel = self._cached_base_manhattan_spheres(frozenset(potential_range))
+        if manhattan_restriction:
+            kernel = {offset for offset in kernel if offset in manhattan_restriction}
+        if not kernel:
+            return set()
+        border = max(max(abs(dx), abs(dy)) for dx, dy in kernel)
+        left, top = bounds[0] - border, bounds[1] - border
+        width = bounds[2] - bounds[0] + 1 + 2 * border
+        height = bounds[3] - bounds[1] + 1 + 2 * border
+
+        moves = 0
+        for x, y in valid_moves:
+            x -= left
+            y -= top
+            if 0 <= x < width and 0 <= y < height:
+                moves |= 1 << (x * height + y)
+
+        attacks = 0
+        for dx, dy in kernel:
+            # Drop the moves that would wrap around into the next column
+            shifted = moves & _row_mask(width, height, dy)
+            offset = dx * height + dy
+            attacks |= (shifted << offset) if offset >= 0 else (shifted >> -offset)
+        attacks &= _rect_mask(width, height, border, border, width - 1 - border, height - 1 - border)
+
+        # Bit i is set where the ith character from the end is a 1
+        bits = bin(attacks)[:1:-1]
+        return {(idx // height + left, idx % height + top) for idx, bit in enumerate(bits) if bit == '1'}
+
     def restricted_manhattan_spheres(self, rng: Set[int], x: int, y: int, manhattan_restriction: Set[Pos]) -> Set[Pos]:
         sphere = self._cached_base_manhattan_spheres(frozenset(rng))
         sphere = {(a + x, b + y) for (a, b) in sphere if (a, b) in manhattan_restriction}
@@ -290,11 +346,13 @@ class TargetSystem():
         item_range = item_funcs.get_range(unit, item)
         restriction = item_system.range_restrict(unit, item)
         valid_moves: Set[Pos] = set()
-        for move in moves:
-            possible_strike_locations = \
-                self.get_shell({move}, item_range, self.game.board.bounds, restriction)
-            if target in possible_strike_locations:
-                valid_moves.add(move)
+        if self.game.board.check_bounds(target):
+            # Same as checking whether the target is in the shell around each move
+            for move in moves:
+                offset = (target[0] - move[0], target[1] - move[1])
+                if abs(offset[0]) + abs(offset[1]) in item_range and \
+                        (not restriction or offset in restriction):
+                    valid_moves.add(move)
 
         # Filter away possible attacks that aren't in line of sight
         if DB.constants.value('line_of_sight') and not item_system.ignore_line_of_sight(unit, item):
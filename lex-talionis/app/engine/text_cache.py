@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Hashable, List, Tuple
+
+from app.engine import engine
+from app.engine.image_cache import surface_bytes
+
+if TYPE_CHECKING:
+    from app.engine.bmpfont import BmpFont
+
+class TextCache():
+    """
+    Rendered strings, so that text that is drawn every frame, like menu
+    options, labels and dialog, is only drawn a character at a time the
+    first time, and is one blit after that.
+
+    Keyed by the font, the string and the color. Where the string is
+    drawn, and how it is aligned, only changes where the one surface is
+    blitted. Bounded by how many bytes of surfaces it holds, releasing
+    the least recently used strings first.
+    """
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        # Key -> (Surface, How far left of the position it starts, Spans of columns drawn in)
+        self.entries: Dict[Hashable, Tuple[engine.Surface, int, List[Tuple[int, int]]]] = OrderedDict()
+        self.bytes_resident: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, font: BmpFont, string: str, color: str) -> Tuple[engine.Surface, int, List[Tuple[int, int]]]:
+        key = (font, string, color)
+        rendered = self.entries.get(key)
+        if rendered:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return rendered
+        self.misses += 1
+        rendered = font.render(string, color)
+        self.entries[key] = rendered
+        self.bytes_resident += surface_bytes(rendered[0])
+        self._evict()
+        return rendered
+
+    def _evict(self):
+        # Never evict what was just added, even if it alone is over budget
+        while self.max_bytes and self.bytes_resident > self.max_bytes and len(self.entries) > 1:
+            _, (surf, _, _) = self.entries.popitem(last=False)
+            self.bytes_resident -= surface_bytes(surf)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_resident = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.
+
+    def log_stats(self):
+        logging.info("Text cache: %d hits, %d misses, %d evictions, %d strings using %.1f MB",
+                     self.hits, self.misses, self.evictions, len(self.entries), self.bytes_resident / 2**20)
+
+TEXT_CACHE = TextCache(4 * 2**20)
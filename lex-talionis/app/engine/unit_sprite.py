@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional
 
 from app.data.database.units import UnitPrefab
 from app.engine.game_counters import ANIMATION_COUNTERS
@@ -21,27 +22,31 @@ from app.engine import engine, image_mods, health_bar, equations
 from app.engine import item_funcs, item_system, skill_system, particles
 import app.engine.config as cf
 from app.engine.animations import Animation
+from app.engine.image_cache import IMAGE_CACHE
+from app.engine.palette_cache import PALETTE_CACHE
+from app.engine.prefetch import PREFETCHER
 from app.engine.game_state import game
 from app.utilities.typing import NID, Color3
 
 import logging
 
+# Held while looking up or adding to the map sprite registry, which the prefetcher also fills
+MAP_SPRITE_LOCK = threading.Lock()
+
 class MapSprite():
     def __init__(self, map_sprite, team):
         self.nid = map_sprite.nid
         self.team = team
         self.resource = map_sprite
-        if not map_sprite.standing_image:
-            map_sprite.standing_image = engine.image_load(map_sprite.stand_full_path)
-        if not map_sprite.moving_image:
-            map_sprite.moving_image = engine.image_load(map_sprite.move_full_path)
-        stand, move = self.convert_to_team_colors(map_sprite)
+        # Kept as our own references, since loading one image can make the cache let go of another
+        standing_image = IMAGE_CACHE.load(map_sprite, 'standing_image', map_sprite.stand_full_path)
+        moving_image = IMAGE_CACHE.load(map_sprite, 'moving_image', map_sprite.move_full_path)
+        stand, move = self.convert_to_team_colors(map_sprite, standing_image, moving_image)
         engine.set_colorkey(stand, COLORKEY, rleaccel=True)
         engine.set_colorkey(move, COLORKEY, rleaccel=True)
         self.passive = [engine.subsurface(stand, (num*64, 0, 64, 48)) for num in range(3)]
         if DB.constants.value('autogenerate_grey_map_sprites'):
-            gray_stand = map_sprite.standing_image.copy()
-            self.gray = self.create_gray([engine.subsurface(gray_stand, (num*64, 0, 64, 48)) for num in range(3)])
+            self.gray = self.create_gray(map_sprite, standing_image)
         else:
             self.gray = [engine.subsurface(stand, (num*64, 48, 64, 48)) for num in range(3)]
         self.active = [engine.subsurface(stand, (num*64, 96, 64, 48)) for num in range(3)]
@@ -50,9 +55,10 @@ class MapSprite():
         self.right = [engine.subsurface(move, (num*48, 80, 48, 40)) for num in range(4)]
         self.up = [engine.subsurface(move, (num*48, 120, 48, 40)) for num in range(4)]
 
-    def convert_to_team_colors(self, map_sprite):
+    def convert_to_team_colors(self, map_sprite, standing_image, moving_image):
         if self.team == 'black':
-            palette = RESOURCES.combat_palettes.get('map_sprite_black')
+            palette_nid = 'map_sprite_black'
+            palette = RESOURCES.combat_palettes.get(palette_nid)
             if palette:
                 colors: List[Color3] = palette.get_colors()
             else:
@@ -68,22 +74,24 @@ class MapSprite():
                 colors: List[Color3] = default_palettes['map_sprite_black']
 
         conversion_dict = {a: b for a, b in zip(default_palettes['map_sprite_blue'], colors)}
-        return image_mods.color_convert(map_sprite.standing_image, conversion_dict), \
-            image_mods.color_convert(map_sprite.moving_image, conversion_dict)
+        return PALETTE_CACHE.get(('map_sprite', map_sprite.stand_full_path), standing_image, palette_nid, conversion_dict), \
+            PALETTE_CACHE.get(('map_sprite', map_sprite.move_full_path), moving_image, palette_nid, conversion_dict)
 
-    def create_gray(self, imgs):
+    def create_gray(self, map_sprite, standing_image):
         palette = RESOURCES.combat_palettes.get('map_sprite_wait')
         if palette:
             colors: List[Color3] = palette.get_colors()
         else:
             colors: List[Color3] = default_palettes['map_sprite_wait']
         conversion_dict = {a: b for a, b in zip(default_palettes['map_sprite_blue'], colors)}
-        imgs = [image_mods.color_convert(img, conversion_dict) for img in imgs]
-        for img in imgs:
-            engine.set_colorkey(img, COLORKEY, rleaccel=True)
-        return imgs
-
-def load_map_sprite(unit: UnitObject | UnitPrefab, team='player'):
+        # Only the top row is ever grayed, and it looks the same for every team
+        passive = engine.subsurface(standing_image, (0, 0, 192, 48))
+        gray_stand = PALETTE_CACHE.get(('map_sprite', map_sprite.stand_full_path, 'passive'), passive,
+                                       'map_sprite_wait', conversion_dict)
+        engine.set_colorkey(gray_stand, COLORKEY, rleaccel=True)
+        return [engine.subsurface(gray_stand, (num*64, 0, 64, 48)) for num in range(3)]
+
+def get_map_sprite_res(unit: UnitObject | UnitPrefab):
     klass = DB.classes.get(unit.klass)
     nid = klass.map_sprite_nid
     variant = skill_system.change_variant(unit) if isinstance(unit, UnitObject) else unit.variant
@@ -92,15 +100,34 @@ def load_map_sprite(unit: UnitObject | UnitPrefab, team='player'):
     res = RESOURCES.map_sprites.get(nid)
     if not res:  # Try without unit variant
         res = RESOURCES.map_sprites.get(klass.map_sprite_nid)
+    return res
+
+def load_map_sprite(unit: UnitObject | UnitPrefab, team='player'):
+    res = get_map_sprite_res(unit)
     if not res:
         return None
 
-    map_sprite = game.map_sprite_registry.get(res.nid + '_' + team)
-    if not map_sprite:
-        map_sprite = MapSprite(res, team)
-        game.map_sprite_registry[map_sprite.nid + '_' + team] = map_sprite
+    key = res.nid + '_' + team
+    with MAP_SPRITE_LOCK:
+        map_sprite = game.map_sprite_registry.get(key)
+        PREFETCHER.record_use(('map_sprite', key), bool(map_sprite))
+        if not map_sprite:
+            map_sprite = MapSprite(res, team)
+            game.map_sprite_registry[key] = map_sprite
     return map_sprite
 
+def get_marker_unit() -> Optional[UnitObject]:
+    """The unit whose talk options and targets are marked over other units, if any"""
+    if game.state.current() == 'free':
+        return game.cursor.get_hover()
+    elif game.state.current() in ('move', 'menu', 'item', 'item_child', 'item_discard',
+                                  'weapon_choice', 'spell_choice', 'targeting',
+                                  'combat_targeting', 'item_targeting'):
+        return game.cursor.cur_unit
+    elif game.state.current() == 'free_roam':
+        return game.get_roam_unit()
+    return None
+
 class UnitSprite():
     default_transition_time = 450
 
@@ -429,17 +456,20 @@ class UnitSprite():
             elif self.transition_state == 'swoosh_move':
                 self.set_transition('swoosh_in')
 
-    def select_frame(self, image, state):
+    def get_frame_index(self, state) -> int:
         if self.unit.is_dying:
-            return image[0].copy()
+            return 0
         elif state == 'passive' or state == 'gray':
-            return image[ANIMATION_COUNTERS.passive_sprite_counter.count].copy()
+            return ANIMATION_COUNTERS.passive_sprite_counter.count
         elif state == 'active':
-            return image[ANIMATION_COUNTERS.active_sprite_counter.count].copy()
+            return ANIMATION_COUNTERS.active_sprite_counter.count
         elif state == 'combat_anim':
-            return image[ANIMATION_COUNTERS.fast_move_sprite_counter.count].copy()
+            return ANIMATION_COUNTERS.fast_move_sprite_counter.count
         else:
-            return image[ANIMATION_COUNTERS.move_sprite_counter.count].copy()
+            return ANIMATION_COUNTERS.move_sprite_counter.count
+
+    def select_frame(self, image, state):
+        return image[self.get_frame_index(state)].copy()
 
     def create_image(self, state):
         if not self.map_sprite:  # This shouldn't happen, but if it does...
@@ -574,15 +604,7 @@ class UnitSprite():
 
     def draw_markers(self, surf, cull_rect):
         # Talk Options
-        cur_unit = None
-        if game.state.current() == 'free':
-            cur_unit = game.cursor.get_hover()
-        elif game.state.current() in ('move', 'menu', 'item', 'item_child', 'item_discard',
-                                      'weapon_choice', 'spell_choice', 'targeting',
-                                      'combat_targeting', 'item_targeting'):
-            cur_unit = game.cursor.cur_unit
-        elif game.state.current() == 'free_roam':
-            cur_unit = game.get_roam_unit()
+        cur_unit = get_marker_unit()
         if not cur_unit:
             return surf
 
@@ -626,31 +648,60 @@ class UnitSprite():
                 return True
         return False
 
-    def draw_hp(self, surf, cull_rect, event=False):
-        current_time = engine.get_time()
-        left, top = self.get_topleft(cull_rect)
-
-        if not event and self.check_draw_hp():
-            self.health_bar.draw(surf, left, top)
-
+    def get_tag_icon(self, current_time: int) -> Optional[engine.Surface]:
+        """The boss, elite or protect icon, while it is blinking on"""
         if self.transition_state == 'normal' and not self.unit.is_dying and \
                 self.image_state in ('gray', 'passive') and int((current_time%450) // 150) in (1, 2):
-            icon = None
             if 'Boss' in self.unit.tags:
-                icon = SPRITES.get('boss_icon')
+                return SPRITES.get('boss_icon')
             elif 'Elite' in self.unit.tags:
-                icon = SPRITES.get('elite_icon')
+                return SPRITES.get('elite_icon')
             elif 'Protect' in self.unit.tags:
                 team_color = DB.teams.get(self.unit.team).combat_color
-                icon = SPRITES.get('protect_%s_icon' % team_color, 'protect_icon')
-            if icon:
-                surf.blit(icon, (left - 8, top - 8))
+                return SPRITES.get('protect_%s_icon' % team_color, 'protect_icon')
+        return None
 
+    def get_rescue_icon(self) -> Optional[engine.Surface]:
         if self.unit.traveler and self.transition_state == 'normal' and \
                 not self.unit.is_dying and not DB.constants.value('pairup'):
             traveler_team = game.get_unit(self.unit.traveler).team
             team_color = DB.teams.get(traveler_team).combat_color
-            rescue_icon = SPRITES.get('rescue_icon_%s' % team_color, 'rescue_icon_green')
+            return SPRITES.get('rescue_icon_%s' % team_color, 'rescue_icon_green')
+        return None
+
+    def get_draw_key(self, cull_rect, event=False) -> Optional[tuple]:
+        """
+        Returns everything that draw and draw_hp depend on while the unit is
+        just standing on the map, so the map view can tell when it has to be
+        drawn again. Returns None if the sprite is moving, fading, flickering,
+        or otherwise changing in a way that has to be drawn every frame
+        """
+        if self.state != 'normal' or self.transition_state != 'normal' or not self.map_sprite or \
+                self.vibrate or self.flicker or self.animations or self.particles or self.damage_numbers or \
+                self.unit.is_dying or game.action_log.hovered_unit is self.unit or \
+                (DB.constants.value('pairup') and self.unit.traveler) or \
+                skill_system.unit_sprite_flicker_tint(self.unit):
+            return None
+        current_time = engine.get_time()
+        boundary_tint = game.boundary.draw_flag and self.unit.nid in game.boundary.displaying_units
+        hp = (self.health_bar.displayed_hp, self.unit.get_max_hp()) if not event and self.check_draw_hp() else None
+        droppable = any((i.droppable for i in self.unit.items))
+        return (self.map_sprite, self.image_state, self.get_frame_index(self.image_state), self.get_topleft(cull_rect),
+                boundary_tint, hp, self.get_tag_icon(current_time), self.get_rescue_icon(), droppable)
+
+    def draw_hp(self, surf, cull_rect, event=False):
+        current_time = engine.get_time()
+        left, top = self.get_topleft(cull_rect)
+
+        if not event and self.check_draw_hp():
+            self.health_bar.draw(surf, left, top)
+
+        icon = self.get_tag_icon(current_time)
+        if icon:
+            surf.blit(icon, (left - 8, top - 8))
+
+        rescue_icon = self.get_rescue_icon()
+        if rescue_icon:
             topleft = (left - 8, top - 8)
             surf.blit(rescue_icon, topleft)
 
@@ -19,6 +19,7 @@ from app.engine.game_state import GameState
 from app.engine.movement import movement_funcs
 from app.engine.objects.overworld import OverworldNodeObject
 from app.engine.objects.unit import UnitObject
+from app.engine.profiler import profiled
 from app.engine.sound import get_sound_thread
 from app.events import event_commands, triggers
 from app.events.event_processor import EventProcessor
@@ -151,6 +152,7 @@ class Event():
     def finished(self):
         return self.processor.finished() and not self.command_queue
 
+    @profiled('event.update')
     def update(self):
         # update all internal updates, remove the ones that are finished
         self.should_update = {name: to_update for name, to_update in self.should_update.items() if not to_update(self.do_skip)}
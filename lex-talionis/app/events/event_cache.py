@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import marshal
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from types import CodeType
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from app.constants import VERSION
+from app.events import event_commands
+from app.events.python_eventing.compilation import Compiler
+from app.utilities.typing import NID
+
+if TYPE_CHECKING:
+    from app.events.event_prefab import EventPrefab
+
+CACHE_SUFFIX = '.eventcache'
+
+class CompiledEventCache():
+    """
+    Keeps the parsed commands of event scripts and the compiled code of
+    python events, so that starting an event does not have to parse it.
+
+    Keyed by the event nid and a digest of its source, so editing an
+    event's source misses the cache rather than running stale commands.
+    Only the most recently used max_entries of each are kept. Can be
+    warmed with every event of a level when the level loads, and saved
+    next to the project so that the next session starts warm.
+    """
+    max_entries = 512
+
+    def __init__(self):
+        # Key: (Event Nid, Source Digest)
+        self.commands: Dict[Tuple[NID, str], List[event_commands.EventCommand]] = OrderedDict()
+        # Key: (Event Nid, Source Digest, Command Pointer)
+        self.code: Dict[Tuple[NID, str, int], CodeType] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Whether there is anything new that the file on disk does not have
+        self.dirty: bool = False
+
+    def _lookup(self, entries: OrderedDict, key: tuple):
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        return None
+
+    def _store(self, entries: OrderedDict, key: tuple, value):
+        entries[key] = value
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def get_commands(self, nid: NID, source: str) -> List[event_commands.EventCommand]:
+        key = (nid, self._digest(source))
+        commands = self._lookup(self.commands, key)
+        if commands is None:
+            commands = event_commands.parse_script_to_commands(source)
+            self._store(self.commands, key, commands)
+            self.dirty = True
+        # Every run gets its own commands, so nothing one run does to them can leak into the next
+        return [self._copy_command(command) for command in commands]
+
+    def get_code(self, nid: NID, source: str, command_pointer: int = 0) -> CodeType:
+        key = (nid, self._digest(source), command_pointer)
+        code = self._lookup(self.code, key)
+        if code is None:
+            code = Compiler.compile_code(source, command_pointer)
+            self._store(self.code, key, code)
+            self.dirty = True
+        return code
+
+    def warm(self, events: Iterable[EventPrefab]):
+        """Parses or compiles every one of the events that is not already cached"""
+        from app.events.event_prefab import EventVersion
+        for event in events:
+            digest = self._digest(event.source)
+            try:
+                if event.version() == EventVersion.EVENT:
+                    if (event.nid, digest) not in self.commands:
+                        self.get_commands(event.nid, event.source)
+                elif (event.nid, digest, 0) not in self.code:
+                    self.get_code(event.nid, event.source)
+            except Exception as e:
+                # Broken events will report themselves properly when they are run
+                logging.warning("Could not precompile event %s: %s", event.nid, e)
+
+    def clear(self):
+        self.commands.clear()
+        self.code.clear()
+        self.dirty = False
+
+    @staticmethod
+    def _copy_command(command: event_commands.EventCommand) -> event_commands.EventCommand:
+        return command.__class__(dict(command.parameters), set(command.chosen_flags), list(command.display_values))
+
+    # === Persistence ===
+    @staticmethod
+    def _digest(source: str) -> str:
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _get_header() -> Tuple[str, str]:
+        # Compiled code and parsed commands only make sense to the same engine and python
+        return (VERSION, sys.version)
+
+    def save(self, path: str):
+        s_dict = {
+            'header': self._get_header(),
+            'commands': dict(self.commands),
+            'code': {key: marshal.dumps(code) for key, code in self.code.items()},
+        }
+        try:
+            with open(path, 'wb') as fp:
+                pickle.dump(s_dict, fp)
+            self.dirty = False
+        except (OSError, pickle.PicklingError) as e:
+            logging.warning("Could not save compiled events to %s: %s", path, e)
+
+    def load(self, path: str, events: Iterable[EventPrefab]):
+        """Loads whatever was saved for the given events, as long as their source has not changed since"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as fp:
+                s_dict = pickle.load(fp)
+        except Exception as e:
+            logging.warning("Could not load compiled events from %s: %s", path, e)
+            return
+        if s_dict.get('header') != self._get_header():
+            logging.info("Ignoring compiled events from another version at %s", path)
+            return
+        wanted = {(event.nid, self._digest(event.source)) for event in events}
+        for key, commands in s_dict['commands'].items():
+            if key in wanted:
+                self._store(self.commands, key, commands)
+        for (nid, digest, pointer), code in s_dict['code'].items():
+            if (nid, digest) in wanted:
+                self._store(self.code, (nid, digest, pointer), marshal.loads(code))
+
+    def log_stats(self):
+        logging.info("Compiled event cache: %d hits, %d misses", self.hits, self.misses)
+
+COMPILED_EVENTS = CompiledEventCache()
+
+def get_cache_path(proj_dir: str) -> str:
+    return os.path.normpath(proj_dir) + CACHE_SUFFIX
+
+def warm_level(level_nid: NID, persist: bool = False):
+    """Parses every event that can fire in the level ahead of time.
+    If persist, first loads and afterwards saves the cache next to the project"""
+    from app.data.database.database import DB
+    events = DB.events.get_by_level(level_nid)
+    path = get_cache_path(DB.current_proj_dir) if persist and DB.current_proj_dir else None
+    if path and not COMPILED_EVENTS.commands and not COMPILED_EVENTS.code:
+        COMPILED_EVENTS.load(path, events)
+    COMPILED_EVENTS.warm(events)
+    if path and COMPILED_EVENTS.dirty:
+        COMPILED_EVENTS.save(path)
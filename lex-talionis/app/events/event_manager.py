@@ -26,10 +26,16 @@ class EventManager():
                 event_source_nid = game.level_nid
             else:
                 event_source_nid = None
+        # Fast path -- most triggers have nothing listening for them
+        if not DB.events.has_trigger(trigger.nid):
+            return triggered_events
+        args = trigger.to_args()
         for event_prefab in DB.events.get(trigger.nid, event_source_nid):
             try:
-                args = trigger.to_args()
-                result = evaluate.evaluate(event_prefab.condition, unit1=args.get('unit1', None), unit2=args.get('unit2', None), position=args.get('position', None), local_args=args)
+                if event_prefab.condition.strip() == 'True':
+                    result = True
+                else:
+                    result = evaluate.evaluate(event_prefab.condition, unit1=args.get('unit1', None), unit2=args.get('unit2', None), position=args.get('position', None), local_args=args)
                 if event_prefab.nid not in game.already_triggered_events and result:
                     triggered_events.append(event_prefab)
             except:
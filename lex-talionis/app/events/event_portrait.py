@@ -9,6 +9,7 @@ from app.utilities import utils
 from app.constants import PORTRAIT_WIDTH, PORTRAIT_HEIGHT, COLORKEY
 
 from app.engine import engine, image_mods
+from app.engine.image_cache import IMAGE_CACHE
 
 class EventPortrait():
     width, height = PORTRAIT_WIDTH, PORTRAIT_HEIGHT
@@ -36,12 +37,11 @@ class EventPortrait():
                  transition=False, slide=None, mirror=False, name='', expressions=None,
                  speed_mult=1):
         self.portrait = portrait
-        if not self.portrait.image:
-            self.portrait.image = engine.image_load(self.portrait.full_path)
-        self.width = self.portrait.image.get_width()
-        self.height = self.portrait.image.get_height()
-        self.portrait.image = self.portrait.image.convert()
-        engine.set_colorkey(self.portrait.image, COLORKEY, rleaccel=True)
+        # Keep our own reference, since the cache can let go of the portrait's
+        self.image = IMAGE_CACHE.load(self.portrait, 'image', self.portrait.full_path, convert=True)
+        self.width = self.image.get_width()
+        self.height = self.image.get_height()
+        engine.set_colorkey(self.image, COLORKEY, rleaccel=True)
         self.position = position
         self.priority = priority
         self.transition = transition
@@ -53,8 +53,8 @@ class EventPortrait():
         self.expressions = expressions or set()
 
         self.transition_progress = 0
-        self.main_portrait = engine.subsurface(self.portrait.image, self.main_portrait_coords)
-        self.chibi = engine.subsurface(self.portrait.image, self.chibi_coords)
+        self.main_portrait = engine.subsurface(self.image, self.main_portrait_coords)
+        self.chibi = engine.subsurface(self.image, self.chibi_coords)
 
         self.talk_on = False
         self.remove = False
@@ -178,38 +178,38 @@ class EventPortrait():
         # For smile image
         if "OpenMouth" in self.expressions:
             if "Smile" in self.expressions:
-                mouth_image = engine.subsurface(self.portrait.image, self.opensmile)
+                mouth_image = engine.subsurface(self.image, self.opensmile)
             else:
-                mouth_image = engine.subsurface(self.portrait.image, self.openmouth)
+                mouth_image = engine.subsurface(self.image, self.openmouth)
         elif "Smile" in self.expressions:
             if self.talk_state == 0:
-                mouth_image = engine.subsurface(self.portrait.image, self.closesmile)
+                mouth_image = engine.subsurface(self.image, self.closesmile)
             elif self.talk_state == 1 or self.talk_state == 3:
-                mouth_image = engine.subsurface(self.portrait.image, self.halfsmile)
+                mouth_image = engine.subsurface(self.image, self.halfsmile)
             elif self.talk_state == 2:
-                mouth_image = engine.subsurface(self.portrait.image, self.opensmile)
+                mouth_image = engine.subsurface(self.image, self.opensmile)
         else:
             if self.talk_state == 0:
-                mouth_image = engine.subsurface(self.portrait.image, self.closemouth)
+                mouth_image = engine.subsurface(self.image, self.closemouth)
             elif self.talk_state == 1 or self.talk_state == 3:
-                mouth_image = engine.subsurface(self.portrait.image, self.halfmouth)
+                mouth_image = engine.subsurface(self.image, self.halfmouth)
             elif self.talk_state == 2:
-                mouth_image = engine.subsurface(self.portrait.image, self.openmouth)
+                mouth_image = engine.subsurface(self.image, self.openmouth)
 
         # For blink image
         if "CloseEyes" in self.expressions:
-            blink_image = engine.subsurface(self.portrait.image, self.fullblink)
+            blink_image = engine.subsurface(self.image, self.fullblink)
         elif "HalfCloseEyes" in self.expressions:
-            blink_image = engine.subsurface(self.portrait.image, self.halfblink)
+            blink_image = engine.subsurface(self.image, self.halfblink)
         elif "OpenEyes" in self.expressions:
             blink_image = None
         else:
             if self.blink_counter.count == 0:
                 blink_image = None
             elif self.blink_counter.count == 1:
-                blink_image = engine.subsurface(self.portrait.image, self.halfblink)
+                blink_image = engine.subsurface(self.image, self.halfblink)
             elif self.blink_counter.count == 2:
-                blink_image = engine.subsurface(self.portrait.image, self.fullblink)
+                blink_image = engine.subsurface(self.image, self.fullblink)
 
         # Piece together image
         if blink_image:
@@ -28,6 +28,10 @@ def get_event_version(script: str) -> EventVersion.EVENT:
         return EventVersion.EVENT
 
 class EventPrefab(Prefab):
+    # Bumped whenever any event's trigger or level changes,
+    # so that EventCatalog knows its trigger index is out of date
+    index_version: int = 0
+
     def __init__(self, name):
         self.name = name
         self.trigger = None
@@ -39,6 +43,11 @@ class EventPrefab(Prefab):
 
         self._source: List[str] = []
 
+    def __setattr__(self, name, value):
+        if name in ('trigger', 'level_nid'):
+            EventPrefab.index_version += 1
+        super().__setattr__(name, value)
+
     @property
     def nid(self):
         if not self.name:
@@ -96,10 +105,38 @@ class EventCatalog(Data[EventPrefab]):
     def __init__(self, vals: List[EventPrefab] | None = None):
         super().__init__(vals)
         self.inspector = EventInspectorEngine(self)
+        # Key: (trigger nid, level nid), Value: events listening for that trigger in that level, in catalog order
+        self._trigger_index: Dict[Tuple[NID, Optional[NID]], List[EventPrefab]] = {}
+        # Key: trigger nid, Value: all events listening for that trigger, in catalog order
+        self._events_by_trigger: Optional[Dict[NID, List[EventPrefab]]] = None
+        self._index_version: int = -1
+
+    def _invalidate_index(self):
+        self._events_by_trigger = None
+
+    def _build_index(self):
+        self._trigger_index.clear()
+        self._events_by_trigger = {}
+        for event in self._list:
+            self._events_by_trigger.setdefault(event.trigger, []).append(event)
+        self._index_version = EventPrefab.index_version
+
+    def has_trigger(self, trigger_nid) -> bool:
+        """
+        Whether any event at all listens for this trigger
+        """
+        if self._events_by_trigger is None or self._index_version != EventPrefab.index_version:
+            self._build_index()
+        return trigger_nid in self._events_by_trigger
 
     def get(self, trigger_nid, level_nid):
-        return [event for event in self._list if event.trigger == trigger_nid and
-                (not event.level_nid or event.level_nid == level_nid)]
+        if self._events_by_trigger is None or self._index_version != EventPrefab.index_version:
+            self._build_index()
+        key = (trigger_nid, level_nid)
+        if key not in self._trigger_index:
+            self._trigger_index[key] = [event for event in self._events_by_trigger.get(trigger_nid, []) if
+                                        (not event.level_nid or event.level_nid == level_nid)]
+        return self._trigger_index[key][:]
 
     def get_by_level(self, level_nid: Optional[NID]) -> List[EventPrefab]:
         return [event for event in self._list if (not event.level_nid or not level_nid or event.level_nid == level_nid)]
@@ -120,6 +157,39 @@ class EventCatalog(Data[EventPrefab]):
         self.append(new_event)
         return new_event
 
+    # Any change to the contents or order of the catalog invalidates the trigger index
+    def append(self, val: EventPrefab, overwrite: bool = False):
+        super().append(val, overwrite)
+        self._invalidate_index()
+
+    def delete(self, val: EventPrefab):
+        super().delete(val)
+        self._invalidate_index()
+
+    def remove_key(self, key: NID):
+        super().remove_key(key)
+        self._invalidate_index()
+
+    def pop(self, idx: Optional[int] = None):
+        super().pop(idx)
+        self._invalidate_index()
+
+    def insert(self, idx: int, val: EventPrefab):
+        super().insert(idx, val)
+        self._invalidate_index()
+
+    def clear(self):
+        super().clear()
+        self._invalidate_index()
+
+    def sort(self, sort_func=None):
+        super().sort(sort_func)
+        self._invalidate_index()
+
+    def move_index(self, old_index: int, new_index: int):
+        super().move_index(old_index, new_index)
+        self._invalidate_index()
+
 class EventInspectorEngine():
     def __init__(self, event_db: EventCatalog):
         self.event_db = event_db
@@ -5,6 +5,7 @@ from typing import List, Optional, Tuple
 
 from app.engine.text_evaluator import TextEvaluator
 from app.events import event_commands
+from app.events.event_cache import COMPILED_EVENTS
 from app.utilities.typing import NID
 
 class EventIterator():
@@ -68,7 +69,7 @@ class EventProcessor():
     def __init__(self, nid: NID, script: str, text_evaluator: TextEvaluator):
         self.nid = nid
         self.script = script
-        self.commands: List[event_commands.EventCommand] = event_commands.parse_script_to_commands(script)
+        self.commands: List[event_commands.EventCommand] = COMPILED_EVENTS.get_commands(nid, script)
         self.command_pointer = 0
 
         self.logger = logging.getLogger()
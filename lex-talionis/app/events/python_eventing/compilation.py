@@ -6,6 +6,7 @@ import re
 import traceback
 import sys
 from logging import getLogger
+from types import CodeType
 from typing import TYPE_CHECKING, Generator
 from app.events.python_eventing.errors import InvalidPythonError
 from app.events.python_eventing.utils import EVENT_INSTANCE
@@ -96,15 +97,23 @@ def insert_header(script: str):
 
 class Compiler():
     @staticmethod
-    def compile(event_name: str, script: str, game: GameState, command_pointer: int = 0) -> Generator:
-        original_script = script
-        original_script_as_lines = original_script.split('\n')
+    def compile_code(script: str, command_pointer: int = 0) -> CodeType:
+        """Turns the event script into the code that defines the generator.
+        Only depends on the script and the command pointer, so the result can be reused"""
         script = insert_yields_and_command_pointer(script)
         script = insert_command_pointer_conditional_skips(script)
         script = wrap_generator(script, "g", command_pointer)
         script = insert_header(script)
+        return compile(script, '<string>', 'exec')
+
+    @staticmethod
+    def compile(event_name: str, script: str, game: GameState, command_pointer: int = 0) -> Generator:
+        from app.events.event_cache import COMPILED_EVENTS
+        original_script = script
+        original_script_as_lines = original_script.split('\n')
+        code = COMPILED_EVENTS.get_code(event_name, script, command_pointer)
         exec_context = evaluate.get_context(game=game)
-        exec(script, exec_context)
+        exec(code, exec_context)
         # possibility that there are some errors in python script
         try:
             gen = exec_context['g']()
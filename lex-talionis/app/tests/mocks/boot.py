@@ -0,0 +1,21 @@
+import os
+
+import pygame
+
+def init_dummy_display():
+    """
+    Opens a 1x1 display on the dummy video driver, unless there already
+    is one, so that surfaces can be converted without a window
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    if not pygame.display.get_surface():
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+def load_project(project: str):
+    """Loads the project's resources and database, without starting the engine"""
+    from app.data.database.database import DB
+    from app.data.resources.resources import RESOURCES
+    init_dummy_display()
+    RESOURCES.load(project)
+    DB.load(project)
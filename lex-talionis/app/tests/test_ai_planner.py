@@ -0,0 +1,227 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.ai_controller import BoardSnapshot, PhasePlanner, PlannedDecision
+from app.engine.objects.unit import UnitObject
+from app.engine.turnwheel import ActionLog
+from app.tests.mocks.mock_game import get_mock_game
+
+class FakeBoard():
+    def __init__(self, units):
+        self.bounds = (0, 0, 9, 9)
+        self.grid = {unit.position: unit for unit in units}
+
+    def get_unit(self, pos):
+        return self.grid.get(pos)
+
+    def set_unit(self, pos, unit):
+        self.grid[pos] = unit
+
+    def remove_unit(self, pos, unit):
+        if self.grid.get(pos) is unit:
+            del self.grid[pos]
+
+    def in_vision(self, pos, team=None):
+        return True
+
+class PhasePlannerTests(unittest.TestCase):
+    def setUp(self):
+        from app.data.database.database import DB
+        DB.load('testing_proj.ltproj')
+        self.game = get_mock_game()
+        self.game.action_log = ActionLog()
+        # Every unit can move one tile right or down
+        self.game.path_system = MagicMock()
+        self.game.path_system.get_valid_moves = \
+            lambda unit, blocked=None: {unit.position, (unit.position[0] + 1, unit.position[1]), (unit.position[0], unit.position[1] + 1)}
+        # Every item has a range of exactly 1
+        self.game.target_system = MagicMock()
+        self.game.target_system.get_shell = \
+            lambda moves, item_range, bounds: {(x + dx, y + dy) for (x, y) in moves for (dx, dy) in ((1, 0), (-1, 0), (0, 1), (0, -1))}
+        self.behaviour = MagicMock(view_range=3)
+        self.enemy1 = self.make_unit('enemy1', 'enemy', (1, 1))
+        self.enemy2 = self.make_unit('enemy2', 'enemy', (2, 2))
+        self.player = self.make_unit('player', 'player', (5, 5))
+        self.game.units = [self.enemy1, self.enemy2, self.player]
+        self.game.board = FakeBoard(self.game.units)
+        # What the units were picked up and put down at, without touching the board
+        self.picked_up, self.put_down = [], []
+        self.patches = [
+            patch('app.engine.ai_controller.game', self.game),
+            patch('app.engine.ai_controller.action.PickUnitUp',
+                  side_effect=lambda unit, test: MagicMock(do=lambda: self.picked_up.append((unit.nid, unit.position)))),
+            patch('app.engine.ai_controller.action.PutUnitDown',
+                  side_effect=lambda unit, test: MagicMock(do=lambda: self.put_down.append((unit.nid, unit.position)))),
+            patch('app.engine.ai_controller.skill_system.reset_cache'),
+            patch('app.engine.ai_controller.item_funcs.get_range', return_value={1}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def make_unit(self, nid, team, position) -> UnitObject:
+        unit = UnitObject(nid)
+        unit.team = team
+        unit.position = position
+        unit.get_hp = MagicMock(return_value=10)
+        return unit
+
+    def decide(self, unit, behaviour_idx=1) -> PlannedDecision:
+        planner = PhasePlanner()
+
+        class DecidedAI():
+            def __init__(ai, unit, valid_moves, behaviour, snapshot):
+                ai.items = [MagicMock(name='item')]
+
+            def run(ai):
+                return (True, (5, 5), (unit.position[0], unit.position[1] + 1), None)
+
+        with patch('app.engine.ai_controller.PrimaryAI', DecidedAI):
+            return planner.plan_primary(unit, self.behaviour, behaviour_idx, BoardSnapshot())
+
+    def test_snapshot(self):
+        snapshot = BoardSnapshot()
+        snapshot.move(self.enemy1, (1, 2))
+        snapshot.move(self.enemy2, (1, 1))
+        # Both units really are at their planned positions, on the board too
+        self.assertEqual(self.enemy1.position, (1, 2))
+        self.assertIs(self.game.board.get_unit((1, 2)), self.enemy1)
+        self.assertIs(self.game.board.get_unit((1, 1)), self.enemy2)
+        self.assertIsNone(self.game.board.get_unit((2, 2)))
+        # Picked up and put down, so auras and terrain follow them
+        self.assertEqual(self.picked_up, [('enemy1', (1, 1)), ('enemy2', (2, 2))])
+        self.assertEqual(self.put_down, [('enemy1', (1, 2)), ('enemy2', (1, 1))])
+
+        snapshot.undo()
+        self.assertEqual(self.enemy1.position, (1, 1))
+        self.assertEqual(self.enemy2.position, (2, 2))
+        self.assertEqual(self.game.board.grid, {(1, 1): self.enemy1, (2, 2): self.enemy2, (5, 5): self.player})
+        self.assertEqual(self.game.action_log.actions, [])
+
+    def test_place_equip_and_restore(self):
+        weapon, other_weapon = MagicMock(name='weapon'), MagicMock(name='other_weapon')
+        self.enemy1.equipped_weapon = weapon
+        recording = []
+
+        def equip(item):
+            recording.append(self.game.action_log.is_recording())
+            self.enemy1.equipped_weapon = item
+
+        snapshot = BoardSnapshot()
+        with patch.object(self.enemy1, 'equip', side_effect=equip):
+            snapshot.place(self.enemy1, (1, 2))
+            snapshot.equip(self.enemy1, other_weapon)
+            self.assertEqual(self.enemy1.position, (1, 2))
+            # Tried out the same way as live thinking, so it stays on the board where it was
+            self.assertIs(self.game.board.get_unit((1, 1)), self.enemy1)
+            self.assertIs(self.enemy1.equipped_weapon, other_weapon)
+
+            snapshot.restore(self.enemy1)
+        self.assertEqual(self.enemy1.position, (1, 1))
+        self.assertEqual(self.put_down[-1], ('enemy1', (1, 1)))
+        self.assertIs(self.enemy1.equipped_weapon, weapon)
+        # Neither equip was recorded, and the action log is recording again
+        self.assertEqual(recording, [False, False])
+        self.assertTrue(self.game.action_log.is_recording())
+        self.assertEqual(self.game.action_log.actions, [])
+
+    def test_plans_honor_earlier_moves(self):
+        planner = PhasePlanner()
+        seen = {}
+
+        def plan_unit(unit, snapshot):
+            seen[unit.nid] = dict(self.game.board.grid)
+            return self.decide(unit)
+
+        with patch.object(planner, 'plan_unit', side_effect=plan_unit):
+            planner.plan([self.enemy1, self.enemy2])
+        self.assertTrue(planner.planned_phase)
+        # enemy2 was planned with enemy1 on the board at its planned position
+        self.assertIs(seen['enemy2'][(1, 2)], self.enemy1)
+        self.assertNotIn((1, 1), seen['enemy2'])
+        # And everything was put back afterwards
+        self.assertEqual(self.enemy1.position, (1, 1))
+        self.assertEqual(self.game.board.grid, {(1, 1): self.enemy1, (2, 2): self.enemy2, (5, 5): self.player})
+
+        self.assertEqual(planner.get(self.enemy1, 1, self.behaviour).position, (1, 2))
+        self.game.board.remove_unit((1, 1), self.enemy1)
+        self.enemy1.position = (1, 2)
+        self.game.board.set_unit((1, 2), self.enemy1)
+        # enemy1 did what enemy2's plan expected it to
+        self.assertEqual(planner.get(self.enemy2, 1, self.behaviour).position, (2, 3))
+        self.assertEqual(planner.plans, {})
+
+    def test_plan_invalidation(self):
+        planner = PhasePlanner()
+
+        def still_planned():
+            planner.plans['enemy1'] = self.decide(self.enemy1)
+            return planner.get(self.enemy1, 1, self.behaviour) is not None
+
+        def move(unit, pos):
+            self.game.board.remove_unit(unit.position, unit)
+            unit.position = pos
+            self.game.board.set_unit(pos, unit)
+
+        self.assertTrue(still_planned())
+        # A different behaviour
+        planner.plans['enemy1'] = self.decide(self.enemy1, behaviour_idx=2)
+        self.assertIsNone(planner.get(self.enemy1, 1, self.behaviour))
+
+        # A unit in range took damage
+        planner.plans['enemy1'] = self.decide(self.enemy1)
+        self.enemy2.get_hp.return_value = 5
+        self.assertIsNone(planner.get(self.enemy1, 1, self.behaviour))
+        self.enemy2.get_hp.return_value = 10
+
+        # A unit in range left
+        planner.plans['enemy1'] = self.decide(self.enemy1)
+        move(self.enemy2, (7, 7))
+        self.assertIsNone(planner.get(self.enemy1, 1, self.behaviour))
+
+        # A unit entered the range, without getting in the way of any move
+        planner.plans['enemy1'] = self.decide(self.enemy1)
+        move(self.player, (3, 1))
+        self.assertIsNone(planner.get(self.enemy1, 1, self.behaviour))
+
+        # A unit moved into the way
+        move(self.player, (5, 5))
+        planner.plans['enemy1'] = self.decide(self.enemy1)
+        move(self.enemy2, (2, 1))
+        self.assertIsNone(planner.get(self.enemy1, 1, self.behaviour))
+
+        # Far out of range, nothing matters
+        move(self.enemy2, (8, 8))
+        planner.plans['enemy1'] = self.decide(self.enemy1)
+        move(self.player, (6, 6))
+        self.player.get_hp.return_value = 1
+        self.assertIsNotNone(planner.get(self.enemy1, 1, self.behaviour))
+
+    def test_planning_leaves_no_trace(self):
+        planner = PhasePlanner()
+        snapshot = BoardSnapshot()
+
+        class TryingAI():
+            def __init__(ai, unit, valid_moves, behaviour, snapshot):
+                ai.items = [MagicMock(name='item')]
+                snapshot.place(unit, (1, 2))
+
+            def run(ai):
+                return (True, (5, 5), (1, 2), None)
+
+        with patch('app.engine.ai_controller.PrimaryAI', TryingAI):
+            decision = planner.plan_primary(self.enemy1, self.behaviour, 1, snapshot)
+        self.assertEqual(self.enemy1.position, (1, 1))
+        self.assertIs(self.game.board.get_unit((1, 1)), self.enemy1)
+        self.assertEqual(decision.valid_moves, {(1, 1), (2, 1), (1, 2)})
+        # Every position in range of every move, and who was there
+        self.assertEqual(decision.watched[(1, 1)], ('enemy1', 10))
+        self.assertEqual(decision.watched[(2, 2)], ('enemy2', 10))
+        self.assertIsNone(decision.watched[(3, 1)])
+        self.assertNotIn((5, 5), decision.watched)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import pickle
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.ai_pool import AIWorkerPool, PhaseSnapshot
+
+class AIPoolTests(unittest.TestCase):
+    def test_gather(self):
+        def saved(uid, subitems):
+            return MagicMock(save=lambda: {'uid': uid, 'subitems': subitems})
+
+        registry = {1: saved(1, [2]), 2: saved(2, []), 3: saved(3, []), 4: saved(4, [])}
+        # Subitems come along, and nothing is saved twice or made up
+        saves = PhaseSnapshot._gather([1, 4, 2, 99], registry, 'subitems')
+        self.assertEqual(sorted(s['uid'] for s in saves), [1, 2, 4])
+
+        skills = {1: MagicMock(save=lambda: {'uid': 1, 'subskill': 3}),
+                  3: MagicMock(save=lambda: {'uid': 3, 'subskill': None})}
+        self.assertEqual(sorted(s['uid'] for s in PhaseSnapshot._gather([1], skills, 'subskill')), [1, 3])
+
+    def test_state_only_written_when_changed(self):
+        pool = AIWorkerPool(2)
+        self.addCleanup(pool.shutdown)
+        state = {'turncount': 1}
+        with patch.object(PhaseSnapshot, 'from_game', side_effect=lambda game: dict(state)):
+            pool.update_state(None)
+            first_path = pool.state_path
+            pool.update_state(None)
+            self.assertEqual(pool.state_id, 1)
+            self.assertEqual(pool.state_path, first_path)
+
+            state['turncount'] = 2
+            pool.update_state(None)
+        self.assertEqual(pool.state_id, 2)
+        # Only the latest is kept around for the workers
+        self.assertFalse(os.path.exists(first_path))
+        with open(pool.state_path, 'rb') as fp:
+            self.assertEqual(pickle.load(fp), {'turncount': 2})
+
+        pool.shutdown()
+        self.assertFalse(os.path.exists(pool.state_dir))
+
+if __name__ == '__main__':
+    unittest.main()
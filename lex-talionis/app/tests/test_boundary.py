@@ -0,0 +1,154 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.boundary import BoundaryInterface
+from app.engine.game_board import GameBoard
+from app.engine.objects.unit import UnitObject
+from app.engine.pathfinding.path_system import PathSystem
+from app.engine.target_system import TargetSystem
+
+from app.tests.mocks.boot import init_dummy_display
+from app.tests.mocks.mock_game import get_mock_game
+
+class BoundaryTests(unittest.TestCase):
+    """
+    Tests that the incremental boundary maintenance ends up with the same
+    ranges as recalculating every unit from scratch
+    """
+
+    def setUp(self):
+        from app.data.database.database import DB
+        DB.load('testing_proj.ltproj')
+        self.game = get_mock_game()
+        self.game.target_system = TargetSystem(game=self.game)
+        self.game.path_system = PathSystem(game=self.game)
+
+        tilemap = MagicMock(name='tilemap')
+        tilemap.width = 16
+        tilemap.height = 16
+        self.game.board = GameBoard(tilemap)
+        self.game.board.bounds = (0, 0, 15, 15)
+        self.game.units = []
+        self.game.ai_group_active = lambda group: True
+        self.game.get_unit = lambda nid: next((unit for unit in self.game.units if unit.nid == nid), None)
+
+        self.add_unit('enemy1', 'enemy', (3, 3))
+        self.add_unit('enemy2', 'enemy', (12, 12))
+        self.player_unit = self.add_unit('player', 'player', (5, 5))
+
+        self.patches = [
+            patch('app.engine.boundary.game', self.game),
+            patch('app.engine.equations.parser.movement', return_value=4),
+            patch('app.engine.target_system.TargetSystem.get_all_attackable_positions_weapons',
+                  side_effect=self.attack_positions),
+            patch('app.engine.target_system.TargetSystem.get_all_attackable_positions_spells',
+                  side_effect=lambda unit, valid_moves, force=False: set(valid_moves)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def attack_positions(self, unit, valid_moves, force=False):
+        attacks = set()
+        for (x, y) in valid_moves:
+            attacks |= {(x, y + 1), (x + 1, y), (x - 1, y), (x, y - 1)}
+        return {pos for pos in attacks if self.game.board.check_bounds(pos)}
+
+    def add_unit(self, nid, team, position) -> UnitObject:
+        unit = UnitObject(nid)
+        unit.klass = 'Citizen'
+        unit.team = team
+        unit.position = position
+        self.game.units.append(unit)
+        self.game.board.set_unit(position, unit)
+        return unit
+
+    def move_unit(self, boundary: BoundaryInterface, unit: UnitObject, position):
+        # Same order as game.leave and game.arrive
+        boundary.leave(unit)
+        self.game.board.remove_unit(unit.position, unit)
+        unit.position = position
+        self.game.board.set_unit(unit.position, unit)
+        boundary.arrive(unit)
+
+    def assertSameRanges(self, boundary: BoundaryInterface):
+        fresh = BoundaryInterface(16, 16)
+        fresh.reset()
+        fresh.update()
+        boundary.update()
+        for mode in ('attack', 'spell', 'movement'):
+            self.assertEqual(boundary.grids[mode], fresh.grids[mode], 'Incremental %s grid does not match' % mode)
+
+    def test_incremental_matches_full_recalculation(self):
+        boundary = BoundaryInterface(16, 16)
+        boundary.reset()
+        boundary.update()
+        self.assertSameRanges(boundary)
+
+        # Block and unblock enemy1's paths
+        for position in [(4, 3), (3, 4), (2, 3), (6, 6), (3, 7)]:
+            self.move_unit(boundary, self.player_unit, position)
+            self.assertSameRanges(boundary)
+
+        # Enemies moving should also update correctly
+        enemy1 = self.game.get_unit('enemy1')
+        self.move_unit(boundary, enemy1, (4, 4))
+        self.assertSameRanges(boundary)
+
+    def test_only_touched_units_are_recalculated(self):
+        boundary = BoundaryInterface(16, 16)
+        boundary.reset()
+        boundary.update()
+
+        # Far from enemy2, so only enemy1 should need recalculation
+        self.move_unit(boundary, self.player_unit, (4, 3))
+        self.assertEqual(boundary.dirty_units, {'enemy1'})
+
+        # Many moves in one frame only need one recalculation each
+        self.move_unit(boundary, self.player_unit, (3, 4))
+        self.move_unit(boundary, self.player_unit, (11, 12))
+        self.assertEqual(boundary.dirty_units, {'enemy1', 'enemy2'})
+        with patch.object(self.game.path_system, 'get_valid_moves', wraps=self.game.path_system.get_valid_moves) as get_valid_moves:
+            boundary.update()
+            self.assertEqual(get_valid_moves.call_count, 2)
+        self.assertSameRanges(boundary)
+
+        # Nothing changed, so recalculating reuses the cached reachable set
+        boundary.recalculate_unit(self.game.get_unit('enemy2'))
+        with patch.object(self.game.path_system, 'get_valid_moves', wraps=self.game.path_system.get_valid_moves) as get_valid_moves:
+            boundary.update()
+            self.assertEqual(get_valid_moves.call_count, 0)
+        self.assertSameRanges(boundary)
+
+    def test_prepare_key(self):
+        init_dummy_display()
+        self.game.level_vars = {}
+        full_size = (16 * 16, 16 * 16)
+        boundary = BoundaryInterface(16, 16)
+        boundary.reset()
+        boundary.show()
+        boundary.show_all_enemy_attacks()
+        key = boundary.prepare(full_size)
+        # Nothing changed, so the map view can keep what it drew
+        self.assertEqual(boundary.prepare(full_size), key)
+
+        self.move_unit(boundary, self.player_unit, (4, 3))
+        moved_key = boundary.prepare(full_size)
+        self.assertNotEqual(moved_key, key)
+        self.assertEqual(boundary.prepare(full_size), moved_key)
+
+        # Frozen boundaries keep showing the old ranges
+        boundary.frozen = True
+        self.move_unit(boundary, self.player_unit, (3, 4))
+        self.assertEqual(boundary.prepare(full_size), moved_key)
+        boundary.frozen = False
+        self.assertNotEqual(boundary.prepare(full_size), moved_key)
+
+        boundary.clear_all_enemy_attacks()
+        self.assertNotEqual(boundary.prepare(full_size), moved_key)
+
+if __name__ == '__main__':
+    unittest.main()
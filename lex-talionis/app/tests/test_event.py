@@ -250,5 +250,42 @@ class EventUnitTests(unittest.TestCase):
         add_unit_command = add_unit("Eirika", "2,5", "Normal")
         self.MACRO_test_event([add_unit_command])
 
+class EventCatalogTests(unittest.TestCase):
+    def make_event(self, name, trigger, level_nid=None):
+        event = EventPrefab(name)
+        event.trigger = trigger
+        event.level_nid = level_nid
+        return event
+
+    def test_trigger_index(self):
+        from app.events.event_prefab import EventCatalog
+        global_turn = self.make_event('GlobalTurn', 'turn_change')
+        level_turn = self.make_event('LevelTurn', 'turn_change', '0')
+        other_level_turn = self.make_event('OtherTurn', 'turn_change', '1')
+        level_start = self.make_event('Start', 'level_start', '0')
+        catalog = EventCatalog([global_turn, level_turn, other_level_turn, level_start])
+
+        self.assertEqual(catalog.get('turn_change', '0'), [global_turn, level_turn])
+        self.assertEqual(catalog.get('turn_change', None), [global_turn])
+        self.assertTrue(catalog.has_trigger('level_start'))
+        self.assertFalse(catalog.has_trigger('combat_end'))
+        self.assertEqual(catalog.get('combat_end', '0'), [])
+
+        # Editing an event updates the index
+        other_level_turn.level_nid = '0'
+        self.assertEqual(catalog.get('turn_change', '0'), [global_turn, level_turn, other_level_turn])
+        level_start.trigger = 'combat_end'
+        self.assertTrue(catalog.has_trigger('combat_end'))
+        self.assertFalse(catalog.has_trigger('level_start'))
+
+        # As does changing the catalog itself, keeping catalog order
+        catalog.move_index(0, 2)
+        self.assertEqual(catalog.get('turn_change', '0'), [level_turn, other_level_turn, global_turn])
+        catalog.delete(level_turn)
+        self.assertEqual(catalog.get('turn_change', '0'), [other_level_turn, global_turn])
+        new_event = self.make_event('New', 'turn_change')
+        catalog.insert(0, new_event)
+        self.assertEqual(catalog.get('turn_change', '0'), [new_event, other_level_turn, global_turn])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from app.events import event_commands
+from app.events.event_cache import CompiledEventCache
+from app.events.event_prefab import EventPrefab
+
+EVENT_SCRIPT = "speak;Eirika;Hello there.\nwait;500"
+PYTHON_SCRIPT = "#pyev1\n$speak('Eirika', 'Hello there.')\n$wait(500)"
+
+class EventCacheTests(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.cache = CompiledEventCache()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def make_event(self, name: str, source: str) -> EventPrefab:
+        event = EventPrefab(name)
+        event.source = source
+        return event
+
+    def test_commands(self):
+        commands = self.cache.get_commands('Intro', EVENT_SCRIPT)
+        self.assertEqual([type(c) for c in commands], [event_commands.Speak, event_commands.Wait])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        again = self.cache.get_commands('Intro', EVENT_SCRIPT)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        # Each run gets its own commands
+        self.assertIsNot(commands[0], again[0])
+        commands[0].parameters['Text'] = 'Goodbye.'
+        self.assertEqual(self.cache.get_commands('Intro', EVENT_SCRIPT)[0].parameters['Text'], 'Hello there.')
+        self.assertEqual(again[0].display_values, commands[0].display_values)
+        # Changing the source misses
+        self.cache.get_commands('Intro', EVENT_SCRIPT + "\nwait;100")
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_bounded(self):
+        self.cache.max_entries = 2
+        for nid in ('A', 'B', 'A', 'C'):
+            self.cache.get_commands(nid, EVENT_SCRIPT)
+        # B was the least recently used
+        self.assertEqual([nid for nid, _ in self.cache.commands], ['A', 'C'])
+        self.cache.get_commands('B', EVENT_SCRIPT)
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_code(self):
+        code = self.cache.get_code('Intro', PYTHON_SCRIPT)
+        self.assertIs(self.cache.get_code('Intro', PYTHON_SCRIPT), code)
+        self.assertIsNot(self.cache.get_code('Intro', PYTHON_SCRIPT, 1), code)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_warm(self):
+        events = [self.make_event('A', EVENT_SCRIPT), self.make_event('B', PYTHON_SCRIPT),
+                  self.make_event('C', "#pyev1\n$speak(")]
+        self.cache.warm(events)
+        self.assertIn((events[0].nid, self.cache._digest(events[0].source)), self.cache.commands)
+        self.assertIn((events[1].nid, self.cache._digest(events[1].source), 0), self.cache.code)
+        # The broken event is just skipped
+        self.assertEqual(len(self.cache.code), 1)
+        self.cache.get_commands(events[0].nid, events[0].source)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_save_and_load(self):
+        events = [self.make_event('A', EVENT_SCRIPT), self.make_event('B', PYTHON_SCRIPT)]
+        self.cache.warm(events)
+        self.assertTrue(self.cache.dirty)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'test.ltproj.eventcache')
+            self.cache.save(path)
+            self.assertFalse(self.cache.dirty)
+
+            # Event B was edited since the cache was saved
+            events[1].source = PYTHON_SCRIPT + "\n$wait(100)"
+            loaded = CompiledEventCache()
+            loaded.load(path, events)
+        commands = loaded.get_commands(events[0].nid, events[0].source)
+        self.assertEqual([type(c) for c in commands], [event_commands.Speak, event_commands.Wait])
+        self.assertEqual(commands[0].parameters['Text'], 'Hello there.')
+        self.assertEqual((loaded.hits, loaded.misses), (1, 0))
+        self.assertFalse(loaded.code)
+        self.assertFalse(loaded.dirty)
+
+    def test_load_missing_or_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'test.ltproj.eventcache')
+            self.cache.load(path, [])
+            with open(path, 'wb') as fp:
+                fp.write(b'not a pickle')
+            self.cache.load(path, [])
+        self.assertFalse(self.cache.commands)
+
+if __name__ == '__main__':
+    unittest.main()
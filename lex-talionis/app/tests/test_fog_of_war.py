@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.game_board import GameBoard
+from app.engine.objects.unit import UnitObject
+from app.engine.target_system import TargetSystem
+
+from app.tests.mocks.mock_game import get_mock_game
+
+class FogOfWarTests(unittest.TestCase):
+    """
+    Tests that moving vision around the board only touches the positions
+    that were or are now lit, and that the fog generation records them
+    """
+
+    def setUp(self):
+        from app.data.database.database import DB
+        DB.load('testing_proj.ltproj')
+        self.game = get_mock_game()
+        self.game.target_system = TargetSystem(game=self.game)
+        self.game.level_vars = {'_fog_of_war': True}
+
+        tilemap = MagicMock(name='tilemap')
+        tilemap.width = 10
+        tilemap.height = 10
+        self.board = GameBoard(tilemap)
+        self.game.board = self.board
+
+        self.patches = [
+            patch('app.engine.game_board.game', self.game),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def make_unit(self, nid, team) -> UnitObject:
+        unit = UnitObject(nid)
+        unit.team = team
+        return unit
+
+    def lit(self, team='player'):
+        grid = self.board.fog_of_war_grids[team]
+        return {(x, y) for x in range(10) for y in range(10) if grid.get((x, y))}
+
+    def test_reference_counts(self):
+        unit1 = self.make_unit('unit1', 'player')
+        unit2 = self.make_unit('unit2', 'player')
+        self.board.update_fow((2, 2), unit1, 1)
+        self.board.update_fow((3, 2), unit2, 1)
+        self.assertEqual(self.board.fog_of_war_grids['player'].get((2, 2)), 2)
+        self.assertEqual(self.lit(), {(2, 2), (1, 2), (3, 2), (2, 1), (2, 3), (4, 2), (3, 1), (3, 3)})
+        self.assertTrue(self.board.in_vision((2, 2)))
+        self.assertFalse(self.board.in_vision((5, 5)))
+
+        # unit2 still sees (2, 2) and (3, 2) after unit1 leaves the map
+        self.board.update_fow(None, unit1, 1)
+        self.assertEqual(self.lit(), {(2, 2), (3, 2), (4, 2), (3, 1), (3, 3)})
+        self.assertIsNone(self.board.fow_vantage_point['unit1'])
+        self.assertNotIn('unit1', self.board.fow_lit)
+
+        # Changing teams moves the vision to the new team's grid
+        unit2.team = 'enemy'
+        self.board.update_fow((3, 2), unit2, 1)
+        self.assertEqual(self.lit(), set())
+        self.assertEqual(self.lit('enemy'), {(2, 2), (3, 2), (4, 2), (3, 1), (3, 3)})
+
+    def test_fog_changes(self):
+        unit = self.make_unit('unit', 'player')
+        self.board.update_fow((2, 2), unit, 1)
+        generation = self.board.fog_generation
+        self.board.update_fow((3, 2), unit, 1)
+        self.assertEqual(self.board.fog_generation, generation + 1)
+        # Only the tiles that went dark or became lit changed
+        self.assertEqual(self.board.get_fog_changes(generation), {(1, 2), (2, 1), (2, 3), (4, 2), (3, 1), (3, 3)})
+
+        # Not moving changes nothing
+        self.board.update_fow((3, 2), unit, 1)
+        self.assertEqual(self.board.fog_generation, generation + 1)
+
+        region = MagicMock(nid='region', position=(8, 8), sub_nid=None)
+        region.get_all_positions.return_value = [(8, 8)]
+        self.board.add_vision_region(region)
+        self.assertEqual(self.board.get_fog_changes(generation + 1), {(8, 8)})
+        self.assertTrue(self.board.in_vision((8, 8)))
+        self.board.remove_vision_region(region)
+        self.assertFalse(self.board.in_vision((8, 8)))
+
+        # Don't know what changed when everything might have
+        self.board.mark_fog_changed()
+        self.assertIsNone(self.board.get_fog_changes(generation))
+
+if __name__ == '__main__':
+    unittest.main()
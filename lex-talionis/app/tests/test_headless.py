@@ -0,0 +1,65 @@
+import unittest
+
+from app.engine import config as cf
+from app.engine import engine
+from app.engine.headless import InputScript, ScriptTimeout, StateTimings
+
+class HeadlessTests(unittest.TestCase):
+    def keys(self, frames):
+        return [[(event.type, event.key) for event in events] for events in frames]
+
+    def test_parse(self):
+        script = InputScript.parse("""
+            # Skip the intro
+            wait 2
+            SELECT
+            DOWN 2  # Two taps
+            hold RIGHT 3
+            wait_for free 10
+        """)
+        self.assertEqual(script.commands, [('wait', None, 2), ('tap', 'SELECT', 1), ('tap', 'DOWN', 2),
+                                           ('hold', 'RIGHT', 3), ('wait_for', 'free', 10)])
+        for line in ('wait', 'JUMP', 'hold RIGHT', 'DOWN two'):
+            with self.subTest(line=line):
+                with self.assertRaises(ValueError):
+                    InputScript.parse(line)
+
+    def test_frames(self):
+        select, right = cf.SETTINGS['key_SELECT'], cf.SETTINGS['key_RIGHT']
+        script = InputScript.parse("wait 1\nSELECT 2\nhold RIGHT 3")
+        self.assertEqual(self.keys(script.frames(lambda: 'free')),
+                         [[], [(engine.KEYDOWN, select)], [(engine.KEYUP, select)],
+                          [(engine.KEYDOWN, select)], [(engine.KEYUP, select)],
+                          [(engine.KEYDOWN, right)], [], [], [(engine.KEYUP, right)]])
+
+    def test_wait_for(self):
+        states = iter(['event', 'event', 'free'])
+        current = ['event']
+
+        def current_state():
+            return current[0]
+
+        frames = InputScript.parse("wait_for free 5\nSELECT").frames(current_state)
+        for frame in frames:
+            if frame:
+                break
+            current[0] = next(states)
+        self.assertEqual(current[0], 'free')
+
+        with self.assertRaises(ScriptTimeout):
+            list(InputScript.parse("wait_for free 5").frames(lambda: 'event'))
+
+    def test_timings(self):
+        timings = StateTimings()
+        timings.add('free', 0.002)
+        timings.add('free', 0.004)
+        timings.add('event', 0.001)
+        self.assertEqual((timings.states['free'].frames, timings.states['free'].longest), (2, 0.004))
+        self.assertEqual(timings.frames, 3)
+        report = timings.report().splitlines()
+        # Slowest first
+        self.assertTrue(report[1].startswith('free'))
+        self.assertTrue(report[2].startswith('event'))
+
+if __name__ == '__main__':
+    unittest.main()
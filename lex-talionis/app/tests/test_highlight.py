@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.highlight import HighlightController
+from app.events.regions import RegionType
+
+class HighlightLayerKeyTests(unittest.TestCase):
+    """
+    Tests that the key the map view keeps its overlay layer by changes
+    whenever the highlights it would draw change, and only then
+    """
+
+    def setUp(self):
+        self.game = MagicMock(name='game')
+        self.game.level.regions = []
+        self.patcher = patch('app.engine.highlight.game', self.game)
+        self.patcher.start()
+        self.highlight = HighlightController()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def grow_in(self):
+        # Transitions only shrink as the highlights are drawn
+        while self.highlight.get_layer_key() is None:
+            for name, highlight_set in self.highlight.highlights.items():
+                if highlight_set:
+                    self.highlight.transitions[name] = max(0, self.highlight.transitions[name] - 1)
+
+    def test_layer_key(self):
+        key = self.highlight.get_layer_key()
+        # Nothing is shown, so the highlight animation does not matter
+        for _ in range(8):
+            self.highlight.update()
+        self.assertEqual(self.highlight.get_layer_key(), key)
+
+        self.highlight.add_highlights({(1, 1), (1, 2)}, 'move')
+        self.assertIsNone(self.highlight.get_layer_key())
+        self.grow_in()
+        key = self.highlight.get_layer_key()
+        self.assertEqual(self.highlight.get_layer_key(), key)
+        for _ in range(4):
+            self.highlight.update()
+        self.assertNotEqual(self.highlight.get_layer_key(), key)
+
+        key = self.highlight.get_layer_key()
+        self.highlight.remove_aura_highlights()
+        self.assertNotEqual(self.highlight.get_layer_key(), key)
+        key = self.highlight.get_layer_key()
+        self.highlight.show_formation([(3, 3)])
+        self.assertNotEqual(self.highlight.get_layer_key(), key)
+
+        key = self.highlight.get_layer_key()
+        region = MagicMock(nid='escape', region_type=RegionType.EVENT, sub_nid='Escape', position=(4, 4), size=[1, 1])
+        self.game.level.regions = [region]
+        self.assertNotEqual(self.highlight.get_layer_key(), key)
+        key = self.highlight.get_layer_key()
+        region.position = (5, 4)
+        self.assertNotEqual(self.highlight.get_layer_key(), key)
+
+if __name__ == '__main__':
+    unittest.main()
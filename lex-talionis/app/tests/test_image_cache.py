@@ -0,0 +1,192 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import pygame
+
+from app.data.resources.combat_anims import Frame, WeaponAnimation
+from app.engine.image_cache import IMAGE_CACHE, ImageCache, surface_bytes
+from app.tests.mocks.boot import load_project
+
+class Sheet():
+    def __init__(self, full_path):
+        self.full_path = full_path
+        self.image = None
+        self.images = []
+
+class ImageCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sheets = []
+        for idx in range(4):
+            path = os.path.join(self.tmp_dir.name, '%d.png' % idx)
+            pygame.image.save(pygame.Surface((16, 16)), path)
+            self.sheets.append(Sheet(path))
+        self.size = surface_bytes(pygame.image.load(self.sheets[0].full_path))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lru(self):
+        cache = ImageCache(3 * self.size)
+        a, b, c, d = self.sheets
+        for sheet in (a, b, c):
+            cache.load(sheet, 'image', sheet.full_path)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(cache.bytes_resident, 3 * self.size)
+
+        # Using a makes b the least recently used
+        image = a.image
+        self.assertIs(cache.load(a, 'image', a.full_path), image)
+        cache.load(d, 'image', d.full_path)
+        self.assertIsNone(b.image)
+        self.assertIsNotNone(a.image)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.bytes_resident, 3 * self.size)
+
+        # Released images are loaded again
+        cache.load(b, 'image', b.full_path)
+        self.assertIsNotNone(b.image)
+        self.assertIsNone(c.image)
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+        cache.clear()
+        self.assertTrue(all(sheet.image is None for sheet in self.sheets))
+        self.assertEqual(cache.bytes_resident, 0)
+
+    def test_unbounded_and_lists(self):
+        cache = ImageCache(0)
+        a, b, c, d = self.sheets
+        images = cache.load_all(a, 'images', [sheet.full_path for sheet in self.sheets])
+        self.assertEqual(len(images), 4)
+        self.assertIs(cache.load_all(a, 'images', []), images)
+        for sheet in (b, c, d):
+            cache.load(sheet, 'image', sheet.full_path)
+        self.assertEqual(cache.bytes_resident, 7 * self.size)
+        self.assertEqual(cache.evictions, 0)
+
+        released = []
+        cache.max_bytes = 2 * self.size
+        cache.track('other', self.size, lambda: released.append('other'))
+        # Only d and other fit, and a's list was swapped out, not emptied
+        self.assertEqual(a.images, [])
+        self.assertEqual(len(images), 4)
+        self.assertEqual([sheet.image is None for sheet in (b, c, d)], [True, True, False])
+        self.assertEqual(cache.bytes_resident, 2 * self.size)
+        cache.load(b, 'image', b.full_path)
+        self.assertEqual(released, [])
+        cache.load(c, 'image', c.full_path)
+        self.assertEqual(released, ['other'])
+
+    def test_without_evicting(self):
+        cache = ImageCache(self.size)
+        a, b, c, d = self.sheets
+        cache.load(a, 'image', a.full_path)
+        released = []
+
+        def load_in_background():
+            released.append(threading.current_thread())
+            with cache.without_evicting():
+                cache.load(b, 'image', b.full_path)
+                cache.track('other', self.size, lambda: released.append(threading.current_thread()))
+
+        thread = threading.Thread(target=load_in_background)
+        thread.start()
+        thread.join()
+        # Over budget, but nothing was released on the other thread
+        self.assertEqual(released, [thread])
+        self.assertIsNotNone(a.image)
+        self.assertEqual(cache.bytes_resident, 3 * self.size)
+        # The next load on this thread catches up
+        cache.load(c, 'image', c.full_path)
+        self.assertEqual(released, [thread, threading.current_thread()])
+        self.assertEqual([sheet.image is None for sheet in (a, b, c)], [True, True, False])
+        self.assertEqual(cache.bytes_resident, self.size)
+
+class TinyBudgetTests(unittest.TestCase):
+    """
+    With room for only one image at a time, every load lets go of the one
+    before it, so anything that loads more than one has to keep its own
+    references to them
+    """
+    @classmethod
+    def setUpClass(cls):
+        load_project('default.ltproj')
+
+    def setUp(self):
+        IMAGE_CACHE.clear()
+        patcher = patch.object(IMAGE_CACHE, 'max_bytes', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(IMAGE_CACHE.clear)
+
+    def test_map_sprites(self):
+        from app.data.resources.resources import RESOURCES
+        from app.engine.unit_sprite import MapSprite
+        for map_sprite in list(RESOURCES.map_sprites)[:3]:
+            for team in ('player', 'enemy'):
+                sprite = MapSprite(map_sprite, team)
+                self.assertEqual(len(sprite.down), 4)
+                self.assertEqual(len(sprite.gray), 3)
+
+    def test_tilemaps(self):
+        from app.data.resources.resources import RESOURCES
+        from app.engine.objects.tilemap import TileMapObject
+        for prefab in RESOURCES.tilemaps:
+            tilemap = TileMapObject.from_prefab(prefab)
+            self.assertTrue(all(layer.image for layer in tilemap.layers))
+
+    def test_portraits(self):
+        from app.data.resources.resources import RESOURCES
+        from app.engine import icons
+        from app.events.event_portrait import EventPortrait
+        for portrait in list(RESOURCES.portraits)[:3]:
+            self.assertIsNotNone(icons.get_portrait_from_nid(portrait.nid)[0])
+            self.assertEqual(icons.get_chibi(portrait).get_size(), (32, 32))
+            event_portrait = EventPortrait(portrait, (0, 0), 0)
+            self.assertEqual((event_portrait.width, event_portrait.height), event_portrait.image.get_size())
+            self.assertEqual(event_portrait.chibi.get_size(), (32, 32))
+
+class LazyTimelineTests(unittest.TestCase):
+    def test_restores_on_first_use(self):
+        s_dict = {'nid': 'Sword',
+                  'poses': [['Stand', [['frame', [3, 'Stand1']], ['wait', [1]]]]],
+                  'frames': [['Stand1', [0, 0, 48, 32], [10, 12]]]}
+        weapon_anim = WeaponAnimation.restore(s_dict)
+        # Saving an untouched animation gives back what was loaded
+        self.assertEqual(weapon_anim.save(), s_dict)
+        self.assertIsNotNone(weapon_anim._unrestored)
+
+        self.assertEqual(weapon_anim.frames.get('Stand1').rect, (0, 0, 48, 32))
+        self.assertIsNone(weapon_anim._unrestored)
+        self.assertEqual([command.nid for command in weapon_anim.poses.get('Stand').timeline], ['frame', 'wait'])
+        saved = weapon_anim.save()
+        self.assertEqual(saved['frames'], [('Stand1', (0, 0, 48, 32), (10, 12))])
+        self.assertEqual(saved['poses'][0][0], 'Stand')
+
+    def test_restores_once_across_threads(self):
+        s_dict = {'nid': 'Sword', 'poses': [],
+                  'frames': [['Stand%d' % idx, [0, 0, 48, 32], [10, 12]] for idx in range(3)]}
+        weapon_anim = WeaponAnimation.restore(s_dict)
+        restore = Frame.restore
+
+        def slow_restore(s_tuple):
+            time.sleep(0.01)
+            return restore(s_tuple)
+
+        seen = []
+        with patch.object(Frame, 'restore', side_effect=slow_restore):
+            threads = [threading.Thread(target=lambda: seen.append(len(weapon_anim.frames))) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # Neither saw it half restored, and it was only restored once
+        self.assertEqual(seen, [3, 3])
+        self.assertEqual(len(weapon_anim.frames), 3)
+
+if __name__ == '__main__':
+    unittest.main()
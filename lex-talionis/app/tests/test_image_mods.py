@@ -0,0 +1,102 @@
+import random
+import unittest
+
+import pygame
+
+from app.engine import image_mods
+from app.tests.mocks.boot import init_dummy_display
+
+COLORKEY = (128, 160, 128)
+
+def make_image(colors, size=(24, 20), flags=0, depth=0, seed=0):
+    rng = random.Random(seed)
+    image = pygame.Surface(size, flags, depth) if depth else pygame.Surface(size, flags)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            image.set_at((x, y), rng.choice(colors))
+    return image
+
+class ImageModsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_dummy_display()
+
+    def assertSamePixels(self, a, b):
+        self.assertEqual(a.get_size(), b.get_size())
+        self.assertEqual(pygame.image.tobytes(a, 'RGBA'), pygame.image.tobytes(b, 'RGBA'))
+
+    def images(self):
+        colors = [COLORKEY, (0, 0, 0), (255, 255, 255), (200, 40, 16), (8, 72, 248), (127, 128, 129)]
+        alpha_colors = [(r, g, b, a) for (r, g, b) in colors for a in (0, 90, 255)]
+        sheet = make_image(colors, size=(40, 30), depth=24)
+        sheet.set_colorkey(COLORKEY)
+        yield 'rgb', make_image(colors, depth=24)
+        yield 'colorkey', make_image(colors).convert()
+        yield 'alpha', make_image(alpha_colors, flags=pygame.SRCALPHA)
+        # Only part of each row belongs to the subsurface
+        yield 'subsurface', sheet.subsurface((5, 3, 17, 20))
+        # The last row of the subsurface is the last row of the sheet
+        yield 'corner subsurface', sheet.subsurface((23, 10, 17, 20))
+        # Too many colors to map each one once
+        yield 'many colors', make_image([(r, g, 50) for r in range(0, 255, 12) for g in range(0, 255, 12)], size=(40, 40))
+
+    def test_gray(self):
+        for name, image in self.images():
+            for ignore, new in ((None, image_mods.make_gray),
+                                (COLORKEY, image_mods.make_gray_colorkey),
+                                ((128, 160, 128), image_mods.make_anim_gray)):
+                with self.subTest(image=name, ignore=ignore):
+                    expected = image_mods._gray_per_pixel(image.copy(), ignore)
+                    copy = image.copy()
+                    # Still in place, since callers rely on that
+                    self.assertIs(new(copy), copy)
+                    self.assertSamePixels(copy, expected)
+
+    def test_gray_subsurface_in_place(self):
+        for rect in ((5, 3, 17, 20), (23, 10, 17, 20)):
+            with self.subTest(rect=rect):
+                sheet = make_image([(0, 0, 0), (200, 40, 16)], size=(40, 30), depth=24)
+                expected = sheet.copy()
+                image_mods._gray_per_pixel(expected.subsurface(rect))
+                image_mods.make_gray(sheet.subsurface(rect))
+                # Nothing outside the subsurface was touched
+                self.assertSamePixels(sheet, expected)
+
+    def test_corner_subsurface_buffer(self):
+        # What map_pixels has to work around: the buffer of a subsurface in
+        # the bottom right corner claims to run past the end of its parent
+        sheet = make_image([(0, 0, 0), (200, 40, 16)], size=(40, 30), depth=24)
+        image = sheet.subsurface((23, 10, 17, 20))
+        offset = 10 * sheet.get_pitch() + 23 * sheet.get_bytesize()
+        self.assertGreater(offset + image.get_buffer().length, sheet.get_buffer().length)
+        expected = image.copy()
+        image_mods._invert_surface_per_pixel(expected)
+        self.assertTrue(image_mods.map_pixels(image, lambda pixel: pixel ^ 0xffffff))
+        self.assertSamePixels(image, expected)
+
+    def test_invert(self):
+        for name, image in self.images():
+            with self.subTest(image=name):
+                expected = image.copy()
+                image_mods._invert_surface_per_pixel(expected)
+                copy = image.copy()
+                image_mods.invert_surface(copy)
+                self.assertSamePixels(copy, expected)
+
+    def test_change_color(self):
+        image = make_image([(0, 0, 0), (255, 255, 255), (200, 40, 16)], flags=pygame.SRCALPHA)
+
+        def sequential(image, color):
+            image = image.copy()
+            for idx, band in enumerate(color):
+                new_color = [0, 0, 0]
+                new_color[min(idx, 2)] = abs(band)
+                image.fill(new_color, None, pygame.BLEND_RGB_SUB if band < 0 else pygame.BLEND_RGB_ADD)
+            return image
+
+        for color in ((40, -30, 10), (-255, 0, 255), (0, 0, 0), (10, 20, -100, 60)):
+            with self.subTest(color=color):
+                self.assertSamePixels(image_mods.change_color(image, color), sequential(image, color))
+
+if __name__ == '__main__':
+    unittest.main()
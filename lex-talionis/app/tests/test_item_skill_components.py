@@ -12,7 +12,7 @@ from app.engine.item_components.weapon_components import Damage, Hit, Crit
 from app.engine.item_components.extra_components import CustomTriangleMultiplier
 from app.engine.skill_components.base_components import CanUseWeaponType, CannotUseWeaponType, ChangeAI, ChangeBuyPrice, IgnoreAlliances, Locktouch
 from app.engine.skill_components.combat_components import DamageMultiplier
-from app.engine.skill_components.combat2_components import Vantage
+from app.engine.skill_components.combat2_components import CannotDouble, Vantage
 from app.engine.skill_components.dynamic_components import DynamicDamage
 from app.engine.skill_components.aesthetic_components import BattleAnimMusic, UnitFlickeringTint
 
@@ -341,5 +341,40 @@ class ItemSkillComponentTests(unittest.TestCase):
         self.assertEqual(25, item_system.crit(mock_unit, mock_item))
         self.assertEqual(4, item_system.modify_weapon_triangle(mock_unit, mock_item))
 
+class SkillHookIndexTests(unittest.TestCase):
+    def setUp(self):
+        from app.data.database.database import DB
+        source_generator.generate_component_system_source()
+        DB.load('testing_proj.ltproj')
+
+    def test_skill_hook_index_invalidation(self):
+        from app.engine import skill_system
+        from app.engine.objects.skill import SkillObject
+        from app.engine.objects.unit import UnitObject
+        from app.utilities.data import Data
+        unit = UnitObject('unit')
+        self.assertFalse(skill_system.vantage(unit))
+        # A unit with no skills keeps its index between hook calls
+        index = unit._skill_hook_index
+        self.assertFalse(skill_system.vantage(unit))
+        self.assertIs(unit._skill_hook_index, index)
+
+        # Adding a skill rebuilds the index
+        skill = SkillObject('vantage', 'Vantage', '', components=Data([Vantage()]))
+        unit.add_skill(skill)
+        self.assertTrue(skill_system.vantage(unit))
+        self.assertFalse(skill_system.no_double(unit))
+        self.assertEqual(skill_system.get_implementers(unit, 'vantage'), [(skill, skill.components.get('vantage'))])
+
+        # Changing a skill's components rebuilds the index
+        skill.components.append(CannotDouble())
+        skill_system.reset_hook_index()
+        self.assertTrue(skill_system.no_double(unit))
+
+        # Removing a skill rebuilds the index
+        unit.remove_skill(skill, None)
+        self.assertFalse(skill_system.vantage(unit))
+        self.assertFalse(skill_system.no_double(unit))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine import equations
+from app.engine.bresenham_line_algorithm import get_line
+from app.engine.line_of_sight import VisibilityCache
+from app.utilities import utils
+
+WIDTH, HEIGHT = 8, 6
+# A wall down the middle of the map, with a gap at the bottom
+WALLS = {(4, 0), (4, 1), (4, 2), (4, 3)}
+
+class VisibilityCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.walls = set(WALLS)
+        self.visibility = VisibilityCache(WIDTH, HEIGHT, self.get_opacity)
+        self.game = MagicMock()
+        self.game.units = []
+        self.patches = [
+            patch('app.engine.line_of_sight.game', self.game),
+            patch('app.engine.skill_system.sight_range', lambda unit: unit.sight_range),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def get_opacity(self, pos) -> bool:
+        return pos in self.walls
+
+    def make_unit(self, nid, team, position, sight_range=0):
+        unit = MagicMock(nid=nid, team=team, position=position, sight_range=sight_range)
+        self.game.units.append(unit)
+        return unit
+
+    def test_field_matches_lines(self):
+        source = (2, 2)
+        for radius in range(6):
+            field = self.visibility.get_field(source, radius)
+            expected = {(x, y) for x in range(WIDTH) for y in range(HEIGHT)
+                        if utils.calculate_distance(source, (x, y)) <= radius and
+                        get_line(source, (x, y), self.get_opacity)}
+            self.assertEqual(field, expected)
+        self.assertNotIn((6, 1), self.visibility.get_field(source, 10))
+        self.assertEqual(self.visibility.get_field(source, -1), {source})
+
+    def test_team_vision(self):
+        unit = self.make_unit('unit', 'player', (2, 2))
+        self.make_unit('enemy', 'enemy', (6, 1))
+        equations.bump_generation()
+        lit = self.visibility.get_lit('player', 3)
+        self.assertEqual(set(+lit), self.visibility.get_field((2, 2), 3))
+        self.assertEqual(lit[(6, 1)], 0)
+
+        # Nothing happens until the unit state changes
+        unit.position = (5, 1)
+        self.assertEqual(self.visibility.get_lit('player', 3)[(6, 1)], 0)
+        equations.bump_generation()
+        lit = self.visibility.get_lit('player', 3)
+        self.assertEqual(lit[(6, 1)], 1)
+        self.assertEqual(lit[(1, 2)], 0)
+
+        # A second unit adds to the count
+        self.make_unit('unit2', 'player', (6, 2), sight_range=1)
+        equations.bump_generation()
+        lit = self.visibility.get_lit('player', 3)
+        self.assertEqual(lit[(6, 1)], 2)
+        self.assertEqual(set(+lit), self.visibility.get_field((5, 1), 3) | self.visibility.get_field((6, 2), 4))
+
+    def test_clear(self):
+        self.assertFalse(self.visibility.has_line((2, 1), (6, 1)))
+        self.walls.discard((4, 1))
+        # Still cached
+        self.assertFalse(self.visibility.has_line((2, 1), (6, 1)))
+        self.visibility.clear()
+        self.assertTrue(self.visibility.has_line((2, 1), (6, 1)))
+
+if __name__ == '__main__':
+    unittest.main()
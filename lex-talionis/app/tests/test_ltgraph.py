@@ -0,0 +1,67 @@
+import random
+import unittest
+
+from app.utilities.algorithms.ltgraph import LTGraph
+
+class LTGraphTests(unittest.TestCase):
+    def path_length(self, graph: LTGraph, path) -> float:
+        return sum(graph[path[i]][path[i + 1]].weight for i in range(len(path) - 1))
+
+    def all_distances(self, graph: LTGraph, source) -> dict:
+        """Bellman-Ford, to check against"""
+        dist = {source: 0}
+        for _ in range(len(graph.vertices)):
+            for v1, neighbors in graph.adj.items():
+                for v2 in neighbors:
+                    if v1 in dist and dist[v1] + graph[v1][v2].weight < dist.get(v2, float('inf')):
+                        dist[v2] = dist[v1] + graph[v1][v2].weight
+        return dist
+
+    def test_shortest_path(self):
+        graph = LTGraph(vertices=['a', 'b', 'c', 'd', 'e'])
+        graph.add_edge('a', 'b', weight=1)
+        graph.add_edge('b', 'c', weight=1)
+        graph.add_edge('a', 'c', weight=5)
+        self.assertEqual(graph.shortest_path('a', 'c'), ['a', 'b', 'c'])
+        self.assertEqual(graph.shortest_path('c', 'a'), ['c', 'b', 'a'])
+        self.assertEqual(graph.shortest_path('a', 'a'), [])
+        self.assertIsNone(graph.shortest_path('a', 'd'))
+        self.assertIsNone(graph.shortest_path('a', 'z'))
+        self.assertTrue(graph.has_path('a', 'c'))
+        self.assertFalse(graph.has_path('a', 'd'))
+        self.assertFalse(graph.has_path('a', 'a'))
+
+        # Joining d and e leaves the paths from a alone
+        tree = graph._trees['a']
+        graph.add_edge('d', 'e')
+        self.assertIs(graph._trees['a'], tree)
+        self.assertTrue(graph.has_path('e', 'd'))
+        # But joining them to a's component forgets them
+        graph.add_edge('c', 'd', weight=1)
+        self.assertNotIn('a', graph._trees)
+        self.assertEqual(graph.shortest_path('a', 'e'), ['a', 'b', 'c', 'd', 'e'])
+        # A shortcut is found after adding it
+        graph.add_edge('a', 'e', weight=1)
+        self.assertEqual(graph.shortest_path('a', 'e'), ['a', 'e'])
+
+    def test_matches_reference(self):
+        rng = random.Random(0)
+        graph = LTGraph(vertices=range(30))
+        for _ in range(60):
+            graph.add_edge(rng.randrange(30), rng.randrange(30), weight=rng.randint(1, 9))
+            source = rng.randrange(30)
+            dist = self.all_distances(graph, source)
+            for dest in range(30):
+                path = graph.shortest_path(source, dest)
+                self.assertEqual(graph.has_path(source, dest), source != dest and dest in dist)
+                if source == dest:
+                    self.assertEqual(path, [])
+                elif dest in dist:
+                    self.assertEqual(path[0], source)
+                    self.assertEqual(path[-1], dest)
+                    self.assertEqual(self.path_length(graph, path), dist[dest])
+                else:
+                    self.assertIsNone(path)
+
+if __name__ == '__main__':
+    unittest.main()
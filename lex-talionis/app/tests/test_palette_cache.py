@@ -0,0 +1,78 @@
+import random
+import unittest
+
+import pygame
+
+from app.engine import engine, image_mods
+from app.engine.image_cache import ImageCache, surface_bytes
+from app.engine.palette_cache import PaletteCache
+from app.tests.mocks.boot import init_dummy_display
+
+COLORKEY = (128, 160, 128)
+
+def make_sheet(colors, size=(48, 32), seed=0):
+    rng = random.Random(seed)
+    sheet = pygame.Surface(size)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            sheet.set_at((x, y), rng.choice(colors))
+    return sheet
+
+class PaletteCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_dummy_display()
+
+    def assertSamePixels(self, a, b):
+        self.assertEqual(engine.surf_to_raw(a, 'RGB'), engine.surf_to_raw(b, 'RGB'))
+
+    def test_matches_color_convert(self):
+        # Indices in the style of combat animations, and colors that need more than a byte to combine
+        anim_colors = [COLORKEY] + [(0, x, y) for x in range(8) for y in range(2)]
+        many_colors = [(r, (r * 7 + 3) % 256, (r * 31) % 256) for r in range(100)]
+        for colors in (anim_colors, many_colors):
+            sheet = make_sheet(colors)
+            conversion_dict = {colors[idx]: ((idx * 40) % 256, 255 - idx, 12) for idx in range(1, min(len(colors), 40))}
+            # Replacing one after another means this chains back to the colorkey
+            conversion_dict[colors[1]] = colors[2]
+            conversion_dict[colors[2]] = COLORKEY
+            indexed = image_mods.index_colors(sheet)
+            self.assertEqual(indexed.get_bitsize(), 8)
+            self.assertSamePixels(indexed, sheet)
+            self.assertSamePixels(image_mods.recolor_indexed(indexed, conversion_dict),
+                                  image_mods.color_convert(sheet.copy(), conversion_dict))
+
+    def test_too_many_colors(self):
+        sheet = make_sheet([(r, g, 0) for r in range(20) for g in range(20)], size=(40, 40))
+        self.assertIsNone(image_mods.index_colors(sheet))
+        # Still recolors, just without the palette
+        cache = PaletteCache(ImageCache())
+        conversion_dict = {(0, 0, 0): (255, 255, 255)}
+        self.assertSamePixels(cache.get('sheet', sheet, 'white', conversion_dict),
+                              image_mods.color_convert(sheet.copy(), conversion_dict))
+
+    def test_shared_and_bounded(self):
+        colors = [COLORKEY, (0, 1, 0), (0, 2, 0)]
+        sheet = make_sheet(colors)
+        sheet.set_colorkey(COLORKEY)
+        image_cache = ImageCache()
+        cache = PaletteCache(image_cache)
+        red = {(0, 1, 0): (255, 0, 0)}
+        first = cache.get('Soldier-Lance', sheet, 'enemy', red)
+        self.assertIs(cache.get('Soldier-Lance', sheet, 'enemy', dict(red)), first)
+        self.assertEqual(first.get_colorkey()[:3], COLORKEY)
+        # Same palette nid with different colors, as after editing the palette
+        self.assertIsNot(cache.get('Soldier-Lance', sheet, 'enemy', {(0, 1, 0): (0, 0, 255)}), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(len(cache.indexed), 1)
+
+        # Only room for the last recolor
+        image_cache.max_bytes = surface_bytes(first)
+        cache.get('Soldier-Lance', sheet, 'player', {(0, 2, 0): (0, 255, 0)})
+        self.assertEqual(len(cache.recolored), 1)
+        self.assertFalse(cache.indexed)
+        cache.get('Soldier-Lance', sheet, 'enemy', red)
+        self.assertEqual(cache.misses, 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -55,6 +55,27 @@ class PathSystemTests(unittest.TestCase):
             self.assertGreater(len(valid_moves), 0, 'get_valid_moves did not return a valid move')
             self.assertIn((1, 1), valid_moves, 'current position is not valid_moves')
 
+    def test_valid_moves_legacy_engine(self):
+        enemy_unit = UnitObject('enemy')
+        enemy_unit.team = 'enemy'
+        enemy_unit.position = (2, 1)
+        self.game.board.set_unit(enemy_unit.position, enemy_unit)
+        ally_unit = UnitObject('ally')
+        ally_unit.team = 'player'
+        ally_unit.position = (1, 3)
+        self.game.board.set_unit(ally_unit.position, ally_unit)
+
+        with patch('app.engine.objects.unit.UnitObject.movement_left', new_callable=PropertyMock) as movement_left_mock, \
+             patch('app.engine.game_board.GameBoard.in_vision', return_value=True):
+            movement_left_mock.return_value = 5
+
+            valid_moves = self.path_system.get_valid_moves(self.player_unit)
+            self.path_system.legacy_pathfinding = True
+            legacy_valid_moves = self.path_system.get_valid_moves(self.player_unit)
+            self.assertEqual(valid_moves, legacy_valid_moves, 'Pathfinding engines do not agree')
+            self.assertNotIn((2, 1), valid_moves, 'Moved through an enemy')
+            self.assertIn((1, 3), valid_moves, 'Could not move through an ally')
+
     def test_get_path(self):
         goal = (28, 14)
 
@@ -1,7 +1,7 @@
 import unittest
 
 from app.utilities.grid import BoundedGrid
-from app.engine.pathfinding import node, pathfinding
+from app.engine.pathfinding import cost_grid, node, pathfinding
 
 class PathfindingTests(unittest.TestCase):
     """
@@ -69,6 +69,43 @@ x   x   x   x   x   x   x   x   x
         self.assertNotIn((3, 6), valid_moves, 'Ignored wall')
         self.assertNotIn((3, 6), valid_moves, 'Ignored wall')
 
+    def _make_cost_grid(self, grid: BoundedGrid) -> cost_grid.CostGrid:
+        new_grid = cost_grid.CostGrid((grid.width, grid.height))
+        for n in grid.cells():
+            new_grid.append(n.cost)
+        return new_grid
+
+    def test_flood_fill(self):
+        # Testing the simple grid
+        pathfinder = pathfinding.FloodFill((5, 5), self._make_cost_grid(self.simple_grid), self.simple_grid.bounds)
+        valid_moves = pathfinder.process(set(), 5)
+        self.assertNotIn((1, 1), valid_moves, 'Moved too far')
+        self.assertNotIn((5, 0), valid_moves, 'Ignored bounds')
+        self.assertNotIn((0, 5), valid_moves, 'Ignored bounds')
+        self.assertIn((5, 5), valid_moves, 'Original position should be a valid move')
+        self.assertEqual(len(valid_moves), 59,
+                         'Found the incorrect number of moves')
+
+        # Test walls, terrain costs
+        complex_costs = self._make_cost_grid(self.complex_grid)
+        pathfinder = pathfinding.FloodFill((1, 7), complex_costs, self.complex_grid.bounds)
+        valid_moves = pathfinder.process(set(), 5)
+        self.assertNotIn((0, 7), valid_moves, 'Ignored bounds')
+        self.assertNotIn((4, 7), valid_moves, 'Ignored terrain cost')
+        self.assertNotIn((3, 6), valid_moves, 'Ignored wall')
+
+    def test_flood_fill_matches_djikstra(self):
+        complex_costs = self._make_cost_grid(self.complex_grid)
+        height = self.complex_grid.height
+        blocked_positions = {(2, 5), (4, 3), (5, 7)}
+        blocked = {x * height + y for (x, y) in blocked_positions}
+        can_move_through = lambda pos: pos not in blocked_positions
+        for start in [(1, 7), (4, 5), (7, 9), (8, 3)]:
+            for movement_left in range(0, 12):
+                old = pathfinding.Djikstra(start, self.complex_grid).process(can_move_through, movement_left)
+                new = pathfinding.FloodFill(start, complex_costs, self.complex_grid.bounds).process(blocked, movement_left)
+                self.assertEqual(old, new, f'Engines disagree from {start} with {movement_left} movement')
+
     def test_astar(self):
         # Test the simple grid with no limit
         pathfinder = pathfinding.AStar((5, 5), None, self.simple_grid)
@@ -98,6 +135,48 @@ x   x   x   x   x   x   x   x   x
         path = pathfinder.process(can_move_through, adj_good_enough=True)
         self.assertEqual(path[0], (7, 8), f'Did not find the best end: {path}')
 
+    def test_goal_field_matches_astar(self):
+        complex_costs = self._make_cost_grid(self.complex_grid)
+        height = self.complex_grid.height
+        blocked_positions = {(2, 5), (4, 3), (5, 7)}
+        blocked = frozenset(x * height + y for (x, y) in blocked_positions)
+        bounds = self.complex_grid.bounds
+        can_move_through = lambda pos: pos not in blocked_positions
+        path_cost = lambda path: sum(self.complex_grid.get(pos).cost for pos in path[:-1])
+        distance = lambda pos1, pos2: abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+        starts = [(1, 7), (4, 5), (7, 9), (6, 4)]
+        for goal in [(x, y) for x in range(1, 9) for y in range(3, 11)]:
+            for adj_good_enough in (False, True):
+                goal_field = pathfinding.GoalField((goal,), complex_costs, bounds, blocked, adj_good_enough)
+                for start in starts:
+                    for limit in (None, 4, 9):
+                        astar = pathfinding.AStar(start, goal, self.complex_grid)
+                        old = astar.process(can_move_through, adj_good_enough=adj_good_enough, limit=limit)
+                        new = goal_field.find_path(start, limit=limit)
+                        msg = f'{start} to {goal}, adj {adj_good_enough}, limit {limit}: {old} vs {new}'
+                        self.assertEqual(bool(old), bool(new), msg)
+                        if old:
+                            self.assertEqual(new[-1], start, msg)
+                            # Equally good ends next to the goal may be chosen in a different order
+                            self.assertEqual(path_cost(old) + distance(old[0], goal), path_cost(new) + distance(new[0], goal), msg)
+                            if not adj_good_enough:
+                                self.assertEqual(old[0], new[0], msg)
+                            for pos, next_pos in zip(new, new[1:]):
+                                self.assertEqual(distance(pos, next_pos), 1, msg)
+
+    def test_distance_field_cache(self):
+        from app.engine.pathfinding.field_cache import DistanceFieldCache
+        complex_costs = self._make_cost_grid(self.complex_grid)
+        bounds = self.complex_grid.bounds
+        cache = DistanceFieldCache()
+        field = cache.get('Infantry', complex_costs, bounds, ((7, 7),), frozenset())
+        self.assertIs(cache.get('Infantry', complex_costs, bounds, ((7, 7),), frozenset()), field)
+        # Different blockers need a new search
+        self.assertIsNot(cache.get('Infantry', complex_costs, bounds, ((7, 7),), frozenset({5})), field)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.clear()
+        self.assertIsNot(cache.get('Infantry', complex_costs, bounds, ((7, 7),), frozenset()), field)
+
     def test_thetastar(self):
         # Test the simple grid
         pathfinder = pathfinding.ThetaStar((5, 5), (1, 1), self.simple_grid)
@@ -0,0 +1,115 @@
+import logging
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pygame
+
+from app.data.resources.tiles import TileSet
+from app.engine import prefetch
+from app.engine.image_cache import ImageCache
+from app.engine.prefetch import Prefetcher
+
+class PrefetchTests(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.prefetcher = Prefetcher()
+
+    def tearDown(self):
+        self.prefetcher.stop()
+        logging.disable(logging.NOTSET)
+
+    def test_runs_jobs_in_background(self):
+        threads = []
+
+        def job():
+            threads.append(threading.current_thread())
+            return True
+
+        def broken():
+            raise ValueError("Missing file")
+
+        jobs = [(('map_sprite', 'a'), job), (('map_sprite', 'b'), broken),
+                (('battle_anim', 'c'), lambda: False), (('music', 'd'), job)]
+        self.prefetcher.start(jobs).join()
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+        # Broken and skipped jobs are not counted, but do not stop the rest
+        self.assertEqual(self.prefetcher.prefetched, {('map_sprite', 'a'), ('music', 'd')})
+
+    def test_restart_cancels(self):
+        started, release = threading.Event(), threading.Event()
+        ran = []
+
+        def block():
+            started.set()
+            release.wait(5)
+            return True
+
+        first = self.prefetcher.start([('block', block), ('after', lambda: ran.append('after'))])
+        started.wait(5)
+        release.set()
+        self.prefetcher.start([('next', lambda: ran.append('next'))]).join()
+        self.assertFalse(first.is_alive())
+        self.assertEqual(ran, ['next'])
+        self.assertNotIn('block', self.prefetcher.prefetched)
+
+    def test_coverage(self):
+        self.assertEqual(self.prefetcher.coverage, 1)
+        self.prefetcher.record_use(('map_sprite', 'a'), True)
+        self.prefetcher.record_use(('map_sprite', 'b'), False)
+        # Only the first use of each counts
+        self.prefetcher.record_use(('map_sprite', 'b'), True)
+        self.prefetcher.record_use(('battle_anim', 'c'), True)
+        self.assertEqual((self.prefetcher.hits, self.prefetcher.cold), (2, 1))
+        self.assertAlmostEqual(self.prefetcher.coverage, 2 / 3)
+        # Starting the next level starts counting over
+        self.prefetcher.start([]).join()
+        self.assertEqual((self.prefetcher.hits, self.prefetcher.cold), (0, 0))
+
+    def test_never_evicts(self):
+        cache = ImageCache(1)
+        released = []
+        cache.track('main', 1, lambda: released.append('main'))
+
+        def job():
+            cache.track('prefetched', 1, lambda: released.append('prefetched'))
+            return True
+
+        with patch('app.engine.prefetch.IMAGE_CACHE', cache):
+            self.prefetcher.start([('job', job)]).join()
+        # What the main thread was using is still there, until the main thread loads something else
+        self.assertEqual(released, [])
+        self.assertEqual(cache.bytes_resident, 2)
+        cache.track('next', 1, lambda: None)
+        self.assertEqual(released, ['main', 'prefetched'])
+
+    def test_tilesets(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'Plains.png')
+            pygame.image.save(pygame.Surface((32, 32)), path)
+            tileset = TileSet('Plains', path)
+            tile_sprite = MagicMock(tileset_nid='Plains')
+            tilemap = MagicMock(layers=[MagicMock(sprite_grid={(0, 0): tile_sprite, (1, 0): tile_sprite})])
+            resources = MagicMock()
+            resources.tilemaps.get = {'Chapter 1 Flooded': tilemap}.get
+            resources.tilesets.get = {'Plains': tileset}.get
+            cache = ImageCache()
+            with patch('app.data.resources.resources.RESOURCES', resources), \
+                    patch('app.engine.prefetch.IMAGE_CACHE', cache):
+                jobs = prefetch._tileset_jobs(['Chapter 1 Flooded', 'Missing'])
+                self.assertEqual([key for key, job in jobs], [('tileset', 'Plains')])
+                # Nothing is decoded once the image cache is getting full
+                cache.max_bytes = 4
+                cache.bytes_resident = 3
+                self.prefetcher.start(jobs).join()
+                self.assertIsNone(tileset.image)
+                cache.max_bytes = 0
+                self.prefetcher.start(jobs).join()
+        self.assertIsNotNone(tileset.image)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+if __name__ == '__main__':
+    unittest.main()
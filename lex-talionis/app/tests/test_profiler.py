@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from app.engine.profiler import _NULL_SCOPE, Profiler
+
+class ProfilerTests(unittest.TestCase):
+    def test_disabled(self):
+        profiler = Profiler()
+        self.assertIs(profiler.scope('state.update'), _NULL_SCOPE)
+        with profiler.scope('state.update'):
+            pass
+        profiler.next_frame()
+        self.assertEqual(profiler.records, [])
+        self.assertEqual(len(profiler.frames), 0)
+        self.assertEqual(profiler.breakdown(), (0, []))
+
+    def test_breakdown(self):
+        profiler = Profiler()
+        profiler.enable()
+        for _ in range(3):
+            with profiler.scope('state.draw', 'free'):
+                with profiler.scope('map_view.units'):
+                    pass
+            with profiler.scope('sound.update'):
+                pass
+            profiler.next_frame()
+        self.assertEqual(len(profiler.frames), 3)
+        frame_ms, scopes = profiler.breakdown()
+        names = [name for name, _ in scopes]
+        self.assertEqual(sorted(names), ['map_view.units', 'sound.update', 'state.draw'])
+        # Nested scopes count towards the scope around them as well
+        ms = dict(scopes)
+        self.assertGreaterEqual(ms['state.draw'], ms['map_view.units'])
+        self.assertGreaterEqual(frame_ms, ms['state.draw'])
+        self.assertEqual(names, sorted(names, key=lambda name: -ms[name]))
+
+        profiler.disable()
+        with profiler.scope('state.draw'):
+            pass
+        profiler.next_frame()
+        self.assertEqual(len(profiler.frames), 3)
+
+    def test_history(self):
+        profiler = Profiler(history=2)
+        profiler.enable()
+        for _ in range(5):
+            profiler.next_frame()
+        self.assertEqual(len(profiler.frames), 2)
+
+    def test_chrome_trace(self):
+        profiler = Profiler()
+        profiler.enable()
+        with profiler.scope('state.update', 'free'):
+            pass
+        profiler.next_frame()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = profiler.dump(os.path.join(tmp_dir, 'traces', 'trace.json'))
+            with open(path) as fp:
+                trace = json.load(fp)
+        frame, scope = trace['traceEvents']
+        self.assertEqual((frame['name'], frame['ph'], frame['ts']), ('frame', 'X', 0))
+        self.assertEqual((scope['name'], scope['ph'], scope['args']), ('state.update', 'X', {'arg': 'free'}))
+        self.assertGreaterEqual(scope['ts'], frame['ts'])
+        self.assertLessEqual(scope['ts'] + scope['dur'], frame['ts'] + frame['dur'])
+
+if __name__ == '__main__':
+    unittest.main()
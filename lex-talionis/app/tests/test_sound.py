@@ -0,0 +1,183 @@
+import logging
+import os
+import struct
+import tempfile
+import time
+import unittest
+import wave
+from unittest.mock import MagicMock, patch
+
+import pygame
+
+from app.data.resources.sounds import SongPrefab
+from app.engine import engine, sound
+
+NUM_SONGS = 12
+SONG_SECONDS = 0.5
+
+class MusicDecodeTests(unittest.TestCase):
+    """
+    Cycles through every song the way chapters and events do, and checks
+    that only the songs on a channel plus the budget stay decoded
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(44100, -16, 2, 512)
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.mixer.quit()
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.prefabs = {}
+        for idx in range(NUM_SONGS):
+            nid = 'Song%d' % idx
+            prefab = SongPrefab(nid, self.write_wav(nid))
+            if idx % 3 == 0:
+                prefab.set_battle_full_path(self.write_wav(nid + '-battle'))
+            self.prefabs[nid] = prefab
+        broken_path = os.path.join(self.tmp_dir.name, 'Broken.wav')
+        with open(broken_path, 'wb') as fp:
+            fp.write(b'not a song')
+        broken = SongPrefab('Broken', broken_path)
+        resources = MagicMock()
+        resources.music.get = {**self.prefabs, 'Broken': broken}.get
+
+        self.song_bytes = sound.sound_bytes(pygame.mixer.Sound(self.prefabs['Song1'].full_path))
+        self.music = sound.MusicDict(3 * self.song_bytes)
+        self.patches = [
+            patch('app.engine.sound.RESOURCES', resources),
+            patch('app.engine.sound.MUSIC', self.music),
+        ]
+        for p in self.patches:
+            p.start()
+        self.current_time = engine.constants['current_time']
+        self.controller = sound.SoundController()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        pygame.mixer.stop()
+        engine.constants['current_time'] = self.current_time
+        self.tmp_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def write_wav(self, name: str) -> str:
+        path = os.path.join(self.tmp_dir.name, name + '.wav')
+        with wave.open(path, 'wb') as fp:
+            fp.setnchannels(2)
+            fp.setsampwidth(2)
+            fp.setframerate(44100)
+            fp.writeframes(struct.pack('<h', 0) * 2 * int(44100 * SONG_SECONDS))
+        return path
+
+    def wait_until_playing(self, song):
+        start = time.time()
+        while not song.loaded and time.time() - start < 5:
+            time.sleep(0.01)
+        # Let any fades finish
+        for _ in range(2):
+            engine.constants['current_time'] += 1000
+            self.controller.update([])
+        self.assertTrue(song.loaded)
+        self.assertFalse(song.channel.channel.waiting_for_load)
+
+    def in_use_bytes(self) -> int:
+        return sum(song.num_bytes for song in self.music.values() if song.in_use())
+
+    def test_memory_stays_flat(self):
+        most_resident = 0
+        for _ in range(2):
+            for nid in self.prefabs:
+                song = self.controller.fade_in(nid)
+                self.assertIs(song, self.music.get(nid))
+                # Not decoded on the main thread
+                self.wait_until_playing(song)
+                resident = self.music.bytes_resident()
+                most_resident = max(most_resident, resident)
+                self.assertLessEqual(resident, self.music.max_bytes + self.in_use_bytes())
+        # Only ever four channels with a song, plus the budget
+        everything = sum(sound.sound_bytes(pygame.mixer.Sound(path)) for prefab in self.prefabs.values()
+                         for path in (prefab.full_path, prefab.battle_full_path) if path)
+        self.assertLess(most_resident, everything / 2)
+
+    def test_battle_crossfade(self):
+        song = self.controller.fade_in('Song0')
+        self.wait_until_playing(song)
+        self.assertIsNotNone(song.battle)
+        self.assertIs(self.controller.battle_fade_in('Song0'), song)
+        self.assertTrue(song.channel.battle_mode)
+        self.controller.battle_fade_back(song)
+        self.assertFalse(song.channel.battle_mode)
+
+        # Songs without battle music fade in like any other
+        other = self.controller.battle_fade_in('Song1')
+        self.assertIs(other, self.music.get('Song1'))
+        self.assertIs(self.controller.song_stack[-1], other)
+
+    def test_fade_in_waits_for_decode(self):
+        with patch.object(sound.SongObject, 'load_async'):
+            song = self.controller.fade_in('Song1', fade_in=400)
+            channel = song.channel.channel
+            # Decoding takes longer than the fade
+            engine.constants['current_time'] += 1000
+            self.controller.update([])
+            self.assertTrue(channel.waiting_for_load)
+            self.assertEqual(channel.state, 'fade_in')
+            self.assertEqual(channel.local_volume, 0)
+
+            song.load()
+            self.controller.update([])
+            self.assertFalse(channel.waiting_for_load)
+            self.assertTrue(channel.is_playing())
+            self.assertEqual(channel.local_volume, 0)
+            engine.constants['current_time'] += 200
+            self.controller.update([])
+            self.assertAlmostEqual(channel.local_volume, 0.5)
+            engine.constants['current_time'] += 200
+            self.controller.update([])
+            self.assertEqual(channel.state, 'playing')
+
+    def test_failed_decode_falls_back(self):
+        previous = self.controller.fade_in('Song1')
+        self.wait_until_playing(previous)
+        broken = self.controller.fade_in('Broken')
+        start = time.time()
+        while not broken.failed and time.time() - start < 5:
+            time.sleep(0.01)
+        self.assertTrue(broken.failed)
+        broken_channel = broken.channel
+
+        self.controller.update([])
+        # Taken back off, and the song before it fades back in
+        self.assertEqual(self.controller.song_stack, [previous])
+        self.assertIs(self.controller.current_channel, previous.channel)
+        self.assertIsNone(broken_channel.current_song)
+        self.assertIsNone(broken.channel)
+        self.assertEqual(self.controller.state, sound.GlobalMusicState.FADE_IN)
+        for _ in range(2):
+            engine.constants['current_time'] += 1000
+            self.controller.update([])
+        self.assertEqual(self.controller.state, sound.GlobalMusicState.PLAYING)
+        self.assertEqual(previous.channel.channel.state, 'playing')
+        self.assertIs(self.controller.get_current_song(), previous)
+
+        # Known not to load, so not even put on the stack
+        self.assertIsNone(self.controller.fade_in('Broken'))
+        self.assertEqual(self.controller.song_stack, [previous])
+
+    def test_flush_keeps_current_song(self):
+        for nid in ('Song1', 'Song2'):
+            song = self.controller.fade_in(nid)
+            self.wait_until_playing(song)
+        current = self.controller.get_current_song()
+        self.controller.flush(False)
+        self.assertEqual(list(self.music.keys()), [current.nid])
+        self.assertTrue(current.loaded)
+
+if __name__ == '__main__':
+    unittest.main()
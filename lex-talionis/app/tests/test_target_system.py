@@ -72,6 +72,25 @@ class TargetSystemUnitTests(unittest.TestCase):
         self.assertNotIn((4, 1), valid_positions)
         self.assertNotIn((-5, 0), valid_positions)
 
+    def test_get_shell_mask_matches_spheres(self):
+        import random
+        rng = random.Random(0)
+        bounds = (2, 1, 14, 11)
+        restriction = {(x, y) for x in range(-3, 4) for y in range(-3, 4) if x == 0 or y == 0}
+        for potential_range in ({1}, {1, 2}, {2, 3}, {1, 2, 3, 4}, {0}):
+            for _ in range(10):
+                # Include some moves outside the bounds that can still reach in
+                valid_moves = {(rng.randint(-2, 18), rng.randint(-2, 15)) for _ in range(rng.randint(1, 40))}
+                for manhattan_restriction in (None, restriction):
+                    expected = set()
+                    for x, y in valid_moves:
+                        if manhattan_restriction:
+                            expected |= self.target_system.restricted_manhattan_spheres(potential_range, x, y, manhattan_restriction)
+                        else:
+                            expected |= self.target_system.find_manhattan_spheres(potential_range, x, y)
+                    expected = {pos for pos in expected if bounds[0] <= pos[0] <= bounds[2] and bounds[1] <= pos[1] <= bounds[3]}
+                    self.assertEqual(self.target_system._get_shell_mask(valid_moves, potential_range, bounds, manhattan_restriction), expected)
+
     def test_get_possible_attack_positions(self):
         self.player_unit.position = (0, 0)
         self.enemy_unit.position = (0, 1)
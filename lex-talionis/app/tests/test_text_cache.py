@@ -0,0 +1,139 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pygame
+
+from app.engine import engine
+from app.engine.bmpfont import BmpFont
+from app.engine.text_cache import TextCache
+from app.tests.mocks.boot import init_dummy_display
+
+CHARS = 'abcd'
+
+def make_font(tmp_dir, name, alphas=(0, 255), stacked=False, widths=(5, 7, 3, 14)):
+    rng = random.Random(name)
+    sheet = pygame.Surface((8 * len(CHARS), 32), pygame.SRCALPHA)
+    for x in range(sheet.get_width()):
+        for y in range(sheet.get_height()):
+            sheet.set_at((x, y), (rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice(alphas)))
+    png_path = os.path.join(tmp_dir, name + '.png')
+    idx_path = os.path.join(tmp_dir, name + '.idx')
+    pygame.image.save(sheet, png_path)
+    with open(idx_path, 'w') as fp:
+        fp.write('width 8\nheight 16\n')
+        if stacked:
+            fp.write('stacked\nspace_offset -2\n')
+        for idx, (c, width) in enumerate(zip(CHARS, widths)):
+            fp.write('%s %d 0 %d\n' % (c, idx, width))
+    return BmpFont(png_path, idx_path)
+
+def make_background(seed=0):
+    rng = random.Random(seed)
+    surf = engine.create_surface((60, 24), transparent=True)
+    for x in range(surf.get_width()):
+        for y in range(surf.get_height()):
+            surf.set_at((x, y), (rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice((0, 90, 255))))
+    return surf
+
+class TextCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_dummy_display()
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.font = make_font(cls.tmp_dir.name, 'text')
+        cls.stacked_font = make_font(cls.tmp_dir.name, 'label', stacked=True)
+        cls.partial_font = make_font(cls.tmp_dir.name, 'number', alphas=(0, 34, 255))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        self.cache = TextCache()
+        self.patcher = patch('app.engine.bmpfont.TEXT_CACHE', self.cache)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def assertSameAsCharByChar(self, font, string, pos):
+        background = make_background()
+        expected, actual = background.copy(), background.copy()
+        font._blit_chars(font.modify_string(string), expected, pos, font.default_color)
+        font.blit(string, actual, pos)
+        self.assertEqual(pygame.image.tobytes(actual, 'RGBA'), pygame.image.tobytes(expected, 'RGBA'))
+
+    def test_same_pixels(self):
+        # 'd' is wider than the font, which leaves a gap before the next character
+        for font in (self.font, self.stacked_font, self.partial_font):
+            for string in ('abcd', 'dab', 'ddd', 'cz'):
+                for pos in ((2, 3), (-5, -4), (50, 20)):
+                    with self.subTest(font=font.png_path, string=string, pos=pos):
+                        self.assertSameAsCharByChar(font, string, pos)
+
+    def test_cached(self):
+        surf = make_background()
+        self.font.blit('abc', surf, (0, 0))
+        self.font.blit('abc', surf, (10, 4))
+        self.font.blit_right('abc', surf, (40, 4))
+        self.font.blit('abc', surf, (0, 0), 'missing')
+        self.font.blit('', surf, (0, 0))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        # Partly transparent characters would blend together on their own surface first
+        self.partial_font.blit('abc', surf, (0, 0))
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_bounded(self):
+        surf = make_background()
+        self.font.blit('a', surf)
+        self.cache.max_bytes = self.cache.bytes_resident
+        self.font.blit('b', surf)
+        self.assertEqual((len(self.cache.entries), self.cache.evictions), (1, 1))
+        self.font.blit('a', surf)
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_render_text(self):
+        from app.engine.graphics.text import text_renderer
+        from app.utilities.enums import HAlignment
+
+        fonts = {'text': self.font, 'label': self.stacked_font}
+        # Layouts measured with these fonts should not outlive them
+        self.addCleanup(text_renderer._layout.cache_clear)
+        with patch.dict(text_renderer.FONT, fonts):
+            line = 'ab<label>cd</>ab'
+            width = self.font.width('ab') * 2 + self.stacked_font.width('cd')
+            self.assertEqual(text_renderer.text_width('text', line), width)
+            expected, left, right = make_background(), make_background(), make_background()
+            self.font.blit('ab', expected, (4, 2))
+            self.stacked_font.blit('cd', expected, (4 + self.font.width('ab'), 2))
+            self.font.blit('ab', expected, (4 + self.font.width('ab') + self.stacked_font.width('cd'), 2))
+            text_renderer.render_text(left, ['text'], [line], [None], (4, 2))
+            text_renderer.render_text(right, ['text'], [line], [None], (4 + width, 2), HAlignment.RIGHT)
+            for surf in (left, right):
+                self.assertEqual(pygame.image.tobytes(surf, 'RGBA'), pygame.image.tobytes(expected, 'RGBA'))
+
+    def test_reload_fonts(self):
+        from app.engine import fonts
+        from app.engine.graphics.text import text_renderer
+        from app.engine.text_cache import TEXT_CACHE
+
+        def load_fonts():
+            fonts.FONT['text'] = self.stacked_font
+
+        self.addCleanup(text_renderer._layout.cache_clear)
+        with patch.dict(fonts.FONT, {'text': self.font}):
+            self.assertEqual(text_renderer.text_width('text', 'abcd'), self.font.width('abcd'))
+            TEXT_CACHE.get(self.font, 'abcd', None)
+            with patch('app.engine.fonts.load_fonts', load_fonts):
+                fonts.reload_fonts()
+            # Measured again with the new font
+            self.assertEqual(text_renderer.text_width('text', 'abcd'), self.stacked_font.width('abcd'))
+            # And nothing rendered with the old fonts is kept around
+            self.assertEqual(len(TEXT_CACHE.entries), 0)
+            self.assertEqual(TEXT_CACHE.bytes_resident, 0)
+
+if __name__ == '__main__':
+    unittest.main()
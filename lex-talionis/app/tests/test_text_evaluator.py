@@ -29,4 +29,23 @@ class TextEvaluatorTests(unittest.TestCase):
     def testNestedEval(self):
         text = "{e:1}+{e:1+{e:1}}"
         evaled = self.text_evaluator._evaluate_all(text)
-        self.assertEqual(evaled, "1+2")
\ No newline at end of file
+        self.assertEqual(evaled, "1+2")
+
+    def testEvalNamespace(self):
+        from app.engine import evaluate
+        unit = MagicMock()
+        unit.nid = 'Eirika'
+        unit2 = MagicMock()
+        unit2.nid = 'Seth'
+        # Per-call bindings are visible, even from nested scopes
+        self.assertTrue(evaluate.evaluate("any(u is unit for u in [unit2, unit])", unit, unit2, game=self.mock_game))
+        self.assertTrue(evaluate.evaluate("check_pair('Seth', 'Eirika')", unit, unit2, game=self.mock_game))
+        self.assertEqual(evaluate.evaluate(" x + 1 ", local_args={'x': 2}, game=self.mock_game), 3)
+        # Bindings from one call do not leak into the next one
+        with self.assertRaises(NameError):
+            evaluate.evaluate("x", game=self.mock_game)
+        self.assertNotIn('x', evaluate.get_base_namespace(self.mock_game))
+        # The same expression is only compiled once
+        hits = evaluate.compile_expression.cache_info().hits
+        evaluate.evaluate("x + 1", local_args={'x': 5}, game=self.mock_game)
+        self.assertEqual(evaluate.compile_expression.cache_info().hits, hits + 1)
@@ -190,5 +190,25 @@ class UnitObjectUnitTests(unittest.TestCase):
         skill_calls = [call(110), call(120)]
         self.game.get_skill.assert_has_calls(skill_calls)
 
+    def test_equation_cache(self):
+        from app.engine import equations
+        unit = self.db_unit
+        hit = equations.parser.hit(unit)
+        self.assertEqual(hit, unit.stats['SKL'] * 2 + unit.stats['LCK'] // 2)
+
+        # Same generation, so the cached result is returned even though the stat changed
+        unit.stats['SKL'] += 5
+        self.assertEqual(equations.parser.hit(unit), hit)
+
+        # Bumping the generation recalculates
+        equations.bump_generation()
+        self.assertEqual(equations.parser.hit(unit), hit + 10)
+
+        # Gaining a skill always bumps the generation
+        unit.stats['SKL'] -= 5
+        skill = MagicMock(nid='Cached', stack=None)
+        unit.add_skill(skill)
+        self.assertEqual(equations.parser.hit(unit), hit)
+
 if __name__ == '__main__':
     unittest.main()
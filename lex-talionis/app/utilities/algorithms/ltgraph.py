@@ -1,6 +1,7 @@
 from __future__ import annotations
-import math
-from typing import Dict, Generic, Iterable, List, Set, Tuple, TypeVar
+import heapq
+import itertools
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
 
 V = TypeVar("V")
 D = TypeVar("D")
@@ -36,12 +37,20 @@ class LTGraph(Generic[V, D, E]):
     external dependencies is extremely cringe.
 
     Does not support negative edge weights.
+
+    Shortest paths are found a whole source at a time, and the tree of
+    predecessors from each source is kept until an edge is added to that
+    source's connected component. Connectivity is tracked with union-find,
+    so has_path never needs to search.
     """
 
     def __init__(self, vertices: Iterable[V]=None, edges: Iterable[Tuple[V, V]] = None):
         self.vertices: Dict[V, LTVertex] = {}
         self.adj: Dict[V, Set[V]] = {}
-        self._path_dict: Dict[V, Dict[V, List[Tuple[V, V]]]] = {}
+        # Key: Source vertex, Value: Predecessor of every vertex reachable from the source
+        self._trees: Dict[V, Dict[V, Optional[V]]] = {}
+        # Union-find forest of the connected components
+        self._component_parent: Dict[V, V] = {}
         if vertices:
             for vertex in vertices:
                 self.add_vertex(vertex)
@@ -51,9 +60,15 @@ class LTGraph(Generic[V, D, E]):
                 self.add_edge(v1, v2)
 
     def add_vertex(self, vertex_val: V, vertex_data: D = None):
+        # Replacing a vertex drops its edges, which can split its component
+        replacing = vertex_val in self.vertices
         self[vertex_val] = LTVertex(vertex_val, vertex_data)
         self.adj[vertex_val] = set()
-        self.clear_cache()
+        if replacing:
+            self.clear_cache()
+        else:
+            # A new vertex by itself changes no other paths
+            self._component_parent[vertex_val] = vertex_val
 
     def add_edge(self, v1: V, v2: V, data: E = None, weight: float = 1):
         """Add edge to graph between two vertices (they do not necessarily have to be predefined)
@@ -69,27 +84,71 @@ class LTGraph(Generic[V, D, E]):
             return
 
         if v1 not in self.vertices:
-            self[v1] = LTVertex(v1)
-            self.adj[v1] = set()
+            self.add_vertex(v1)
         if v2 not in self.vertices:
-            self[v2] = LTVertex(v2)
-            self.adj[v2] = set()
+            self.add_vertex(v2)
 
         self[v1][v2] = LTEdge((v1, v2), data, weight)
         self[v2][v1] = LTEdge((v2, v1), data, weight)
 
         self.adj[v1].add(v2)
         self.adj[v2].add(v1)
-        self.clear_cache()
+        self._invalidate_components(v1, v2)
+        self._union(v1, v2)
+
+    def _find(self, vertex: V) -> V:
+        parent = self._component_parent
+        root = vertex
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression
+        while parent[vertex] != root:
+            parent[vertex], vertex = root, parent[vertex]
+        return root
+
+    def _union(self, v1: V, v2: V):
+        root1, root2 = self._find(v1), self._find(v2)
+        if root1 != root2:
+            self._component_parent[root2] = root1
+
+    def _invalidate_components(self, *vertices: V):
+        """Forgets the paths from every source in the same component as any of the vertices.
+        Paths from sources in other components cannot have changed"""
+        roots = {self._find(vertex) for vertex in vertices}
+        for source in [source for source in self._trees if self._find(source) in roots]:
+            del self._trees[source]
 
     def has_path(self, v1: V, v2: V) -> bool:
         """Determines whether or not a path exists between the two nodes.
-        NOTE: I don't give a rat's ass about performance, but
-        if you, reader, do, turn this into bfs or use a cache or something.
         """
-        if self.shortest_path(v1, v2):
-            return True
-        return False
+        if v1 not in self.vertices or v2 not in self.vertices or v1 == v2:
+            return False
+        return self._find(v1) == self._find(v2)
+
+    def _get_tree(self, source: V) -> Dict[V, Optional[V]]:
+        """Runs Djikstra from the source, returning the predecessor
+        of every vertex reachable from the source"""
+        if source not in self._trees:
+            prev_step: Dict[V, Optional[V]] = {}
+            best: Dict[V, float] = {source: 0}
+            # Counter breaks ties, since vertices need not be comparable
+            counter = itertools.count()
+            open_heap = [(0, next(counter), source, None)]
+            while open_heap:
+                dist, _, vert, prev = heapq.heappop(open_heap)
+                # Stale entry -- already found a better way here
+                if vert in prev_step:
+                    continue
+                prev_step[vert] = prev
+                for neighbor in self.adj[vert]:
+                    if neighbor in prev_step:
+                        continue
+                    neighbor_dist = dist + self[vert][neighbor].weight
+                    if neighbor not in best or neighbor_dist < best[neighbor]:
+                        best[neighbor] = neighbor_dist
+                        heapq.heappush(open_heap, (neighbor_dist, next(counter), neighbor, vert))
+            self._trees[source] = prev_step
+        return self._trees[source]
 
     def shortest_path(self, v1: V, v2: V) -> List[V]:
         """Fetches the shortest path between two vertices.
@@ -107,58 +166,31 @@ class LTGraph(Generic[V, D, E]):
         if v1 == v2:
             return []
 
-        # if shortest path cached
-        if v1 in self._path_dict and v2 in self._path_dict[v1]:
-            return self._path_dict[v1][v2]
-
-        # else, initialize shortest paths dict if not initialized
-        if v1 not in self._path_dict:
-            self._path_dict[v1] = {}
-        if v2 not in self._path_dict:
-            self._path_dict[v2] = {}
-
-        # and run djikstra from v1 to v2
-        visited: Dict[V, float] = {}
-        prev_step: Dict[V, V] = {}
-        dist_from_v1 = {vert_id: math.inf for vert_id in self.vertices.keys()}
-        dist_from_v1[v1] = 0
-        while len(dist_from_v1.keys()) != 0:
-            min_dist = min(dist_from_v1.values())
-            min_vert = [vert for vert in dist_from_v1 if dist_from_v1[vert] == min_dist][0]
-            visited[min_vert] = min_dist
-            next_verts = self.adj[min_vert]
-            for neighbor in next_verts:
-                if neighbor not in visited.keys():
-                    neighbor_dist = min_dist + self[min_vert][neighbor].weight
-                    if neighbor_dist < dist_from_v1[neighbor]:
-                        prev_step[neighbor] = min_vert
-                        dist_from_v1[neighbor] = neighbor_dist
-            dist_from_v1.pop(min_vert)
+        # Paths from either end work, so reuse whichever tree we already have
+        if v1 not in self._trees and v2 in self._trees:
+            path = self.shortest_path(v2, v1)
+            return list(reversed(path)) if path is not None else None
 
+        prev_step = self._get_tree(v1)
         # does a path exist
-        if v2 not in visited.keys():
-            self._path_dict[v1][v2] = None
-            self._path_dict[v2][v1] = None
+        if v2 not in prev_step:
             return None
         # reconstruct it
         path = []
-        reverse_path = []
         curr_vert = v2
-        while curr_vert != v1:
-            best_neighbor = prev_step[curr_vert]
-            reverse_path.append(curr_vert)
-            path.insert(0, curr_vert)
-            curr_vert = best_neighbor
-        reverse_path.append(curr_vert)
-        path.insert(0, curr_vert)
-
-        self._path_dict[v1][v2] = path
-        self._path_dict[v2][v1] = reverse_path
+        while curr_vert is not None:
+            path.append(curr_vert)
+            curr_vert = prev_step[curr_vert]
+        path.reverse()
         return path
 
     def clear_cache(self):
-        # usually we want to regenerate all paths after adding nodes
-        self._path_dict.clear()
+        """Forgets every path and rebuilds the connected components from scratch"""
+        self._trees.clear()
+        self._component_parent = {vertex: vertex for vertex in self.vertices}
+        for v1, neighbors in self.adj.items():
+            for v2 in neighbors:
+                self._union(v1, v2)
 
     def __contains__(self, value: V) -> bool:
         if value in self.vertices:
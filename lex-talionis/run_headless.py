@@ -0,0 +1,32 @@
+"""
+Plays a level without a window, feeding it an input script, and prints
+how long each state took. See app/engine/headless.py for the script format.
+
+    python run_headless.py testing_proj.ltproj --level DEBUG --script chapter.txt
+"""
+import argparse
+import sys
+
+from app.engine import headless
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a level without a window, as fast as possible")
+    parser.add_argument('project', help="Path to the .ltproj to load")
+    parser.add_argument('--level', default=None, help="Level nid to start. Defaults to DEBUG, or the first level")
+    parser.add_argument('--script', default=None, help="Input script to play. Defaults to waiting --frames frames")
+    parser.add_argument('--frames', type=int, default=None, help="Stop after this many frames")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        script = headless.InputScript.load(args.script)
+    else:
+        script = headless.InputScript.parse('wait %d' % (args.frames or 600))
+    game = headless.start(args.project, args.level)
+    timings = headless.run(game, script, args.frames)
+    print(timings.report())
+    return 0
+
+if __name__ == '__main__':
+    from app import lt_log
+    lt_log.create_logger()
+    sys.exit(main())
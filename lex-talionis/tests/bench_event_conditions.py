@@ -0,0 +1,67 @@
+"""
+Measures the cost of evaluating every event trigger condition in a project,
+comparing the cached namespace and compiled expressions in evaluate.evaluate
+against copying the whole namespace and re-parsing the string on every call.
+
+Usage:
+    python -m tests.bench_event_conditions [path/to/project.ltproj]
+"""
+import sys
+import timeit
+from unittest.mock import MagicMock
+
+from app.data.database.database import DB
+
+NUM_ROUNDS = 200
+
+def legacy_evaluate(string, unit1=None, unit2=None, position=None, local_args=None, game=None):
+    """What evaluate.evaluate used to do"""
+    from app.engine import evaluate
+    context = evaluate.__dict__.copy()
+    context.update({
+        'unit1': unit1,
+        'unit': unit1,
+        'unit2': unit2,
+        'target': unit2,
+        'position': position,
+        'check_pair': lambda s1, s2: False,
+        'check_default': lambda s1, t1=(): False,
+        'game': game,
+        'target_system': game.target_system,
+    })
+    context.update(game.query_engine.func_dict)
+    if local_args:
+        context.update(local_args)
+    return eval(string.strip(), context)
+
+def run_all(evaluate_func, conditions, game, unit, unit2, local_args):
+    for condition in conditions:
+        try:
+            evaluate_func(condition, unit, unit2, (0, 0), local_args, game)
+        except Exception:
+            # Some conditions depend on state the mock game does not have
+            pass
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    DB.load(project)
+    from app.engine import evaluate
+    from app.engine.query_engine import GameQueryEngine
+    from app.tests.mocks.mock_game import get_mock_game
+
+    game = get_mock_game()
+    game.query_engine = GameQueryEngine(MagicMock(), game)
+    unit, unit2, region = MagicMock(nid='unit'), MagicMock(nid='unit2'), MagicMock(nid='region')
+    local_args = {'region': region, 'item': None}
+    conditions = [event.condition for event in DB.events.values() if event.condition]
+
+    legacy_time = timeit.timeit(lambda: run_all(legacy_evaluate, conditions, game, unit, unit2, local_args), number=NUM_ROUNDS)
+    cached_time = timeit.timeit(lambda: run_all(evaluate.evaluate, conditions, game, unit, unit2, local_args), number=NUM_ROUNDS)
+    num_evals = len(conditions) * NUM_ROUNDS
+    print("Evaluated %d event conditions from %s, %d rounds" % (len(conditions), project, NUM_ROUNDS))
+    print("legacy: %6.2f us/eval   cached: %6.2f us/eval   %4.1fx" %
+          (legacy_time / num_evals * 1e6, cached_time / num_evals * 1e6, legacy_time / cached_time))
+    print(evaluate.compile_expression.cache_info())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Grays and inverts the project's map sprites, combat animation sheets and
+icon sheets, first pixel by pixel like image_mods used to, and then with
+image_mods as it is now, and checks that both give the same pixels. Also
+times the tint helpers, which are already a single fill each.
+
+Usage:
+    python -m tests.bench_image_mods [path/to/project.ltproj]
+"""
+import sys
+import time
+
+from app.tests.mocks.boot import load_project
+
+def same_pixels(a, b) -> bool:
+    import pygame
+    return pygame.image.tobytes(a, 'RGBA') == pygame.image.tobytes(b, 'RGBA')
+
+def load_images():
+    from app.data.resources.resources import RESOURCES
+    from app.engine import engine
+    images = {'map sprites': [], 'combat anims': [], 'icons': []}
+    for map_sprite in RESOURCES.map_sprites:
+        for path in (map_sprite.stand_full_path, map_sprite.move_full_path):
+            images['map sprites'].append(engine.image_load(path, convert_alpha=True))
+    for combat_anim in RESOURCES.combat_anims:
+        for weapon_anim in combat_anim.weapon_anims:
+            if weapon_anim.frames and weapon_anim.full_path:
+                images['combat anims'].append(engine.image_load(weapon_anim.full_path, convert=True))
+    for icons in (RESOURCES.icons16, RESOURCES.icons32, RESOURCES.icons80):
+        for icon in icons:
+            images['icons'].append(engine.image_load(icon.full_path, convert=True))
+    return images
+
+def compare(images, legacy, new):
+    legacy_time = new_time = 0
+    for image in images:
+        old_image, new_image = image.copy(), image.copy()
+        start = time.perf_counter()
+        legacy(old_image)
+        legacy_time += time.perf_counter() - start
+        start = time.perf_counter()
+        new(new_image)
+        new_time += time.perf_counter() - start
+        assert same_pixels(old_image, new_image)
+    return legacy_time, new_time
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    load_project(project)
+    from app.engine import image_mods
+    images = load_images()
+
+    gray = {'map sprites': ((None, image_mods.make_gray),),
+            'combat anims': (((128, 160, 128), image_mods.make_anim_gray),),
+            'icons': (((128, 160, 128), image_mods.make_gray_colorkey),)}
+    for name, group in images.items():
+        for ignore, new in gray[name]:
+            legacy_time, new_time = compare(group, lambda image: image_mods._gray_per_pixel(image, ignore), new)
+            print("%-12s %-20s %4d images   per pixel: %8.1f ms   now: %7.1f ms" %
+                  (name, new.__name__, len(group), legacy_time * 1000, new_time * 1000))
+        legacy_time, new_time = compare(group, image_mods._invert_surface_per_pixel, image_mods.invert_surface)
+        print("%-12s %-20s %4d images   per pixel: %8.1f ms   now: %7.1f ms" %
+              (name, 'invert_surface', len(group), legacy_time * 1000, new_time * 1000))
+
+    sprites = images['map sprites']
+    for name, func in (('add_tint', lambda image: image_mods.add_tint(image, (40, 20, 0))),
+                       ('sub_tint', lambda image: image_mods.sub_tint(image, (40, 20, 0))),
+                       ('change_color', lambda image: image_mods.change_color(image, (40, -20, 10))),
+                       ('make_translucent', lambda image: image_mods.make_translucent(image, .5))):
+        start = time.perf_counter()
+        for image in sprites:
+            func(image)
+        print("%-12s %-20s %4d images   %7.1f ms" % ('map sprites', name, len(sprites), (time.perf_counter() - start) * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Draws the map for a few seconds of common situations, first drawing every
+layer every frame like MapView used to, and then reusing the layers that
+did not change. Checks that both give the same pixels, and reports how
+many layers had to be drawn again per frame.
+
+Usage:
+    python -m tests.bench_map_view [path/to/project.ltproj] [level_nid]
+"""
+import sys
+import time
+
+from app.engine import headless
+
+FRAMES = 120
+
+def scenarios(game):
+    """Name -> function called at the start of each frame with the frame number"""
+    player = next(unit for unit in game.units if unit.position and unit.team == 'player')
+    corner = game.tilemap.width - 1, game.tilemap.height - 1
+
+    def idle(frame):
+        pass
+
+    def highlights(frame):
+        if frame == 0:
+            game.highlight.display_highlights(player)
+        elif frame == FRAMES - 1:
+            game.highlight.remove_highlights()
+
+    def enemy_ranges(frame):
+        if frame == 0:
+            game.boundary.show()
+            game.boundary.show_all_enemy_attacks()
+        elif frame == FRAMES - 1:
+            game.boundary.clear_all_enemy_attacks()
+            game.boundary.hide()
+
+    def scrolling(frame):
+        # Back and forth across the map
+        if frame % 40 == 0:
+            position = corner if frame % 80 == 0 else player.position
+            game.cursor.set_pos(position)
+            game.camera.set_center(*position)
+
+    return {'idle': idle, 'highlights': highlights, 'enemy ranges': enemy_ranges, 'scrolling': scrolling}
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    level_nid = sys.argv[2] if len(sys.argv) > 2 else '0'
+    game = headless.start(project, level_nid)
+    import pygame
+    from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT
+    from app.engine import engine
+
+    view = game.map_view
+
+    def invalidate():
+        view._terrain_key = view._overlay_key = view._unit_key = view._foreground_key = None
+
+    def next_frame(setup, frame):
+        engine.update_time()
+        setup(frame)
+        game.camera.update()
+        game.highlight.update()
+
+    def draw():
+        camera_cull = int(game.camera.get_x() * TILEWIDTH), int(game.camera.get_y() * TILEHEIGHT), WINWIDTH, WINHEIGHT
+        return view.draw(camera_cull)
+
+    for name, setup in scenarios(game).items():
+        # Same pixels, drawing each frame both ways
+        for frame in range(FRAMES):
+            next_frame(setup, frame)
+            # Highlights shrink as they are drawn, so both ways have to start from the same size
+            transitions = dict(game.highlight.transitions)
+            cached = pygame.image.tobytes(draw(), 'RGBA')
+            game.highlight.transitions.update(transitions)
+            invalidate()
+            legacy = pygame.image.tobytes(draw(), 'RGBA')
+            assert cached == legacy, "%s differs on frame %d" % (name, frame)
+
+        times = {}
+        recomposed = 0
+        for every_layer in (True, False):
+            start = time.perf_counter()
+            for frame in range(FRAMES):
+                next_frame(setup, frame)
+                if every_layer:
+                    invalidate()
+                draw()
+                recomposed += 0 if every_layer else view.recomposed_layers
+            times[every_layer] = time.perf_counter() - start
+        print("%-13s %d frames   every layer: %6.1f ms   changed layers: %6.1f ms   %.2f layers drawn per frame" %
+              (name, FRAMES, times[True] * 1000, times[False] * 1000, recomposed / FRAMES))
+
+if __name__ == '__main__':
+    main()
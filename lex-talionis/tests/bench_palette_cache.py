@@ -0,0 +1,83 @@
+"""
+Recolors every combat animation with each of its palettes, and every map
+sprite with each team's palette, first by replacing pixels one color at a
+time like apply_palette used to, and then through the palette cache.
+Checks that both give the same pixels.
+
+Usage:
+    python -m tests.bench_palette_cache [path/to/project.ltproj]
+"""
+import sys
+import time
+
+from app.tests.mocks.boot import load_project
+
+def same_pixels(a, b) -> bool:
+    from app.engine import engine
+    return engine.surf_to_raw(a, 'RGB') == engine.surf_to_raw(b, 'RGB')
+
+def combat_anims(cache):
+    from app.data.resources.resources import RESOURCES
+    from app.engine import engine, image_mods
+    legacy_time = new_time = 0
+    num = 0
+    for combat_anim in RESOURCES.combat_anims:
+        palettes = [RESOURCES.combat_palettes.get(nid) for name, nid in combat_anim.palettes]
+        for weapon_anim in combat_anim.weapon_anims:
+            if not weapon_anim.frames or not weapon_anim.full_path:
+                continue
+            sheet = engine.image_load(weapon_anim.full_path, convert=True)
+            engine.set_colorkey(sheet, (128, 160, 128), rleaccel=True)
+            for palette in palettes:
+                if not palette:
+                    continue
+                conversion_dict = {(0, coord[0], coord[1]): tuple(color) for coord, color in palette.colors.items()}
+                start = time.perf_counter()
+                legacy = {frame.nid: image_mods.color_convert(engine.copy_surface(engine.subsurface(sheet, frame.rect)), conversion_dict)
+                          for frame in weapon_anim.frames}
+                legacy_time += time.perf_counter() - start
+                start = time.perf_counter()
+                recolored = cache.get(('combat_anim', weapon_anim.full_path), sheet, palette.nid, conversion_dict)
+                frames = {frame.nid: engine.subsurface(recolored, frame.rect) for frame in weapon_anim.frames}
+                new_time += time.perf_counter() - start
+                assert all(same_pixels(legacy[nid], frames[nid]) for nid in legacy), (weapon_anim.full_path, palette.nid)
+                num += 1
+    return num, legacy_time, new_time
+
+def map_sprites(cache):
+    from app.data.resources.resources import RESOURCES
+    from app.data.resources.default_palettes import default_palettes
+    from app.engine import engine, image_mods
+    palettes = [palette for palette in RESOURCES.combat_palettes if palette.nid.startswith('map_sprite')]
+    legacy_time = new_time = 0
+    num = 0
+    for map_sprite in RESOURCES.map_sprites:
+        for path in (map_sprite.stand_full_path, map_sprite.move_full_path):
+            sheet = engine.image_load(path)
+            for palette in palettes:
+                conversion_dict = {a: b for a, b in zip(default_palettes['map_sprite_blue'], palette.get_colors())}
+                start = time.perf_counter()
+                legacy = image_mods.color_convert(sheet, conversion_dict)
+                legacy_time += time.perf_counter() - start
+                start = time.perf_counter()
+                recolored = cache.get(('map_sprite', path), sheet, palette.nid, conversion_dict)
+                new_time += time.perf_counter() - start
+                assert same_pixels(legacy, recolored), (path, palette.nid)
+                num += 1
+    return num, legacy_time, new_time
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    load_project(project)
+    from app.engine.image_cache import ImageCache
+    from app.engine.palette_cache import PaletteCache
+
+    for name, recolor in (('combat anims', combat_anims), ('map sprites', map_sprites)):
+        cache = PaletteCache(ImageCache())
+        num, legacy_time, cold_time = recolor(cache)
+        _, _, warm_time = recolor(cache)
+        print("%-12s %4d recolors   replace: %7.1f ms   palette cache: %7.1f ms   again: %5.1f ms" %
+              (name, num, legacy_time * 1000, cold_time * 1000, warm_time * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Plans an enemy phase with 50 enemies, first in this process and then
+with the AI worker pool, and checks that both come to the same decisions.
+Then has each enemy think live, the way it does when the phase is not
+skipped, both ways, and checks the same.
+
+Every unit with any candidates at all is sent to the workers, instead of
+only those with enough candidates to be worth it, so that as much as
+possible is checked.
+
+Usage:
+    python -m tests.bench_parallel_ai [path/to/project.ltproj] [level_nid] [num_workers]
+"""
+import pickle
+import sys
+import time
+
+from app.engine import headless
+from tests.bench_secondary_ai import populate
+
+def plan(game):
+    from app.engine.ai_controller import PhasePlanner
+    enemies = [unit for unit in game.units if unit.position and unit.team == 'enemy']
+    planner = PhasePlanner()
+    start = time.perf_counter()
+    planner.plan(enemies)
+    elapsed = time.perf_counter() - start
+    decisions = {nid: (d.target, d.position, d.item.uid if d.item else None) for nid, d in planner.plans.items()}
+    return decisions, elapsed
+
+def think(game, use_pool: bool):
+    """What each enemy's first behaviour decides, thinking live against the board as it is"""
+    from app.data.database.database import DB
+    from app.engine import ai_pool
+    from app.engine.ai_controller import BoardSnapshot, ParallelPrimaryAI, PrimaryAI, get_true_valid_moves
+    decisions = {}
+    start = time.perf_counter()
+    for unit in game.units:
+        if not unit.position or unit.team != 'enemy':
+            continue
+        behaviour = DB.ai.get(unit.get_ai()).behaviours[0]
+        if behaviour.action not in ('Attack', 'Support', 'Steal'):
+            continue
+        valid_moves = get_true_valid_moves(unit, behaviour)
+        if use_pool:
+            primary = ParallelPrimaryAI(unit, valid_moves, behaviour, 1, ai_pool.get_pool())
+        else:
+            primary = PrimaryAI(unit, valid_moves, behaviour, BoardSnapshot())
+        done = False
+        while not done:
+            done, target, position, item = primary.run()
+        decisions[unit.nid] = (target, position, item.uid if item else None)
+    return decisions, time.perf_counter() - start
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    level_nid = sys.argv[2] if len(sys.argv) > 2 else '0'
+    num_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    game = headless.start(project, level_nid)
+    populate(game)
+    from app.engine import ai_pool
+    from app.engine import config as cf
+
+    cf.SETTINGS['ai_workers'] = 0
+    serial, serial_time = plan(game)
+    serial_live, serial_live_time = think(game, False)
+
+    cf.SETTINGS['ai_workers'] = num_workers
+    ai_pool.MIN_PARALLEL_CANDIDATES = 1
+    pool = ai_pool.get_pool()
+    start = time.perf_counter()
+    # Boot the workers ahead of time
+    for future in [pool.get_executor().submit(int) for _ in range(num_workers)]:
+        future.result()
+    startup_time = time.perf_counter() - start
+    parallel, parallel_time = plan(game)
+    parallel_live, parallel_live_time = think(game, True)
+    snapshot_size = len(pool.state)
+    pool.shutdown()
+    cf.SETTINGS['ai_workers'] = 0
+
+    save_size = len(pickle.dumps(game.save()[0]))
+    num_attacking = sum(1 for target, _, _ in serial.values() if target)
+    print("%d enemies planned on level %s (%d chose to attack)" % (len(serial), level_nid, num_attacking))
+    print("phase snapshot: %6.1f KB   (a full save is %.1f KB)" % (snapshot_size / 1024, save_size / 1024))
+    print("planned serial:     %6.2f s" % serial_time)
+    print("planned parallel:   %6.2f s with %d workers (plus %.2f s worker startup)" % (parallel_time, num_workers, startup_time))
+    print("live serial:        %6.2f s" % serial_live_time)
+    print("live parallel:      %6.2f s" % parallel_live_time)
+    print("identical planned decisions: %s" % (serial == parallel))
+    print("identical live decisions:    %s" % (serial_live == parallel_live))
+    assert serial == parallel
+    assert serial_live == parallel_live
+
+if __name__ == '__main__':
+    main()
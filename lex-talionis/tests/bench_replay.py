@@ -0,0 +1,341 @@
+"""
+Plays the levels of each project headless with the AI moving both sides,
+twice from the same random seed, and checks that both playthroughs end in
+the same state. Records how long each phase took, and how long was spent,
+over how many calls, thinking for the AI, finding paths, targeting,
+updating the boundary and resolving combat, and writes it all to a JSON
+report. Given the report from an earlier release, lists anything that got
+slower, and exits with an error if anything did or a level did not play
+out the same way twice.
+
+A level can be played from recorded input instead, with an input script
+named <level_nid>.txt in the --scripts directory (see app/engine/headless.py).
+
+Each project runs in its own process, since only one can be loaded at once.
+
+Usage:
+    python -m tests.bench_replay [--project path/to/project.ltproj ...] [--levels 0 1 ...]
+        [--turns 3] [--scripts dir] [--report replay.json] [--baseline old_replay.json]
+"""
+import argparse
+import functools
+import hashlib
+import importlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+DEFAULT_PROJECTS = ('default.ltproj', 'testing_proj.ltproj', '../UnderTheShadowOfGrima.ltproj')
+SEED = 0
+MAX_FRAMES = 60 * 60 * 10  # Ten minutes of game time
+STUCK_FRAMES = 300  # Press SELECT if nothing has happened for this long
+# Menus a level can start in -> The option that goes on to the map
+START_OPTIONS = {'prep_main': 'Fight', 'base_main': 'Continue'}
+# A time counts as a regression if it is this much slower than the baseline, and by at least MIN_REGRESSION ms
+TOLERANCE = 0.25
+MIN_REGRESSION = 20
+
+# Name -> [(Module, Class, Method names, or None for every public method)]
+PROBES = {
+    'ai_think': [('app.engine.ai_controller', 'AIController', ('think',)),
+                 ('app.engine.ai_controller', 'PhasePlanner', ('plan',))],
+    'pathfinding': [('app.engine.pathfinding.path_system', 'PathSystem', None)],
+    'targeting': [('app.engine.target_system', 'TargetSystem', None)],
+    'boundary': [('app.engine.boundary', 'BoundaryInterface', None)],
+    'combat': [('app.engine.combat.solver', 'CombatPhaseSolver', ('do',)),
+               ('app.engine.combat.simple_combat', 'SimpleCombat', ('start_combat', 'end_combat'))],
+}
+
+class Probe():
+    """
+    Counts the calls to a group of methods, and how long they took,
+    not counting the time again for calls made from inside another one
+    """
+    def __init__(self, targets):
+        self.targets = targets
+        self.calls: int = 0
+        self.seconds: float = 0
+        self._depth: int = 0
+        self._originals = []
+
+    def install(self):
+        for module_name, class_name, method_names in self.targets:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            if method_names is None:
+                method_names = [name for name, value in vars(cls).items()
+                                if isinstance(value, types.FunctionType) and not name.startswith('_')]
+            for name in method_names:
+                original = vars(cls)[name]
+                self._originals.append((cls, name, original))
+                setattr(cls, name, self._wrap(original))
+
+    def uninstall(self):
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals.clear()
+
+    def reset(self):
+        self.calls = 0
+        self.seconds = 0
+
+    def _wrap(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.calls += 1
+            if self._depth:
+                return func(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self._depth -= 1
+        return wrapper
+
+class AutoPlay():
+    """
+    Plays a level for the player by giving the player's units an AI, and
+    ending the turn whenever the player gets control, so the AI moves them
+    before the enemy phase. Skips through events with START, and straight
+    out of preparations and the base
+    """
+    def __init__(self, game, level_nid: str, turns: int):
+        self.game = game
+        self.level_nid = level_nid
+        self.turns = turns
+        self.nudges: int = 0
+        self.level_ended: bool = False
+
+    def give_player_ai(self):
+        from app.data.database.database import DB
+        from app.engine import action
+        ai_nid = next((nid for nid in ('Pursue', 'Attack') if nid in DB.ai.keys()), None)
+        if not ai_nid:
+            return
+        for unit in self.game.get_player_units():
+            if unit.get_ai() != ai_nid:
+                action.do(action.ChangeAI(unit, ai_nid))
+
+    def end_turn(self):
+        # Same as choosing End from the options menu
+        self.give_player_ai()
+        self.game.state.change('turn_change')
+        self.game.state.change('status_endstep')
+        self.game.state.change('ai')
+        self.game.ui_view.remove_unit_display()
+
+    def frames(self, current_state):
+        from app.engine.headless import InputScript
+        stuck = 0
+        last_stack = None
+        while True:
+            state = current_state()
+            if self.game.level_nid != self.level_nid or state in ('title_start', 'game_over'):
+                self.level_ended = True
+                return
+            if state == 'free':
+                if self.game.turncount > self.turns:
+                    return
+                self.end_turn()
+                yield []
+            elif state == 'event':
+                yield from InputScript.parse('START').frames(current_state)
+            elif state in START_OPTIONS and self.game.state.current_state().menu:
+                if self.game.state.current_state().menu.get_current() == START_OPTIONS[state]:
+                    yield from InputScript.parse('SELECT').frames(current_state)
+                else:
+                    yield from InputScript.parse('UP').frames(current_state)
+            else:
+                stack = [s.name for s in self.game.state.state]
+                stuck = stuck + 1 if stack == last_stack else 0
+                last_stack = stack
+                if stuck >= STUCK_FRAMES:
+                    stuck = 0
+                    self.nudges += 1
+                    yield from InputScript.parse('SELECT').frames(current_state)
+                else:
+                    yield []
+
+def state_hash(game) -> str:
+    """Everything about how the level played out, but nothing about how long it took"""
+    from app.utilities import static_random
+    units = [(unit.nid, unit.team, unit.position, unit.get_hp(), unit.exp, unit.level, unit.dead,
+              sorted(unit.stats.items()), [(item.nid, sorted((k, str(v)) for k, v in item.data.items())) for item in unit.items])
+             for unit in sorted(game.units, key=lambda unit: unit.nid)]
+    state = (game.level_nid, game.turncount, game.phase.get_current(), len(game.action_log.actions), units,
+             static_random.r.combat_random.state, static_random.r.growth_random.state, static_random.r.other_random.state)
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+def play_level(level_nid: str, turns: int, script_path: str, probes: dict) -> dict:
+    from app.engine import headless
+
+    class ReplayTimings(headless.StateTimings):
+        def __init__(self):
+            super().__init__()
+            self.phases = {}
+
+        def add(self, state, seconds):
+            super().add(state, seconds)
+            phase = game.phase.get_current()
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    random.seed(SEED)
+    game = headless.start_level(level_nid)
+    if script_path:
+        player = headless.InputScript.load(script_path)
+    else:
+        player = AutoPlay(game, level_nid, turns)
+    timings = ReplayTimings()
+    for probe in probes.values():
+        probe.reset()
+    headless.run(game, player, MAX_FRAMES, timings)
+    return {'hash': state_hash(game),
+            'turns': game.turncount,
+            'frames': timings.frames,
+            'ms': timings.total * 1000,
+            'level_ended': getattr(player, 'level_ended', None),
+            'nudges': getattr(player, 'nudges', 0),
+            'phases': {phase: seconds * 1000 for phase, seconds in timings.phases.items()},
+            'states': {state: {'frames': timing.frames, 'ms': timing.total * 1000, 'max_ms': timing.longest * 1000}
+                       for state, timing in timings.states.items()},
+            'probes': {name: {'calls': probe.calls, 'ms': probe.seconds * 1000} for name, probe in probes.items()}}
+
+def run_project(project: str, level_nids: list, turns: int, scripts: str) -> dict:
+    from app.constants import VERSION
+    from app.data.database.database import DB
+    from app.engine import config as cf
+    from app.engine import headless
+
+    headless.load(project)
+    old_seed = cf.SETTINGS['random_seed']
+    cf.SETTINGS['random_seed'] = SEED
+    probes = {name: Probe(targets) for name, targets in PROBES.items()}
+    for probe in probes.values():
+        probe.install()
+    report = {'project': os.path.basename(os.path.normpath(project)), 'version': VERSION, 'seed': SEED, 'levels': {}}
+    try:
+        for level_nid in level_nids or DB.levels.keys():
+            if level_nid not in DB.levels.keys():
+                continue
+            script_path = os.path.join(scripts, level_nid + '.txt') if scripts else None
+            if script_path and not os.path.exists(script_path):
+                script_path = None
+            try:
+                runs = [play_level(level_nid, turns, script_path, probes) for _ in range(2)]
+            except Exception as e:
+                logging.exception("Could not replay level %s", level_nid)
+                report['levels'][level_nid] = {'error': '%s: %s' % (e.__class__.__name__, e)}
+                continue
+            # The faster of the two is less likely to have been slowed down by something else on the machine
+            result = min(runs, key=lambda run: run['ms'])
+            result['deterministic'] = runs[0]['hash'] == runs[1]['hash']
+            result['input'] = 'script' if script_path else 'ai'
+            report['levels'][level_nid] = result
+    finally:
+        for probe in probes.values():
+            probe.uninstall()
+        cf.SETTINGS['random_seed'] = old_seed
+    return report
+
+def compare(report: dict, baseline: dict) -> list:
+    """Returns a line for each time in the report that is slower than in the baseline"""
+    def slower(new, old):
+        return new - old > MIN_REGRESSION and new > old * (1 + TOLERANCE)
+
+    regressions = []
+    for project, project_report in report['projects'].items():
+        old_levels = baseline.get('projects', {}).get(project, {}).get('levels', {})
+        for level_nid, result in project_report['levels'].items():
+            old = old_levels.get(level_nid)
+            if not old or 'error' in result or 'error' in old:
+                continue
+            times = [('total', result['ms'], old['ms'])]
+            times += [(name, probe['ms'], old['probes'][name]['ms'])
+                      for name, probe in result['probes'].items() if name in old['probes']]
+            times += [('%s phase' % phase, ms, old['phases'][phase])
+                      for phase, ms in result['phases'].items() if phase in old['phases']]
+            for name, new_ms, old_ms in times:
+                if slower(new_ms, old_ms):
+                    regressions.append("%s level %s: %s took %.1f ms, up from %.1f ms" % (project, level_nid, name, new_ms, old_ms))
+    return regressions
+
+def print_report(report: dict):
+    print("%-28s %-8s %5s %7s %9s %9s %9s %9s %9s %9s  %s" %
+          ('Project', 'Level', 'Turns', 'Frames', 'Total ms', 'AI ms', 'Path ms', 'Target ms', 'Bound ms', 'Combat ms', 'Same twice'))
+    for project, project_report in report['projects'].items():
+        for level_nid, result in project_report['levels'].items():
+            if 'error' in result:
+                print("%-28s %-8s %s" % (project, level_nid, result['error']))
+                continue
+            probes = result['probes']
+            print("%-28s %-8s %5d %7d %9.1f %9.1f %9.1f %9.1f %9.1f %9.1f  %s" %
+                  (project, level_nid, result['turns'], result['frames'], result['ms'], probes['ai_think']['ms'],
+                   probes['pathfinding']['ms'], probes['targeting']['ms'], probes['boundary']['ms'],
+                   probes['combat']['ms'], 'yes' if result['deterministic'] else 'NO'))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay levels headless and report how long they took")
+    parser.add_argument('--project', nargs='*', default=None, help="Projects to replay. Defaults to " + ', '.join(DEFAULT_PROJECTS))
+    parser.add_argument('--levels', nargs='*', default=None, help="Level nids to replay. Defaults to every level")
+    parser.add_argument('--turns', type=int, default=3, help="How many turns to play each level for")
+    parser.add_argument('--scripts', default=None, help="Directory of <level_nid>.txt input scripts to play instead of the AI")
+    parser.add_argument('--report', default='replay_report.json', help="Where to write the JSON report")
+    parser.add_argument('--baseline', default=None, help="Report from an earlier run to compare against")
+    parser.add_argument('--one', default=None, help=argparse.SUPPRESS)  # Replay this one project in this process
+    args = parser.parse_args(argv)
+
+    if args.one:
+        report = run_project(args.one, args.levels, args.turns, args.scripts)
+        with open(args.report, 'w') as fp:
+            json.dump(report, fp, indent=2)
+        return 0
+
+    projects = args.project or [project for project in DEFAULT_PROJECTS if os.path.isdir(project)]
+    report = {'projects': {}}
+    for project in projects:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            project_path = os.path.join(tmp_dir, 'report.json')
+            command = [sys.executable, '-m', 'tests.bench_replay', '--one', project, '--turns', str(args.turns), '--report', project_path]
+            if args.levels:
+                command += ['--levels'] + args.levels
+            if args.scripts:
+                command += ['--scripts', args.scripts]
+            subprocess.run(command, check=False)
+            if not os.path.exists(project_path):
+                report['projects'][project] = {'error': 'Replay crashed', 'levels': {}}
+                continue
+            with open(project_path) as fp:
+                project_report = json.load(fp)
+        report['projects'][project_report['project']] = project_report
+
+    with open(args.report, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    print_report(report)
+
+    failed = False
+    for project, project_report in report['projects'].items():
+        if 'error' in project_report:
+            print("%s: %s" % (project, project_report['error']))
+            failed = True
+        for level_nid, result in project_report['levels'].items():
+            if not result.get('deterministic', True):
+                print("%s level %s did not play out the same way twice" % (project, level_nid))
+                failed = True
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(report, baseline)
+        for line in regressions:
+            print(line)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
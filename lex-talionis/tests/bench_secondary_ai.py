@@ -0,0 +1,104 @@
+"""
+Measures the cost of finding paths from every enemy to every player unit,
+comparing one AStar search per target (what SecondaryAI used to do)
+with GoalFields shared between every enemy through a DistanceFieldCache.
+
+Usage:
+    python -m tests.bench_secondary_ai [path/to/project.ltproj] [level_nid]
+"""
+import functools
+import sys
+import time
+
+from app.engine import headless
+
+NUM_ENEMIES = 50
+NUM_PLAYERS = 10
+
+def populate(game):
+    """Copies the level's enemies until there are NUM_ENEMIES of them, plus some players to fight"""
+    from app.data.database.database import DB
+    from app.data.database.level_units import GenericUnit
+    from app.engine import action
+    from app.engine.movement import movement_funcs
+    from app.engine.objects.unit import UnitObject
+    from app.engine.pathfinding.cost_grid import IMPASSABLE
+
+    templates = [unit for unit in game.units if unit.position and unit.team == 'enemy']
+    width, height = game.board.width, game.board.height
+
+    def free_positions(unit, x_range):
+        cost_grid = game.board.get_cost_grid(movement_funcs.get_movement_group(unit))
+        for x in x_range:
+            for y in range(height):
+                if not game.board.get_unit((x, y)) and cost_grid.get((x, y)) < IMPASSABLE:
+                    yield (x, y)
+
+    def copy_unit(template, nid, team, x_range):
+        prefab = GenericUnit(nid, template.variant, template.level, template.klass, template.faction or DB.factions[0].nid,
+                             [item.nid for item in template.items], [], team, template.ai)
+        unit = UnitObject.from_prefab(prefab, game.current_mode)
+        unit.party = game.current_party
+        action.RegisterUnit(unit).do()
+        position = next(free_positions(unit, x_range))
+        action.ArriveOnMap(unit, position).do()
+
+    num_enemies = len(templates)
+    idx = 0
+    while num_enemies < NUM_ENEMIES:
+        copy_unit(templates[idx % len(templates)], 'bench_enemy%d' % idx, 'enemy', range(width // 3, width))
+        num_enemies += 1
+        idx += 1
+    for idx in range(NUM_PLAYERS):
+        copy_unit(templates[idx % len(templates)], 'bench_player%d' % idx, 'player', range(0, width // 3))
+
+
+def astar_paths(game, unit, targets):
+    from app.engine.movement import movement_funcs
+    from app.engine.pathfinding import pathfinding
+    grid = game.board.get_movement_grid(movement_funcs.get_movement_group(unit))
+    pathfinder = pathfinding.AStar(unit.position, None, grid)
+    can_move_through = functools.partial(game.board.can_move_through, unit.team)
+    paths = {}
+    for target in targets:
+        pathfinder.set_goal_pos(target)
+        paths[target] = pathfinder.process(can_move_through, adj_good_enough=True, limit=99)
+        pathfinder.reset()
+    return paths
+
+def goal_paths(game, unit, targets, cache):
+    from app.engine.movement import movement_funcs
+    movement_group = movement_funcs.get_movement_group(unit)
+    cost_grid = game.board.get_cost_grid(movement_group)
+    blocked = frozenset(game.board.get_blocked_mask(unit.team))
+    return {target: cache.get(movement_group, cost_grid, game.board.bounds, (target,), blocked, True).find_path(unit.position, limit=99)
+            for target in targets}
+
+def run(game, func):
+    enemies = [unit for unit in game.units if unit.position and unit.team == 'enemy']
+    targets = [unit.position for unit in game.units if unit.position and unit.team == 'player']
+    start = time.perf_counter()
+    results = {unit.nid: func(game, unit, targets) for unit in enemies}
+    return results, time.perf_counter() - start, len(enemies) * len(targets)
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    level_nid = sys.argv[2] if len(sys.argv) > 2 else '0'
+
+    game = headless.start(project, level_nid)
+    populate(game)
+    from app.engine.pathfinding.field_cache import DistanceFieldCache
+    cache = DistanceFieldCache()
+    old, old_time, num_paths = run(game, astar_paths)
+    shared, shared_time, _ = run(game, lambda game, unit, targets: goal_paths(game, unit, targets, cache))
+    found_same = all(bool(old[nid][target]) == bool(shared[nid][target])
+                     for nid in old for target in old[nid])
+    print("%d paths on level %s" % (num_paths, level_nid))
+    print("AStar per target:          %6.3f s" % old_time)
+    print("shared goal fields:        %6.3f s   %4.1fx   (%d hits, %d misses)" %
+          (shared_time, old_time / shared_time, cache.hits, cache.misses))
+    print("same targets reachable: %s" % found_same)
+    assert found_same
+
+if __name__ == '__main__':
+    main()
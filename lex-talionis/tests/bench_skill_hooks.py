@@ -0,0 +1,83 @@
+"""
+Measures the cost of calling skill hooks on a unit with 30 skills,
+comparing the per-unit hook index against the old loop over every component
+of every skill.
+
+Usage:
+    python -m tests.bench_skill_hooks
+"""
+import timeit
+
+from app.data.database.database import DB
+from app.engine.codegen import source_generator
+
+NUM_SKILLS = 30
+NUM_CALLS = 20000
+
+def legacy_hook(unit, hook_name):
+    """What every generated hook used to do"""
+    from app.engine import skill_system
+    values = []
+    for skill in unit.skills[:]:
+        for component in skill.components:
+            if component.defines(hook_name):
+                if component.ignore_conditional or skill_system.condition(skill, unit):
+                    values.append(getattr(component, hook_name)(unit))
+    return values
+
+def legacy_stat_change(unit, stat_nid):
+    from app.engine import skill_system
+    bonus = 0
+    for skill in unit.skills:
+        for component in skill.components:
+            if component.defines('stat_change'):
+                d_bonus = component.stat_change(unit).get(stat_nid, 0)
+                if d_bonus and (component.ignore_conditional or skill_system.condition(skill, unit)):
+                    bonus += d_bonus
+    return bonus
+
+def build_unit():
+    from app.engine.objects.skill import SkillObject
+    from app.engine.objects.unit import UnitObject
+    from app.engine.skill_components.combat_components import StatChange
+    from app.engine.skill_components.combat2_components import CannotDouble, DistantCounter, Vantage
+    from app.utilities.data import Data
+
+    unit = UnitObject('bench')
+    for i in range(NUM_SKILLS):
+        components = [StatChange([('STR', 1), ('DEF', 1)])]
+        # A handful of skills implement the boolean hooks
+        if i % 10 == 0:
+            components.append(Vantage())
+        if i % 15 == 0:
+            components.append(CannotDouble())
+        if i % 3 == 0:
+            components.append(DistantCounter())
+        skill = SkillObject('skill%d' % i, 'Skill %d' % i, '', components=Data(components))
+        unit.add_skill(skill)
+    return unit
+
+def main():
+    source_generator.generate_component_system_source()
+    DB.load('testing_proj.ltproj')
+    from app.engine import skill_system
+    unit = build_unit()
+
+    assert skill_system.stat_change(unit, 'STR') == legacy_stat_change(unit, 'STR') == NUM_SKILLS
+    assert skill_system.vantage(unit) == all(legacy_hook(unit, 'vantage'))
+
+    cases = [
+        ('stat_change', lambda: legacy_stat_change(unit, 'STR'), lambda: skill_system.stat_change(unit, 'STR')),
+        ('vantage', lambda: legacy_hook(unit, 'vantage'), lambda: skill_system.vantage(unit)),
+        ('no_double', lambda: legacy_hook(unit, 'no_double'), lambda: skill_system.no_double(unit)),
+        ('pass_through (no implementers)', lambda: legacy_hook(unit, 'pass_through'), lambda: skill_system.pass_through(unit)),
+    ]
+    print("Hook call cost for a unit with %d skills (%d calls each)" % (NUM_SKILLS, NUM_CALLS))
+    for name, legacy, indexed in cases:
+        legacy_time = timeit.timeit(legacy, number=NUM_CALLS)
+        indexed_time = timeit.timeit(indexed, number=NUM_CALLS)
+        print("%-32s loop: %7.2f us/call   index: %7.2f us/call   %5.1fx" %
+              (name, legacy_time / NUM_CALLS * 1e6, indexed_time / NUM_CALLS * 1e6, legacy_time / indexed_time))
+
+if __name__ == '__main__':
+    main()
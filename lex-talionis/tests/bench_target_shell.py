@@ -0,0 +1,38 @@
+"""
+Measures the cost of TargetSystem.get_shell for a siege tome wielder with
+many reachable tiles, comparing the bitmask shell against unioning a set
+of positions for every move.
+
+Usage:
+    python -m tests.bench_target_shell
+"""
+import timeit
+from unittest.mock import MagicMock
+
+from app.engine.target_system import TargetSystem
+
+NUM_CALLS = 500
+BOUNDS = (0, 0, 29, 29)
+
+def legacy_shell(target_system, valid_moves, potential_range, bounds):
+    """What get_shell used to do"""
+    valid_attacks = set()
+    for x, y in valid_moves:
+        valid_attacks |= target_system.find_manhattan_spheres(potential_range, x, y)
+    return {pos for pos in valid_attacks if bounds[0] <= pos[0] <= bounds[2] and bounds[1] <= pos[1] <= bounds[3]}
+
+def main():
+    target_system = TargetSystem(game=MagicMock())
+    # Everything within 5 moves of the middle of the map
+    valid_moves = {(x, y) for x in range(30) for y in range(30) if abs(x - 15) + abs(y - 15) <= 5}
+    print("Shell around %d moves (%d calls each)" % (len(valid_moves), NUM_CALLS))
+    for potential_range in ({1}, {1, 2}, {3, 4, 5, 6, 7, 8, 9, 10}):
+        assert legacy_shell(target_system, valid_moves, potential_range, BOUNDS) == \
+            target_system.get_shell(valid_moves, potential_range, BOUNDS)
+        legacy_time = timeit.timeit(lambda: legacy_shell(target_system, valid_moves, potential_range, BOUNDS), number=NUM_CALLS)
+        mask_time = timeit.timeit(lambda: target_system.get_shell(valid_moves, potential_range, BOUNDS), number=NUM_CALLS)
+        print("range %-28s sets: %7.1f us   mask: %7.1f us   %4.1fx" %
+              (sorted(potential_range), legacy_time / NUM_CALLS * 1e6, mask_time / NUM_CALLS * 1e6, legacy_time / mask_time))
+
+if __name__ == '__main__':
+    main()
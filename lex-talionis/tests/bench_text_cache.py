@@ -0,0 +1,52 @@
+"""
+Draws the names and descriptions of the project's units and items, the way
+menus and info screens draw them every frame, first a character at a time
+like BmpFont used to, and then through the text cache. Checks that both
+give the same pixels.
+
+Usage:
+    python -m tests.bench_text_cache [path/to/project.ltproj]
+"""
+import sys
+import time
+
+from app.tests.mocks.boot import load_project
+
+FRAMES = 60
+
+def main():
+    project = sys.argv[1] if len(sys.argv) > 1 else '../UnderTheShadowOfGrima.ltproj'
+    load_project(project)
+    import pygame
+    from app.data.database.database import DB
+    from app.engine import engine
+    from app.engine.fonts import FONT
+    from app.engine.text_cache import TEXT_CACHE
+
+    lines = [(FONT['text'], unit.name, 'white') for unit in DB.units] + \
+        [(FONT['text'], item.name, 'blue') for item in DB.items] + \
+        [(FONT['narrow'], item.desc.split('\n')[0], 'white') for item in DB.items if item.desc]
+    lines = [(font, font.modify_string(string), color) for font, string, color in lines if string]
+
+    def frame(surf, blit):
+        for idx, (font, string, color) in enumerate(lines):
+            blit(font, string, surf, (4, idx % 10 * 16), color)
+
+    legacy = engine.create_surface((240, 160), transparent=True)
+    cached = engine.create_surface((240, 160), transparent=True)
+    frame(legacy, lambda font, string, surf, pos, color: font._blit_chars(string, surf, pos, color))
+    frame(cached, lambda font, string, surf, pos, color: font.blit(string, surf, pos, color))
+    assert pygame.image.tobytes(legacy, 'RGBA') == pygame.image.tobytes(cached, 'RGBA')
+
+    for name, blit in (('char by char', lambda font, string, surf, pos, color: font._blit_chars(string, surf, pos, color)),
+                       ('text cache', lambda font, string, surf, pos, color: font.blit(string, surf, pos, color))):
+        surf = engine.create_surface((240, 160), transparent=True)
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            frame(surf, blit)
+        print("%-12s %4d strings x %d frames   %7.1f ms" % (name, len(lines), FRAMES, (time.perf_counter() - start) * 1000))
+    print("Text cache: %d hits, %d misses, %d strings using %.1f MB" %
+          (TEXT_CACHE.hits, TEXT_CACHE.misses, len(TEXT_CACHE.entries), TEXT_CACHE.bytes_resident / 2**20))
+
+if __name__ == '__main__':
+    main()